@@ -3,14 +3,33 @@ ASGI config for TPSStore project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+HTTP requests go to Django as usual; WebSocket connections (``/ws/...``) are
+routed through Channels and authenticated with the JWT passed as ``?token=``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'TPSStore.settings')
 
-application = get_asgi_application()
+# Django must be set up before importing anything that touches the models.
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from channels.security.websocket import OriginValidator  # noqa: E402
+
+from store.routing import websocket_urlpatterns  # noqa: E402
+from store.ws_auth import JWTAuthMiddleware  # noqa: E402
+
+application = ProtocolTypeRouter({
+    'http': django_asgi_app,
+    'websocket': OriginValidator(
+        JWTAuthMiddleware(URLRouter(websocket_urlpatterns)),
+        settings.CORS_ALLOWED_ORIGINS,
+    ),
+})
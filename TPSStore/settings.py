@@ -53,6 +53,7 @@ AUTH_USER_MODEL = 'store.User'  # Asegúrate de que 'store' es el nombre correct
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',  # 🔹 Servidor ASGI (runserver con soporte WebSocket)
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -62,17 +63,31 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',  # Agregar corsheaders
+    'channels',  # 🔹 WebSockets (push de sesiones)
     'store',  # Tu aplicación
 ]
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'store.authentication.JWTAuthentication',  # 🔹 JWT de simplejwt + tiempos + usuario cacheado
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',  # 🔹 Permite todas las solicitudes sin token (temporalmente)
     ),
+    # 🔹 JSON con orjson (mismo formato que el de DRF, mucho más rápido en listas grandes)
+    'DEFAULT_RENDERER_CLASSES': (
+        'store.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'store.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
+
+GZIP_MIN_LENGTH = 1024  # 🔹 Bytes; respuestas más pequeñas se envían sin comprimir
+METRICS_TOKEN = None  # 🔹 Bearer para que Prometheus lea /metrics; sin token solo el staff (sesión) puede verlo
 from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=30),  # 🔹 Access token válido por 30 días
@@ -87,6 +102,8 @@ SIMPLE_JWT = {
 
 
 MIDDLEWARE = [
+    'store.metrics.PerformanceMiddleware',  # 🔹 Server-Timing y métricas en /metrics (va primero para medir todo)
+    'store.compression.ThresholdGZipMiddleware',  # 🔹 gzip si el cliente lo acepta y la respuesta supera GZIP_MIN_LENGTH
     'corsheaders.middleware.CorsMiddleware',  # Habilitar CORS
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -117,6 +134,15 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'TPSStore.wsgi.application'
+ASGI_APPLICATION = 'TPSStore.asgi.application'
+
+# 🔹 Capa de canales para los eventos en vivo de sesiones (/ws/sessions/).
+# InMemory solo sirve con un único proceso; con varios workers usar channels_redis.
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    },
+}
 
 
 # Database
@@ -134,6 +160,51 @@ DATABASES = {
 }
 
 
+# 🔹 Caché usada para las versiones de tablas (ETag/304 de sesiones y cuentas).
+# LocMem es por proceso: con varios workers usar una caché compartida (Redis/Memcached).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # 🔹 Usuarios autenticados (JWT) con su tribu; se invalida al guardar User/Tribe
+    'users': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'users',
+        'TIMEOUT': 60 * 5,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+    # 🔹 Respuestas del catálogo (items, recetas, blueprints, dinos); se invalida por señales
+    'catalog': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalog',
+        'TIMEOUT': 60 * 60 * 24,  # 🔹 TTL de respaldo; la invalidación normal es por versión
+        'OPTIONS': {
+            'MAX_ENTRIES': 2000,  # 🔹 Límite de tamaño
+        },
+    },
+    # 🔹 Vectores de materias primas por item (BOM); se invalidan por señales. Aparte de
+    # `default` para que su volumen nunca expulse las versiones de tablas
+    'bom': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bom',
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,  # 🔹 Una entrada por item expandido; si se expulsa, se recalcula
+        },
+    },
+    # 🔹 Imágenes con todas sus miniaturas generadas (una entrada por imagen)
+    'images': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'images',
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -1,16 +1,22 @@
 from django.contrib import admin
 from django.conf import settings
 from django.conf.urls.static import static
-from django.urls import path, include
+from django.urls import path, include, re_path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from store.views import CustomTokenObtainPairView
+from store.metrics import metrics_view
+from store.views import CustomTokenObtainPairView, serve_image_variant
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('store.urls')),  # 🔹 API principal
     path('api-auth/', include('rest_framework.urls')),  # 🔹 Habilita el login en DRF
     path('api/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('metrics', metrics_view, name='metrics'),  # 🔹 Métricas Prometheus (staff o METRICS_TOKEN)
 ]
 
 if settings.DEBUG:
+    urlpatterns += [
+        # 🔹 Miniaturas con `Cache-Control: immutable` (antes que la ruta genérica de `/media/`)
+        re_path(r'^media/(?P<path>(?:items|dinos)/variants/[^/]+\.webp)$', serve_image_variant, name='image_variant'),
+    ]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
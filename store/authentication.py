@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication as SimpleJWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .metrics import timed_authentication
+
+
+def _user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def get_cached_user(user_id):
+    """🔹 Usuario (con su tribu) desde la caché `users`; consulta la BD solo si no está"""
+    cache = caches['users']
+    key = _user_cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        User = get_user_model()
+        user = User.objects.select_related('tribe').filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        if user is not None:
+            cache.set(key, user)
+    return user
+
+
+def invalidate_cached_users(user_ids):
+    caches['users'].delete_many([_user_cache_key(user_id) for user_id in user_ids])
+
+
+def clear_cached_users():
+    caches['users'].clear()
+
+
+class JWTAuthentication(SimpleJWTAuthentication):
+    """🔹 JWTAuthentication de simplejwt con tiempo medido (Server-Timing) y usuario cacheado"""
+
+    def authenticate(self, request):
+        with timed_authentication():
+            return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        """Igual que simplejwt pero lee el usuario de la caché (invalidada al guardar User/Tribe)"""
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
@@ -0,0 +1,195 @@
+"""🔹 Autocompletado de `Item.name` desde un índice en memoria del proceso.
+
+- Prefijo: listas ordenadas con `bisect` sobre el nombre completo y sobre cada palabra
+  ("ingot" encuentra "Metal Ingot").
+- Tolerancia a errores: índice de vecindario por borrado (SymSpell) de cada palabra; una
+  palabra del texto a distancia de edición 1 de una palabra del nombre también coincide.
+
+Las señales de `Item` actualizan el índice de forma incremental. Los demás procesos lo
+reconstruyen cuando cambia la versión de catálogo de `Item`. El costo de una búsqueda
+depende de `limit`, no del tamaño del catálogo.
+"""
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+
+from .images import variant_name, variants_ready
+from .models import Item
+from .versions import catalog_version, get_version
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+MIN_FUZZY_LENGTH = 3  # 🔹 Palabras más cortas solo coinciden por prefijo
+PREFIX_CANDIDATES = 200  # 🔹 Tope de candidatos por prefijo de cada palabra en la búsqueda aproximada
+
+
+def normalize(text):
+    """Minúsculas, sin acentos y con un solo espacio entre palabras"""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode()
+    return ' '.join(re.findall(r'[a-z0-9]+', text.lower()))
+
+
+def _deletes(word):
+    """La palabra y sus variantes con una letra borrada"""
+    return {word} | {word[:index] + word[index + 1:] for index in range(len(word))}
+
+
+def _within_one_edit(a, b):
+    """Distancia de Levenshtein <= 1 (incluye transposición de dos letras vecinas)"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diffs = [index for index in range(len(a)) if a[index] != b[index]]
+        return len(diffs) == 1 or (
+            len(diffs) == 2 and diffs[1] == diffs[0] + 1 and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]]
+        )
+    shorter, longer = sorted((a, b), key=len)
+    return any(longer[:index] + longer[index + 1:] == shorter for index in range(len(longer)))
+
+
+class ItemNameIndex:
+    """Índice de nombres de items; seguro entre hilos"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.items = {}             # 🔹 id -> (nombre, imagen)
+        self.names = []             # 🔹 (nombre normalizado, id), ordenada
+        self.words = []             # 🔹 (texto desde la 2ª palabra en adelante, id), ordenada
+        self.deletes = defaultdict(set)  # 🔹 variante por borrado -> {(palabra, id)}
+        self.keys = {}              # 🔹 id -> (claves de `names`/`words`, palabras), para quitarlas
+
+    def rebuild(self, version=None):
+        """Reconstruye el índice completo con una sola consulta"""
+        rows = list(Item.objects.values_list('id', 'name', 'image'))
+        with self.lock:
+            self.items, self.names, self.words, self.deletes, self.keys = {}, [], [], defaultdict(set), {}
+            for item_id, name, image in rows:
+                self._add(item_id, name, image, sort=False)
+            self.names.sort()
+            self.words.sort()
+            self.version = version
+
+    def update(self, item_id, name, image, previous, version):
+        """🔹 Agrega o reemplaza un item (incremental).
+
+        Solo si el índice estaba en la versión `previous`; si no, se marca como
+        desactualizado y la próxima búsqueda lo reconstruye.
+        """
+        with self.lock:
+            if self.version is None or self.version != previous:
+                self.version = None
+                return
+            self._remove(item_id)
+            self._add(item_id, name, image)
+            self.version = version
+
+    def remove(self, item_id, previous, version):
+        with self.lock:
+            if self.version is None or self.version != previous:
+                self.version = None
+                return
+            self._remove(item_id)
+            self.version = version
+
+    def _add(self, item_id, name, image, sort=True):
+        normalized = normalize(name)
+        tokens = normalized.split()
+        name_key = (normalized, item_id)
+        word_keys = [(' '.join(tokens[index:]), item_id) for index in range(1, len(tokens))]
+
+        add = insort if sort else list.append
+        add(self.names, name_key)
+        for key in word_keys:
+            add(self.words, key)
+        for word in set(tokens):
+            if len(word) >= MIN_FUZZY_LENGTH:
+                for variant in _deletes(word):
+                    self.deletes[variant].add((word, item_id))
+        self.items[item_id] = (name, image or '')
+        self.keys[item_id] = (name_key, word_keys, set(tokens))
+
+    def _remove(self, item_id):
+        if item_id not in self.keys:
+            return
+        name_key, word_keys, tokens = self.keys.pop(item_id)
+        del self.items[item_id]
+        for entries, key in [(self.names, name_key)] + [(self.words, key) for key in word_keys]:
+            index = bisect_left(entries, key)
+            if index < len(entries) and entries[index] == key:
+                del entries[index]
+        for word in tokens:
+            if len(word) >= MIN_FUZZY_LENGTH:
+                for variant in _deletes(word):
+                    self.deletes[variant].discard((word, item_id))
+                    if not self.deletes[variant]:
+                        del self.deletes[variant]
+
+    @staticmethod
+    def _prefixed(entries, prefix, limit, seen):
+        """Hasta `limit` ids nuevos cuyas claves empiezan con `prefix` (orden alfabético)"""
+        found = []
+        index = bisect_left(entries, (prefix,))
+        while index < len(entries) and len(found) < limit and entries[index][0].startswith(prefix):
+            item_id = entries[index][1]
+            if item_id not in seen:
+                seen.add(item_id)
+                found.append(item_id)
+            index += 1
+        return found
+
+    def _fuzzy(self, tokens, limit, seen):
+        """Items donde cada palabra del texto empieza una palabra del nombre o está a un error de ella"""
+        candidates = None
+        for token in tokens:
+            matches = set(self._prefixed(self.names, token, PREFIX_CANDIDATES, set()))
+            matches.update(self._prefixed(self.words, token, PREFIX_CANDIDATES, set()))
+            if len(token) >= MIN_FUZZY_LENGTH:
+                for variant in _deletes(token):
+                    matches.update(
+                        item_id for word, item_id in self.deletes.get(variant, ()) if _within_one_edit(token, word)
+                    )
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                return []
+        ranked = sorted(candidates - seen, key=lambda item_id: (len(self.items[item_id][0]), self.items[item_id][0]))
+        return ranked[:limit]
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """🔹 Retorna hasta `limit` ids: prefijo del nombre, prefijo de una palabra y luego aproximados"""
+        normalized = normalize(query)
+        if not normalized:
+            return []
+        with self.lock:
+            seen = set()
+            results = self._prefixed(self.names, normalized, limit, seen)
+            if len(results) < limit:
+                results += self._prefixed(self.words, normalized, limit - len(results), seen)
+            if len(results) < limit:
+                results += self._fuzzy(normalized.split(), limit - len(results), seen)
+            return [(item_id, *self.items[item_id]) for item_id in results]
+
+
+item_index = ItemNameIndex()
+
+
+def current_index():
+    """El índice del proceso, reconstruido si la versión de catálogo de `Item` cambió en otro proceso"""
+    version = get_version(catalog_version(Item))[0]
+    if item_index.version != version:
+        item_index.rebuild(version)
+    return item_index
+
+
+def image_urls(image):
+    """`(url original, url miniatura)` a partir del nombre guardado en el índice"""
+    if not image:
+        return None, None
+    thumbnail = variant_name(image, 'thumb') if variants_ready(image) else image
+    return default_storage.url(image), default_storage.url(thumbnail)
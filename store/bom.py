@@ -0,0 +1,218 @@
+"""🔹 Lista de materiales (BOM): expande recetas recursivamente hasta materias primas.
+
+Cada item fabricable se resuelve a un vector `{item_id: cantidad por unidad}` de
+materias primas, escalado por `output_quantity` en cada nivel. Los vectores se
+memorizan en la caché y solo se invalidan para los items afectados por un cambio.
+
+El planificador (`plan_materials`) y la valoración de combos (`raw_materials_batch`)
+suman esos mismos vectores memorizados: solo se visitan los items pedidos y sus
+ingredientes, con la misma regla para los ciclos.
+"""
+import math
+from collections import defaultdict
+from fractions import Fraction
+
+from django.core.cache import caches
+
+from .models import BlueprintMaterial, Item, RecipeIngredient
+
+BOM_CACHE_PREFIX = "bom:item:"
+
+
+def _cache_key(item_id):
+    return f"{BOM_CACHE_PREFIX}{item_id}"
+
+
+def _add_edges(graph, rows):
+    """Agrega al grafo las filas `(origen_id, output_item_id, output_quantity, item_id, quantity)`.
+
+    Solo se usa el primer origen (receta o blueprint) de cada item que no esté ya en el grafo.
+    """
+    chosen = {}
+    for source_id, output_item_id, output_quantity, item_id, quantity in rows:
+        if output_item_id in graph and output_item_id not in chosen:
+            continue
+        if chosen.setdefault(output_item_id, source_id) != source_id:
+            continue
+        graph.setdefault(output_item_id, (output_quantity or 1, []))[1].append((item_id, quantity))
+
+
+def _cyclic_items(graph):
+    """Items que forman parte de un ciclo de recetas (componentes fuertemente conexas de Tarjan, iterativo)"""
+    order, low, on_stack, stack, cyclic = {}, {}, set(), [], set()
+    for start in graph:
+        if start in order:
+            continue
+        work = [(start, iter(graph[start][1]))]
+        order[start] = low[start] = len(order)
+        stack.append(start)
+        on_stack.add(start)
+        while work:
+            node, edges = work[-1]
+            for child, _ in edges:
+                if child not in graph:
+                    continue
+                if child not in order:
+                    order[child] = low[child] = len(order)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(graph[child][1])))
+                    break
+                if child in on_stack:
+                    low[node] = min(low[node], order[child])
+            else:
+                work.pop()
+                if work:
+                    low[work[-1][0]] = min(low[work[-1][0]], low[node])
+                if low[node] == order[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or any(item_id == node for item_id, _ in graph[node][1]):
+                        cyclic.update(component)
+    return cyclic
+
+
+def load_crafting_graph():
+    """Retorna `{output_item_id: (output_quantity, [(item_id, quantity), ...])}`.
+
+    Usa la primera receta (id más bajo) de cada item; los items sin receta se
+    fabrican con su primer blueprint. Dos consultas.
+    """
+    graph = {}
+    _add_edges(graph, RecipeIngredient.objects.order_by('recipe_id', 'id').values_list(
+        'recipe_id', 'recipe__output_item_id', 'recipe__output_quantity', 'item_id', 'quantity'
+    ))
+    _add_edges(graph, BlueprintMaterial.objects.order_by('blueprint_id', 'id').values_list(
+        'blueprint_id', 'blueprint__output_item_id', 'blueprint__output_quantity', 'item_id', 'quantity'
+    ))
+    return graph
+
+
+def _expand(item_id, graph, cyclic, memo):
+    """Expande `item_id` recursivamente.
+
+    Regla de ciclos: un item que forma parte de un ciclo de recetas cuenta como materia
+    prima cuando es ingrediente; si se pide directamente, se expande su propia receta.
+    Así el recorrido no vuelve a entrar en el ciclo y el resultado no depende del orden.
+    """
+    if item_id in memo:
+        return memo[item_id]
+    if item_id not in graph:
+        return {item_id: Fraction(1)}
+
+    output_quantity, ingredients = graph[item_id]
+    totals = defaultdict(Fraction)
+    for ingredient_id, quantity in ingredients:
+        vector = {ingredient_id: Fraction(1)} if ingredient_id in cyclic else _expand(ingredient_id, graph, cyclic, memo)
+        for raw_id, raw_quantity in vector.items():
+            totals[raw_id] += raw_quantity * quantity / output_quantity
+
+    memo[item_id] = dict(totals)
+    return memo[item_id]
+
+
+def _item_vectors(item_ids):
+    """`{item_id: (vector por unidad, está en un ciclo)}` desde la caché o, si falta alguno, desde el grafo"""
+    item_ids = set(item_ids)
+    cached = caches['bom'].get_many([_cache_key(item_id) for item_id in item_ids])
+    result = {item_id: cached[_cache_key(item_id)] for item_id in item_ids if _cache_key(item_id) in cached}
+
+    missing = item_ids - result.keys()
+    if missing:
+        graph = load_crafting_graph()
+        cyclic = _cyclic_items(graph)
+        memo = {}
+        for item_id in missing:
+            _expand(item_id, graph, cyclic, memo)
+        entries = {item_id: (vector, item_id in cyclic) for item_id, vector in memo.items()}
+        entries.update({item_id: ({item_id: Fraction(1)}, False) for item_id in missing if item_id not in graph})
+        caches['bom'].set_many({_cache_key(item_id): entry for item_id, entry in entries.items()}, None)
+        result.update({item_id: entries[item_id] for item_id in missing})
+
+    return result
+
+
+def raw_materials_per_unit(item_ids):
+    """🔹 Retorna `{item_id: {raw_item_id: Fraction}}` por unidad de cada item pedido.
+
+    Lee primero la caché; solo si falta algún item carga el grafo de recetas (dos consultas)
+    y guarda los vectores de todos los items que se expandieron en el camino.
+    """
+    return {item_id: vector for item_id, (vector, _) in _item_vectors(item_ids).items()}
+
+
+def expand_ingredients(ingredients, output_quantity=1):
+    """Expande una lista `[(item_id, quantity)]` que produce `output_quantity` unidades.
+
+    Retorna el vector de materias primas por unidad producida. Los ingredientes que
+    forman parte de un ciclo cuentan como materia prima (la misma regla que `_expand`).
+    """
+    vectors = _item_vectors(item_id for item_id, _ in ingredients)
+    totals = defaultdict(Fraction)
+    for item_id, quantity in ingredients:
+        vector, in_cycle = vectors[item_id]
+        for raw_id, raw_quantity in ({item_id: Fraction(1)} if in_cycle else vector).items():
+            totals[raw_id] += raw_quantity * quantity / (output_quantity or 1)
+    return dict(totals)
+
+
+def invalidate_items(item_ids):
+    """🔹 Invalida el BOM de los items dados y de todos los items que los usan (ancestros).
+
+    Recorre las aristas inversas desde los items cambiados: dos consultas por nivel.
+    """
+    affected = set()
+    pending = {item_id for item_id in item_ids if item_id is not None}
+    while pending:
+        affected |= pending
+        parents = set(RecipeIngredient.objects.filter(item_id__in=pending).values_list('recipe__output_item_id', flat=True))
+        parents.update(BlueprintMaterial.objects.filter(item_id__in=pending).values_list('blueprint__output_item_id', flat=True))
+        pending = parents - affected
+
+    caches['bom'].delete_many([_cache_key(item_id) for item_id in affected])
+
+
+def _accumulate(demand, vectors):
+    """Suma `cantidad × vector por unidad` de cada item de `{item_id: cantidad}` (solo entradas no nulas)"""
+    totals = defaultdict(Fraction)
+    for item_id, quantity in demand.items():
+        for raw_id, raw_quantity in vectors[item_id].items():
+            totals[raw_id] += raw_quantity * quantity
+    return dict(totals)
+
+
+def raw_materials_batch(demands):
+    """🔹 Materias primas exactas (`Fraction`) de muchas demandas `{item_id: cantidad}`.
+
+    Todos los vectores por unidad se leen juntos (una lectura de la caché y, si falta
+    alguno, una carga del grafo); cada demanda es una suma dispersa de esos vectores.
+    """
+    vectors = raw_materials_per_unit({item_id for demand in demands for item_id in demand})
+    return [_accumulate(demand, vectors) for demand in demands]
+
+
+def plan_materials(targets):
+    """🔹 Agrega las materias primas de muchos objetivos `[(item_id, quantity)]` en un solo paso.
+
+    Retorna una lista de `{"item", "quantity", "stack", "slots"}` por materia prima, donde
+    `slots` son los espacios de inventario según `Item.stack`.
+    """
+    demand = defaultdict(int)
+    for item_id, quantity in targets:
+        demand[item_id] += quantity
+    [totals] = raw_materials_batch([demand])
+    if not totals:
+        return []
+
+    stacks = dict(Item.objects.filter(id__in=totals).values_list('id', 'stack'))
+    materials = []
+    for item_id, amount in totals.items():
+        quantity = math.ceil(amount)  # 🔹 Solo se fabrican unidades enteras
+        stack = max(stacks.get(item_id) or 1, 1)
+        materials.append({"item": item_id, "quantity": quantity, "stack": stack, "slots": -(-quantity // stack)})
+    return materials
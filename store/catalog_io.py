@@ -0,0 +1,311 @@
+"""🔹 Exportación/importación en streaming (NDJSON o CSV) del catálogo de items, recetas y blueprints.
+
+Las referencias entre tablas viajan por nombre de item (`Item.name` es único): una receta o
+blueprint se identifica por el nombre de su item resultante, y un ingrediente/material por
+`(item resultante, item)`. Así los archivos se pueden mover entre entornos con ids distintos.
+
+La exportación usa `iterator()` (cursores del lado del servidor en PostgreSQL) y la importación
+procesa el archivo por bloques con upserts masivos: la memoria no depende del tamaño del archivo.
+La importación es todo o nada: si alguna fila es inválida no se guarda ningún bloque.
+Las imágenes de los items no se exportan.
+"""
+import csv
+import json
+from contextlib import contextmanager
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .bom import invalidate_items
+from .models import Blueprint, BlueprintMaterial, Item, Recipe, RecipeIngredient
+from .versions import bump_version, catalog_version
+
+CHUNK_SIZE = 1000
+
+# 🔹 Columnas de cada tipo (en orden de dependencia: los items primero)
+CATALOG_COLUMNS = {
+    'items': ['name', 'description', 'stack'],
+    'recipes': ['output_item', 'name', 'description', 'output_quantity'],
+    'recipe-ingredients': ['recipe', 'item', 'quantity'],
+    'blueprints': ['output_item', 'description', 'output_quantity'],
+    'blueprint-materials': ['blueprint', 'item', 'quantity'],
+}
+
+# 🔹 Columnas de la consulta para cada columna exportada
+_EXPORT_QUERIES = {
+    'items': (Item.objects.order_by('id'), ['name', 'description', 'stack']),
+    'recipes': (Recipe.objects.order_by('id'), ['output_item__name', 'name', 'description', 'output_quantity']),
+    'recipe-ingredients': (RecipeIngredient.objects.order_by('id'), ['recipe__output_item__name', 'item__name', 'quantity']),
+    'blueprints': (Blueprint.objects.order_by('id'), ['output_item__name', 'description', 'output_quantity']),
+    'blueprint-materials': (BlueprintMaterial.objects.order_by('id'), ['blueprint__output_item__name', 'item__name', 'quantity']),
+}
+
+_MODELS = {
+    'items': (Item,),
+    'recipes': (Recipe,),
+    'recipe-ingredients': (RecipeIngredient,),
+    'blueprints': (Blueprint,),
+    'blueprint-materials': (BlueprintMaterial,),
+}
+
+
+class CatalogImportError(ValueError):
+    """Fila inválida del archivo de importación"""
+
+
+@contextmanager
+def _line(number):
+    """Agrega el número de línea a los errores de una fila"""
+    try:
+        yield
+    except CatalogImportError as e:
+        raise CatalogImportError(f"Línea {number}: {e}") from None
+
+
+def export_rows(kind, chunk_size=CHUNK_SIZE):
+    """Genera los registros de `kind` como diccionarios `{columna: valor}`"""
+    queryset, fields = _EXPORT_QUERIES[kind]
+    columns = CATALOG_COLUMNS[kind]
+    for values in queryset.values_list(*fields).iterator(chunk_size=chunk_size):
+        yield dict(zip(columns, values))
+
+
+def export_ndjson(kind):
+    """🔹 Una línea JSON por registro"""
+    for row in export_rows(kind):
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    """Archivo falso para `csv.writer`: retorna la línea en lugar de guardarla"""
+
+    def write(self, value):
+        return value
+
+
+def export_csv(kind):
+    """🔹 CSV con encabezado; cada fila se genera al vuelo"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CATALOG_COLUMNS[kind])
+    for row in export_rows(kind):
+        yield writer.writerow(['' if value is None else value for value in row.values()])
+
+
+async def aiter_export(lines, chunk_size=CHUNK_SIZE):
+    """🔹 Versión asíncrona de un generador de exportación para servidores ASGI.
+
+    Con un iterador síncrono Django (ASGI) lee toda la respuesta a memoria antes de
+    enviarla; aquí cada bloque de `chunk_size` líneas se pide con `sync_to_async`
+    (siempre en el mismo hilo, el del cursor de la consulta) y se envía en cuanto llega.
+    """
+    next_chunk = sync_to_async(lambda: list(islice(lines, chunk_size)), thread_sensitive=True)
+    while chunk := await next_chunk():
+        for line in chunk:
+            yield line
+
+
+def read_ndjson(lines):
+    for number, line in enumerate(lines, start=1):
+        if line.strip():
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield number, CatalogImportError(f"JSON inválido: {e.msg}")
+
+
+def read_csv(lines):
+    for number, row in enumerate(csv.DictReader(lines), start=2):
+        yield number, {key: (value if value != '' else None) for key, value in row.items()}
+
+
+def _text(row, column, required=False):
+    value = row.get(column)
+    if value is None or str(value).strip() == '':
+        if required:
+            raise CatalogImportError(f"Falta la columna '{column}'.")
+        return None
+    return str(value).strip() if required else str(value)
+
+
+def _positive(row, column, default=None):
+    value = row.get(column)
+    if value is None or value == '':
+        if default is None:
+            raise CatalogImportError(f"Falta la columna '{column}'.")
+        return default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise CatalogImportError(f"'{column}' debe ser un entero.")
+    if value < 1:
+        raise CatalogImportError(f"'{column}' fuera de rango.")
+    return value
+
+
+def _clean(model, values):
+    """Valida los valores con los campos del modelo (largo máximo, rango de enteros)
+    antes de escribir: un valor fuera de rango es un error de la fila, no un DataError"""
+    for name, value in values.items():
+        field = model._meta.get_field(name)
+        if value is None or field.is_relation:
+            continue
+        try:
+            field.run_validators(value)
+        except ValidationError as e:
+            raise CatalogImportError(f"'{field.name}': {' '.join(e.messages)}")
+    return values
+
+
+def _item_ids(names):
+    return dict(Item.objects.filter(name__in=names).values_list('name', 'id'))
+
+
+def _by_output_item(model, item_ids):
+    """`{output_item_id: objeto}`; si hay varios por item se usa el de menor id"""
+    existing = {}
+    for obj in model.objects.filter(output_item_id__in=item_ids).order_by('-id'):
+        existing[obj.output_item_id] = obj
+    return existing
+
+
+def _save(model, objects, existing, fields):
+    """Crea los objetos nuevos y actualiza los existentes; retorna `(creados, actualizados)`"""
+    to_create, to_update = [], []
+    for key, values in objects.items():
+        obj = existing.get(key)
+        if obj is None:
+            to_create.append(model(**values))
+        else:
+            for field in fields:
+                setattr(obj, field, values[field])
+            to_update.append(obj)
+    model.objects.bulk_create(to_create)
+    model.objects.bulk_update(to_update, fields)
+    return len(to_create), len(to_update)
+
+
+def _import_items(rows):
+    items = {}
+    for number, row in rows:
+        with _line(number):
+            name = _text(row, 'name', required=True)
+            items[name] = Item(**_clean(Item, {
+                'name': name, 'description': _text(row, 'description'), 'stack': _positive(row, 'stack', default=1),
+            }))
+    existing = Item.objects.filter(name__in=items).count()
+    # 🔹 Upsert en una sola sentencia (ON CONFLICT sobre el nombre único)
+    Item.objects.bulk_create(
+        items.values(), update_conflicts=True, unique_fields=['name'], update_fields=['description', 'stack']
+    )
+    return len(items) - existing, existing, set()  # 🔹 El BOM no depende de los datos del item
+
+
+def _import_outputs(model, rows, fields):
+    """Recetas y blueprints: clave = nombre del item resultante"""
+    names = []
+    for number, row in rows:
+        with _line(number):
+            names.append(_text(row, 'output_item', required=True))
+    item_ids = _item_ids(names)
+    objects = {}
+    for (number, row), name in zip(rows, names):
+        with _line(number):
+            if name not in item_ids:
+                raise CatalogImportError(f"El item '{name}' no existe.")
+            values = {
+                'output_item_id': item_ids[name],
+                'description': _text(row, 'description'),
+                'output_quantity': _positive(row, 'output_quantity', default=1),
+            }
+            if 'name' in fields:
+                values['name'] = _text(row, 'name') or name  # 🔹 Igual que `Recipe.save`
+            objects[item_ids[name]] = _clean(model, values)
+    created, updated = _save(model, objects, _by_output_item(model, objects), fields)
+    return created, updated, set(objects)
+
+
+def _import_lines(model, parent_model, parent_field, rows):
+    """Ingredientes y materiales: clave = (item resultante del padre, item)"""
+    names = []
+    for number, row in rows:
+        with _line(number):
+            names.append((_text(row, parent_field, required=True), _text(row, 'item', required=True)))
+    item_ids = _item_ids({name for pair in names for name in pair})
+    parents = _by_output_item(parent_model, {item_ids[parent] for parent, _ in names if parent in item_ids})
+    objects = {}
+    for (number, row), (parent, item) in zip(rows, names):
+        with _line(number):
+            for name in (parent, item):
+                if name not in item_ids:
+                    raise CatalogImportError(f"El item '{name}' no existe.")
+            parent_obj = parents.get(item_ids[parent])
+            if parent_obj is None:
+                raise CatalogImportError(f"'{parent}' no tiene {parent_model._meta.verbose_name}.")
+            objects[(parent_obj.id, item_ids[item])] = _clean(model, {
+                f'{parent_field}_id': parent_obj.id,
+                'item_id': item_ids[item],
+                'quantity': _positive(row, 'quantity'),
+            })
+
+    existing = {
+        (getattr(obj, f'{parent_field}_id'), obj.item_id): obj
+        for obj in model.objects.filter(**{
+            f'{parent_field}_id__in': {key[0] for key in objects},
+            'item_id__in': {key[1] for key in objects},
+        })
+    }
+    created, updated = _save(model, objects, existing, ['quantity'])
+    return created, updated, {parent_obj.output_item_id for parent_obj in parents.values()}
+
+
+_IMPORTERS = {
+    'items': _import_items,
+    'recipes': lambda rows: _import_outputs(Recipe, rows, ['name', 'description', 'output_quantity']),
+    'recipe-ingredients': lambda rows: _import_lines(RecipeIngredient, Recipe, 'recipe', rows),
+    'blueprints': lambda rows: _import_outputs(Blueprint, rows, ['description', 'output_quantity']),
+    'blueprint-materials': lambda rows: _import_lines(BlueprintMaterial, Blueprint, 'blueprint', rows),
+}
+
+
+def import_rows(kind, rows, chunk_size=CHUNK_SIZE):
+    """🔹 Importa `(línea, fila)` por bloques de `chunk_size` dentro de una sola transacción.
+
+    Retorna `{"created", "updated", "errors"}`. Si algún bloque tiene errores (el error
+    indica la línea) se revisa el resto del archivo pero no se guarda nada: `created`
+    y `updated` quedan en 0.
+    """
+    importer = _IMPORTERS[kind]
+    result = {'created': 0, 'updated': 0, 'errors': []}
+    touched = set()
+    rows = iter(rows)
+    with transaction.atomic():
+        while chunk := list(islice(rows, chunk_size)):
+            try:
+                for number, row in chunk:
+                    with _line(number):
+                        if isinstance(row, CatalogImportError):
+                            raise row
+                        if not isinstance(row, dict):
+                            raise CatalogImportError("Se esperaba un objeto.")
+                with transaction.atomic():  # 🔹 Savepoint: un bloque inválido no deja escrituras a medias
+                    created, updated, item_ids = importer(chunk)
+            except CatalogImportError as e:
+                result['errors'].append(str(e))
+                continue
+            result['created'] += created
+            result['updated'] += updated
+            touched |= item_ids
+
+        if result['errors']:
+            transaction.set_rollback(True)
+            result['created'] = result['updated'] = 0
+            return result
+
+    # 🔹 Las operaciones masivas no envían señales: invalidar versiones y BOM a mano
+    for model in _MODELS[kind]:
+        bump_version(catalog_version(model))
+    if kind != 'items':
+        invalidate_items(touched)
+    return result
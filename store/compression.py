@@ -0,0 +1,16 @@
+"""🔹 Compresión gzip de respuestas con un tamaño mínimo configurable (`GZIP_MIN_LENGTH`)."""
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+
+
+class ThresholdGZipMiddleware(GZipMiddleware):
+    """`GZipMiddleware` de Django, pero sin comprimir respuestas menores a `GZIP_MIN_LENGTH` bytes.
+
+    Comprimir cuerpos pequeños cuesta CPU y casi no ahorra bytes. Las respuestas en
+    streaming y las que ya traen `Content-Encoding` se manejan igual que en Django.
+    """
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < getattr(settings, 'GZIP_MIN_LENGTH', 1024):
+            return response
+        return super().process_response(request, response)
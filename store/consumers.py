@@ -0,0 +1,31 @@
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .events import tribe_group
+
+
+class SessionConsumer(AsyncJsonWebsocketConsumer):
+    """🔹 Canal en vivo de sesiones: reemplaza el polling de /api/sessions/"""
+
+    async def connect(self):
+        user = self.scope.get("user")
+
+        # 🔹 Solo usuarios autenticados y con tribu pueden suscribirse
+        if user is None or not user.is_authenticated or not user.tribe_id:
+            await self.close(code=4401)
+            return
+
+        self.group_name = tribe_group(user.tribe_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        group_name = getattr(self, "group_name", None)
+        if group_name:
+            await self.channel_layer.group_discard(group_name, self.channel_name)
+
+    async def session_event(self, message):
+        """Reenvía al cliente los eventos publicados por `broadcast_session_event`"""
+        await self.send_json({
+            "event": message["event"],
+            "session": message["session"],
+        })
@@ -0,0 +1,25 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+
+def tribe_group(tribe_id):
+    """Nombre del grupo de canales que recibe los eventos de sesiones de una tribu"""
+    return f"sessions.tribe.{tribe_id}"
+
+
+def broadcast_session_event(event, tribe_id, payload):
+    """🔹 Envía un evento de sesión (created/updated/ended) a los clientes de la tribu.
+
+    Se envía al confirmar la transacción para no anunciar cambios que se revierten.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None or tribe_id is None:
+        return
+
+    message = {
+        "type": "session.event",
+        "event": event,
+        "session": payload,
+    }
+    transaction.on_commit(lambda: async_to_sync(channel_layer.group_send)(tribe_group(tribe_id), message))
@@ -0,0 +1,93 @@
+"""🔹 Variantes de tamaño fijo (miniaturas) para `Item.image` y `Dino.image`.
+
+Cada variante se guarda junto al original como `<carpeta>/variants/<nombre>_<tamaño>.webp`.
+El nombre del original ya es único (el storage agrega un sufijo al subir), así que la URL
+de una variante no cambia de contenido: el servidor web que sirve `/media/` puede
+enviarla con `Cache-Control: immutable`.
+
+Mientras las variantes de una imagen no existan (antes del backfill o si la generación
+falló) las URLs apuntan a la imagen original.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+VARIANTS_DIR = 'variants'
+
+# 🔹 Lado máximo (px) de cada variante; configurable con IMAGE_VARIANT_SIZES
+IMAGE_VARIANT_SIZES = getattr(settings, 'IMAGE_VARIANT_SIZES', {
+    'thumb': 64,
+    'small': 128,
+    'medium': 256,
+})
+
+
+def variant_name(name, variant):
+    """Ruta en el storage de la variante `variant` para la imagen `name`"""
+    directory, filename = os.path.split(name)
+    stem, _ = os.path.splitext(filename)
+    return f"{directory}/{VARIANTS_DIR}/{stem}_{IMAGE_VARIANT_SIZES[variant]}.webp"
+
+
+def _ready_key(name):
+    return f"image-variants:{name}"
+
+
+def variants_ready(name):
+    """🔹 `True` si todas las variantes de la imagen `name` existen.
+
+    Una vez generadas no cambian (nombres únicos): el resultado positivo se recuerda en
+    la caché `images` y las lecturas siguientes no acceden al storage. El negativo no se guarda.
+    """
+    if caches['images'].get(_ready_key(name)):
+        return True
+    ready = all(default_storage.exists(variant_name(name, variant)) for variant in IMAGE_VARIANT_SIZES)
+    if ready:
+        caches['images'].set(_ready_key(name), True, None)
+    return ready
+
+
+def variant_urls(image):
+    """Retorna `{variante: url}` de una imagen; la URL del original si faltan las variantes"""
+    if not image:
+        return {}
+    if not variants_ready(image.name):
+        return {variant: default_storage.url(image.name) for variant in IMAGE_VARIANT_SIZES}
+    return {variant: default_storage.url(variant_name(image.name, variant)) for variant in IMAGE_VARIANT_SIZES}
+
+
+def generate_variants(image, force=False):
+    """🔹 Genera (si faltan) las variantes WebP de la imagen. Retorna cuántas se escribieron."""
+    if not image:
+        return 0
+
+    pending = {
+        variant: variant_name(image.name, variant)
+        for variant in IMAGE_VARIANT_SIZES
+        if force or not default_storage.exists(variant_name(image.name, variant))
+    }
+    if not pending:
+        return 0
+
+    with default_storage.open(image.name, 'rb') as original:
+        source = ImageOps.exif_transpose(Image.open(original))
+        source.load()
+    if source.mode not in ('RGB', 'RGBA'):
+        source = source.convert('RGBA')
+
+    for variant, name in pending.items():
+        size = IMAGE_VARIANT_SIZES[variant]
+        resized = source.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        buffer = BytesIO()
+        resized.save(buffer, format='WEBP', quality=80, method=6)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        default_storage.save(name, ContentFile(buffer.getvalue()))
+    caches['images'].set(_ready_key(image.name), True, None)
+    return len(pending)
@@ -0,0 +1,95 @@
+"""🔹 Linaje de genéticas (madre/padre) indexado en la tabla de clausura `GeneticLineage`.
+
+Cada genética guarda una fila por ancestro con la distancia mínima en generaciones, así
+"todos los ancestros" y "todos los descendientes" son una sola consulta indexada sin
+importar la profundidad del linaje.
+
+Al cambiar los padres de una genética solo se recalcula su subárbol: las filas entre
+genéticas del subárbol no cambian (todo camino entre ellas queda dentro), se reemplazan
+únicamente las que vienen de ancestros externos, en orden topológico.
+"""
+from collections import defaultdict, deque
+
+from django.db import transaction
+
+from .models import Genetic, GeneticLineage
+
+BATCH_SIZE = 5000
+
+
+def descendant_ids(genetic_ids):
+    """Ids de las genéticas dadas y de todos sus descendientes"""
+    ids = set(genetic_ids)
+    ids.update(GeneticLineage.objects.filter(ancestor_id__in=ids).values_list('descendant_id', flat=True))
+    return ids
+
+
+def creates_cycle(genetic_id, parent_ids):
+    """🔹 `True` si algún padre es la misma genética o uno de sus descendientes"""
+    parent_ids = {parent_id for parent_id in parent_ids if parent_id}
+    if genetic_id is None or not parent_ids:
+        return False
+    return genetic_id in parent_ids or GeneticLineage.objects.filter(
+        ancestor_id=genetic_id, descendant_id__in=parent_ids
+    ).exists()
+
+
+def rebuild_lineage(root_ids):
+    """🔹 Recalcula las filas de ancestros externos de `root_ids` y de todos sus descendientes.
+
+    Los padres de cada raíz deben estar fuera del subárbol (lo garantiza `creates_cycle`).
+    """
+    root_ids = {root_id for root_id in root_ids if root_id}
+    if not root_ids:
+        return
+    with transaction.atomic():
+        subtree = descendant_ids(root_ids)
+        parents = {
+            genetic_id: (mother_id, father_id)
+            for genetic_id, mother_id, father_id in Genetic.objects.filter(id__in=subtree).values_list('id', 'mother_id', 'father_id')
+        }
+        subtree = set(parents)  # 🔹 Sin las genéticas ya borradas
+
+        # 🔹 Ancestros de los padres externos (incluido el propio padre, a distancia 0)
+        outside = defaultdict(dict)
+        outside_parents = {parent_id for pair in parents.values() for parent_id in pair if parent_id and parent_id not in subtree}
+        for parent_id in outside_parents:
+            outside[parent_id][parent_id] = 0
+        rows = GeneticLineage.objects.filter(descendant_id__in=outside_parents).values_list('ancestor_id', 'descendant_id', 'depth')
+        for ancestor_id, parent_id, depth in rows:
+            outside[parent_id][ancestor_id] = depth
+
+        # 🔹 Orden topológico del subárbol: una genética después de sus padres internos
+        children, pending = defaultdict(list), {}
+        for genetic_id, pair in parents.items():
+            inner = {parent_id for parent_id in pair if parent_id in subtree}
+            pending[genetic_id] = len(inner)
+            for parent_id in inner:
+                children[parent_id].append(genetic_id)
+        queue = deque(genetic_id for genetic_id, count in pending.items() if not count)
+
+        ancestors = {}  # 🔹 genética -> {ancestro externo: distancia}
+        while queue:
+            genetic_id = queue.popleft()
+            found = {}
+            for parent_id in parents[genetic_id]:
+                if parent_id is None:
+                    continue
+                for ancestor_id, depth in (ancestors[parent_id] if parent_id in subtree else outside[parent_id]).items():
+                    if depth + 1 < found.get(ancestor_id, depth + 2):
+                        found[ancestor_id] = depth + 1
+            ancestors[genetic_id] = found
+            for child_id in children[genetic_id]:
+                pending[child_id] -= 1
+                if not pending[child_id]:
+                    queue.append(child_id)
+
+        GeneticLineage.objects.filter(descendant_id__in=subtree).exclude(ancestor_id__in=subtree).delete()
+        GeneticLineage.objects.bulk_create(
+            (
+                GeneticLineage(ancestor_id=ancestor_id, descendant_id=genetic_id, depth=depth)
+                for genetic_id, found in ancestors.items()
+                for ancestor_id, depth in found.items()
+            ),
+            batch_size=BATCH_SIZE,
+        )
@@ -0,0 +1,74 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import resolve
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from store.models import User
+from store.renderers import ORJSONRenderer
+
+DEFAULT_PATHS = ['/api/recipes/', '/api/genetics/', '/api/combos/', '/api/items/', '/api/blueprints/']
+
+
+def median_ms(function, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara bytes y CPU por respuesta: JSONRenderer de DRF vs ORJSONRenderer, "
+        "con y sin gzip, usando los datos reales de los endpoints de lista."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--host', default='localhost', help="Host de las URLs absolutas (debe estar en ALLOWED_HOSTS)")
+        parser.add_argument(
+            '--user', help="Usuario de las peticiones (por defecto el primer superusuario: ve todas las tribus)"
+        )
+
+    def get_user(self, username):
+        """Las listas por tribu responden `[]` a un anónimo: se mide como un usuario real"""
+        users = User.objects.filter(is_active=True)
+        user = users.filter(username=username).first() if username else users.filter(is_superuser=True).order_by('id').first()
+        if user is None:
+            raise CommandError(f"No existe el usuario '{username}'." if username else "No hay superusuarios; use --user.")
+        return user
+
+    def handle(self, *args, paths, iterations, host, user, **options):
+        factory = APIRequestFactory()
+        user = self.get_user(user)
+        baseline, fast = JSONRenderer(), ORJSONRenderer()
+
+        self.stdout.write(
+            f"{'ruta':20} {'json B':>9} {'gzip B':>8} {'drf ms':>8} {'orjson ms':>10} {'gzip ms':>8} {'x':>6}"
+        )
+        for path in paths:
+            match = resolve(path)
+            request = factory.get(path, HTTP_HOST=host)
+            force_authenticate(request, user=user)
+            response = match.func(request, *match.args, **match.kwargs)
+            if response.status_code != 200:
+                raise CommandError(f"{path} respondió {response.status_code}.")
+            data = response.data
+
+            before = baseline.render(data)
+            after = fast.render(data)
+            compressed = compress_string(after)
+            drf_ms = median_ms(lambda: baseline.render(data), iterations)
+            orjson_ms = median_ms(lambda: fast.render(data), iterations)
+            gzip_ms = median_ms(lambda: compress_string(after), iterations)
+
+            self.stdout.write(
+                f"{path:20} {len(before):>9} {len(compressed):>8} {drf_ms:>8.3f} {orjson_ms:>10.3f} "
+                f"{gzip_ms:>8.3f} {drf_ms / orjson_ms if orjson_ms else 0:>5.1f}x"
+            )
@@ -0,0 +1,29 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.catalog_io import CATALOG_COLUMNS, export_csv, export_ndjson
+
+
+class Command(BaseCommand):
+    help = "Exporta el catálogo (items, recetas, blueprints) a archivos NDJSON o CSV en un directorio"
+
+    def add_arguments(self, parser):
+        parser.add_argument('kinds', nargs='*', help=f"Tipos a exportar (por defecto todos): {', '.join(CATALOG_COLUMNS)}")
+        parser.add_argument('--dir', default='.', help="Directorio de salida")
+        parser.add_argument('--format', choices=['ndjson', 'csv'], default='ndjson')
+
+    def handle(self, *args, kinds, dir, format, **options):
+        unknown = set(kinds) - set(CATALOG_COLUMNS)
+        if unknown:
+            raise CommandError(f"Tipos desconocidos: {', '.join(sorted(unknown))}.")
+
+        generate = export_csv if format == 'csv' else export_ndjson
+        directory = Path(dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        for kind in kinds or CATALOG_COLUMNS:
+            path = directory / f"{kind}.{format}"
+            with open(path, 'w', encoding='utf-8', newline='') as output:
+                output.writelines(generate(kind))
+            self.stdout.write(f"{kind} -> {path}")
+        self.stdout.write(self.style.SUCCESS("Catálogo exportado."))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from store.images import generate_variants
+from store.models import Dino, Item
+from store.versions import bump_version, catalog_version
+
+
+class Command(BaseCommand):
+    help = "Genera las miniaturas faltantes de las imágenes de Items y Dinos ya subidas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Regenera también las variantes existentes")
+
+    def handle(self, *args, force, **options):
+        written = 0
+        for model in (Item, Dino):
+            model_written = 0
+            for instance in model.objects.exclude(image='').exclude(image__isnull=True).only('image'):
+                try:
+                    model_written += generate_variants(instance.image, force=force)
+                except (OSError, ValueError) as e:
+                    self.stderr.write(f"{model.__name__} {instance.pk}: {e}")
+            if model_written:
+                # 🔹 Las respuestas cacheadas (y el snapshot) todavía apuntan a los originales
+                bump_version(catalog_version(model))
+            written += model_written
+
+        self.stdout.write(self.style.SUCCESS(f"{written} variantes generadas."))
@@ -0,0 +1,37 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.catalog_io import CATALOG_COLUMNS, CHUNK_SIZE, import_rows, read_csv, read_ndjson
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa archivos del catálogo (<tipo>.ndjson o <tipo>.csv, ej. items.ndjson) con upserts por bloques. "
+        "Los archivos se procesan en orden de dependencia: items, recetas, ingredientes, blueprints, materiales."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, files, chunk_size, **options):
+        paths = [Path(name) for name in files]
+        for path in paths:
+            if path.stem not in CATALOG_COLUMNS or path.suffix not in ('.ndjson', '.csv'):
+                raise CommandError(f"{path}: el nombre debe ser <tipo>.ndjson o <tipo>.csv ({', '.join(CATALOG_COLUMNS)}).")
+
+        order = list(CATALOG_COLUMNS)
+        failed = False
+        for path in sorted(paths, key=lambda path: order.index(path.stem)):
+            with open(path, encoding='utf-8-sig', newline='') as lines:
+                rows = read_csv(lines) if path.suffix == '.csv' else read_ndjson(lines)
+                result = import_rows(path.stem, rows, chunk_size=chunk_size)
+            self.stdout.write(f"{path}: {result['created']} creados, {result['updated']} actualizados")
+            for error in result['errors']:
+                self.stderr.write(f"  {error}")
+            failed = failed or bool(result['errors'])
+
+        if failed:
+            raise CommandError("La importación terminó con errores.")
+        self.stdout.write(self.style.SUCCESS("Catálogo importado."))
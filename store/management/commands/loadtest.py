@@ -0,0 +1,255 @@
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from store.models import Account, Session, Tribe, User
+
+# 🔹 Formato de log de runserver: [10/Feb/2025 22:44:32] "GET /api/genetics/ HTTP/1.1" 200 13522
+LOG_LINE = re.compile(r'^\[[^\]]+\] "(?P<method>[A-Z]+) (?P<path>\S+) HTTP/[\d.]+" (?P<status>\d{3}) ')
+
+# 🔹 Rutas que sabemos reproducir; el resto del log (admin, estáticos, OPTIONS) se ignora
+REPLAYABLE = {
+    ('GET', '/api/sessions/'),
+    ('GET', '/api/users/me/'),
+    ('GET', '/api/accounts/'),
+    ('GET', '/api/session-logs/'),
+    ('GET', '/api/users/'),
+    ('GET', '/api/tribes/'),
+    ('GET', '/api/items/'),
+    ('GET', '/api/recipes/'),
+    ('GET', '/api/blueprints/'),
+    ('GET', '/api/dinos/'),
+    ('GET', '/api/genetics/'),
+    ('GET', '/api/combos/'),
+    ('POST', '/api/token/'),
+    ('POST', '/api/sessions/'),
+    ('PATCH', '/api/sessions/{id}/'),
+    ('DELETE', '/api/sessions/{id}/'),
+}
+
+# 🔹 Escrituras de sesiones: cuál se ejecuta depende del estado del usuario virtual
+SESSION_WRITES = {
+    ('POST', '/api/sessions/'),
+    ('PATCH', '/api/sessions/{id}/'),
+    ('DELETE', '/api/sessions/{id}/'),
+}
+SESSION_WRITE = ('WRITE', '/api/sessions/')
+
+LOADTEST_PASSWORD = 'loadtest-password'
+
+
+def normalize_path(path):
+    """Quita la query y reemplaza los ids numéricos: /api/sessions/12/ -> /api/sessions/{id}/"""
+    path = path.split('?', 1)[0]
+    return re.sub(r'/\d+(?=/|$)', '/{id}', path)
+
+
+def parse_log_mix(log_path):
+    """🔹 Cuenta las peticiones reproducibles del log de acceso por (método, ruta)"""
+    mix = Counter()
+    with open(log_path, encoding='utf-8', errors='replace') as log:
+        for line in log:
+            match = LOG_LINE.match(line)
+            if not match:
+                continue
+            route = (match['method'], normalize_path(match['path']))
+            if route in REPLAYABLE:
+                mix[route] += 1
+    return mix
+
+
+def replay_mix(mix):
+    """🔹 Mezcla a sortear: las escrituras de sesiones se juntan en una sola operación
+    (`SESSION_WRITE`) con su peso total; el usuario virtual decide cuál ejecutar"""
+    replay = Counter({route: count for route, count in mix.items() if route not in SESSION_WRITES})
+    writes = sum(mix[route] for route in SESSION_WRITES)
+    if writes:
+        replay[SESSION_WRITE] = writes
+    return replay
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class VirtualUser:
+    """Un jugador simulado: su propio usuario, cuenta, token y sesión activa"""
+
+    def __init__(self, base_url, username, account_id, timeout, patch_share=0.5):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.account_id = account_id
+        self.timeout = timeout
+        self.patch_share = patch_share  # 🔹 PATCH / (PATCH + DELETE) en el log
+        self.token = None
+        self.session_id = None
+
+    def request(self, method, path, body=None):
+        headers = {'Content-Type': 'application/json'}
+        if self.token and path != '/api/token/':
+            headers['Authorization'] = f'Bearer {self.token}'
+        data = json.dumps(body).encode() if body is not None else None
+        request = Request(self.base_url + path, data=data, method=method, headers=headers)
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except HTTPError as e:
+            return e.code, e.read()
+
+    def login(self):
+        status, body = self.request('POST', '/api/token/', {'username': self.username, 'password': LOADTEST_PASSWORD})
+        if status == 200:
+            self.token = json.loads(body)['access']
+        return status
+
+    def run(self, method, route):
+        """Ejecuta una operación del mix; retorna `(ruta ejecutada, status)`.
+
+        `SESSION_WRITE` elige la escritura según el estado (igual que el frontend): sin
+        sesión activa se inicia una; con sesión activa PATCH o DELETE, en la proporción
+        del log. Se cuenta bajo la ruta que realmente se ejecutó.
+        """
+        if route == '/api/token/':
+            return 'POST /api/token/', self.login()
+
+        if (method, route) == SESSION_WRITE:
+            if self.session_id is None:
+                status, body = self.request('POST', '/api/sessions/', {'account': self.account_id})
+                if status == 201:
+                    self.session_id = json.loads(body)['id']
+                return 'POST /api/sessions/', status
+            if random.random() < self.patch_share:
+                status, _ = self.request('PATCH', f'/api/sessions/{self.session_id}/', {'status': random.choice(['playing', 'afk'])})
+                return 'PATCH /api/sessions/{id}/', status
+            status, _ = self.request('DELETE', f'/api/sessions/{self.session_id}/')
+            self.session_id = None
+            return 'DELETE /api/sessions/{id}/', status
+
+        status, _ = self.request(method, route)
+        return f'{method} {route}', status
+
+
+class Command(BaseCommand):
+    help = (
+        "Reproduce la mezcla real de peticiones de server.log contra un servidor local "
+        "y reporta throughput y latencias p50/p95/p99 por ruta."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=str(Path(settings.BASE_DIR) / 'server.log'), help="Log de acceso de runserver")
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--requests', type=int, default=2000, help="Total de peticiones a enviar")
+        parser.add_argument('--concurrency', type=int, default=16, help="Usuarios virtuales en paralelo")
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument('--seed', action='store_true', help="Crea la tribu, usuarios y cuentas de prueba en la base local")
+        parser.add_argument('--show-mix', action='store_true', help="Solo muestra la mezcla derivada del log")
+        parser.add_argument('--random-seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        mix = parse_log_mix(options['log'])
+        if not mix:
+            raise CommandError(f"No se encontraron peticiones reproducibles en {options['log']}.")
+
+        total = sum(mix.values())
+        self.stdout.write("Mezcla derivada del log:")
+        for (method, route), count in mix.most_common():
+            self.stdout.write(f"  {count / total:7.2%}  {method:6} {route}")
+        if options['show_mix']:
+            return
+
+        concurrency = options['concurrency']
+        if options['seed']:
+            self.seed(concurrency)
+
+        rng = random.Random(options['random_seed'])
+        replay = replay_mix(mix)
+        routes = list(replay)
+        operations = rng.choices(routes, weights=[replay[route] for route in routes], k=options['requests'])
+
+        updates = mix[('PATCH', '/api/sessions/{id}/')] + mix[('DELETE', '/api/sessions/{id}/')]
+        patch_share = mix[('PATCH', '/api/sessions/{id}/')] / updates if updates else 0.5
+        users = self.virtual_users(options['base_url'], concurrency, options['timeout'], patch_share)
+        failed_logins = sum(user.login() != 200 for user in users)
+        if failed_logins == len(users):
+            raise CommandError("Ningún usuario de prueba pudo iniciar sesión; ejecute con --seed.")
+
+        latencies = defaultdict(list)
+        errors = Counter()
+        lock = threading.Lock()
+
+        def worker(index):
+            user = users[index]
+            for method, route in operations[index::concurrency]:
+                started = time.perf_counter()
+                try:
+                    executed, status = user.run(method, route)
+                except (URLError, OSError):
+                    executed, status = f'{method} {route}', 0
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    latencies[executed].append(elapsed)
+                    if status == 0 or status >= 400:
+                        errors[executed] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(worker, range(concurrency)))
+        wall = time.perf_counter() - started
+
+        # 🔹 Cierra las sesiones que quedaron abiertas para poder repetir la prueba
+        for user in users:
+            if user.session_id is not None:
+                user.request('DELETE', f'/api/sessions/{user.session_id}/')
+
+        self.report(latencies, errors, wall, mix)
+
+    def seed(self, count):
+        tribe, _ = Tribe.objects.get_or_create(name='LoadTest', defaults={'description': 'Datos de prueba de carga'})
+        for index in range(count):
+            username = f'loadtest{index}'
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                user = User.objects.create_user(username, f'{username}@loadtest.local', LOADTEST_PASSWORD, tribe=tribe)
+            Account.objects.get_or_create(
+                name=f'loadtest-account-{index}', defaults={'short_code': f'LT{index}', 'tribe': tribe}
+            )
+            Session.objects.filter(player=user).delete()
+        self.stdout.write(self.style.SUCCESS(f"{count} usuarios y cuentas de prueba listos."))
+
+    def virtual_users(self, base_url, count, timeout, patch_share):
+        accounts = dict(Account.objects.filter(name__startswith='loadtest-account-').values_list('name', 'id'))
+        return [
+            VirtualUser(base_url, f'loadtest{index}', accounts.get(f'loadtest-account-{index}'), timeout, patch_share)
+            for index in range(count)
+        ]
+
+    def report(self, latencies, errors, wall, mix):
+        """Latencias por ruta ejecutada, con su proporción en el log y en la prueba"""
+        sent = sum(len(values) for values in latencies.values())
+        logged = sum(mix.values())
+        self.stdout.write("")
+        self.stdout.write(f"{sent} peticiones en {wall:.2f}s ({sent / wall:.1f} req/s)")
+        self.stdout.write(
+            f"{'ruta':36} {'log':>7} {'real':>7} {'n':>6} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        )
+        for route, values in sorted(latencies.items(), key=lambda entry: -len(entry[1])):
+            values.sort()
+            method, path = route.split(' ', 1)
+            self.stdout.write(
+                f"{route:36} {mix[(method, path)] / logged:>7.1%} {len(values) / sent:>7.1%} {len(values):>6} "
+                f"{errors[route]:>5} {len(values) / wall:>8.1f} "
+                f"{percentile(values, 0.50):>8.1f} {percentile(values, 0.95):>8.1f} {percentile(values, 0.99):>8.1f}"
+            )
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from store.models import PlaytimeRollup, SessionLog
+from store.playtime import record_playtime
+
+
+class Command(BaseCommand):
+    help = "Recalcula los rollups de tiempo jugado a partir de todo el historial de SessionLog"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, chunk_size, **options):
+        logs = SessionLog.objects.only('player_id', 'account_id', 'start_time', 'end_time').order_by('id')
+        total = 0
+        with transaction.atomic():
+            PlaytimeRollup.objects.all().delete()
+            chunk = []
+            for log in logs.iterator(chunk_size=chunk_size):
+                chunk.append(log)
+                if len(chunk) >= chunk_size:
+                    record_playtime(chunk)
+                    total += len(chunk)
+                    chunk = []
+            record_playtime(chunk)
+            total += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f"{total} sesiones procesadas."))
@@ -0,0 +1,224 @@
+"""🔹 Métricas por petición: consultas/tiempo de BD, autenticación, serialización y render.
+
+`PerformanceMiddleware` mide cada petición, agrega `Server-Timing` a la respuesta y
+acumula histogramas por ruta resuelta que `/metrics` expone en formato texto de
+Prometheus. Las métricas son por proceso (cada worker expone las suyas).
+"""
+import hmac
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current_timing = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """Tiempos acumulados de una petición (en segundos)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.auth_time = 0.0
+        self.auth_db_time = 0.0
+        self.view_started = None
+        self.view_finished = None
+        self.view_db_time = 0.0
+        self.render_started = None
+        self.render_time = 0.0
+
+    def record_query(self, execute, sql, params, many, context):
+        """`connection.execute_wrapper`: cuenta y cronometra cada consulta"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.db_queries += 1
+
+    @property
+    def serialize_time(self):
+        """Tiempo de la vista sin BD ni autenticación (en DRF es casi todo serialización)"""
+        if self.view_started is None or self.view_finished is None:
+            return 0.0
+        view_time = self.view_finished - self.view_started
+        return max(0.0, view_time - self.auth_time - (self.view_db_time - self.auth_db_time))
+
+
+@contextmanager
+def timed_authentication():
+    """Acumula el tiempo de autenticación en la petición en curso (si se está midiendo)"""
+    timing = _current_timing.get()
+    if timing is None:
+        yield
+        return
+    started, db_before = time.perf_counter(), timing.db_time
+    try:
+        yield
+    finally:
+        timing.auth_time += time.perf_counter() - started
+        timing.auth_db_time += timing.db_time - db_before
+
+
+class MetricsRegistry:
+    """Histogramas de latencia y contadores por (ruta, método)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = defaultdict(lambda: {
+            'buckets': [0] * len(LATENCY_BUCKETS),
+            'count': 0,
+            'sum': 0.0,
+            'db_queries': 0,
+            'db_seconds': 0.0,
+            'auth_seconds': 0.0,
+            'serialize_seconds': 0.0,
+            'render_seconds': 0.0,
+        })
+        self.statuses = defaultdict(int)
+
+    def observe(self, route, method, status, total, timing):
+        with self.lock:
+            series = self.series[(route, method)]
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if total <= bound:
+                    series['buckets'][index] += 1
+            series['count'] += 1
+            series['sum'] += total
+            series['db_queries'] += timing.db_queries
+            series['db_seconds'] += timing.db_time
+            series['auth_seconds'] += timing.auth_time
+            series['serialize_seconds'] += timing.serialize_time
+            series['render_seconds'] += timing.render_time
+            self.statuses[(route, method, status)] += 1
+
+    def render(self):
+        """Exposición en formato texto de Prometheus (versión 0.0.4)"""
+        with self.lock:
+            series = {key: {**value, 'buckets': list(value['buckets'])} for key, value in self.series.items()}
+            statuses = dict(self.statuses)
+
+        lines = [
+            '# HELP tps_request_duration_seconds Latencia total de la petición.',
+            '# TYPE tps_request_duration_seconds histogram',
+        ]
+        for (route, method), values in sorted(series.items()):
+            labels = f'route="{_escape(route)}",method="{method}"'
+            for bound, count in zip(LATENCY_BUCKETS, values['buckets']):
+                lines.append(f'tps_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'tps_request_duration_seconds_bucket{{{labels},le="+Inf"}} {values["count"]}')
+            lines.append(f'tps_request_duration_seconds_sum{{{labels}}} {values["sum"]:.6f}')
+            lines.append(f'tps_request_duration_seconds_count{{{labels}}} {values["count"]}')
+
+        for name, field, help_text in (
+            ('tps_request_db_queries_total', 'db_queries', 'Consultas SQL ejecutadas.'),
+            ('tps_request_db_seconds_total', 'db_seconds', 'Tiempo en la base de datos.'),
+            ('tps_request_auth_seconds_total', 'auth_seconds', 'Tiempo de autenticación.'),
+            ('tps_request_serialize_seconds_total', 'serialize_seconds', 'Tiempo de vista/serialización sin BD.'),
+            ('tps_request_render_seconds_total', 'render_seconds', 'Tiempo de render de la respuesta.'),
+        ):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for (route, method), values in sorted(series.items()):
+                value = values[field]
+                value = f'{value:.6f}' if isinstance(value, float) else value
+                lines.append(f'{name}{{route="{_escape(route)}",method="{method}"}} {value}')
+
+        lines.append('# HELP tps_requests_total Peticiones por código de estado.')
+        lines.append('# TYPE tps_requests_total counter')
+        for (route, method, status), count in sorted(statuses.items()):
+            lines.append(f'tps_requests_total{{route="{_escape(route)}",method="{method}",status="{status}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def route_label(request):
+    """Ruta resuelta legible: `api/^sessions/(?P<pk>[^/.]+)/$` -> `api/sessions/{pk}/`"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.route:
+        return 'unmatched'
+    route = re.sub(r'\(\?P<(\w+)>[^)]*\)', r'{\1}', match.route)
+    return route.replace('^', '').replace('$', '').replace('\\.', '.')
+
+
+class PerformanceMiddleware:
+    """🔹 Mide cada petición y agrega `Server-Timing` (db, auth, serialize, render, total)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = RequestTiming()
+        token = _current_timing.set(timing)
+        try:
+            with connection.execute_wrapper(timing.record_query):
+                response = self.get_response(request)
+        finally:
+            _current_timing.reset(token)
+
+        if timing.view_started is not None and timing.view_finished is None:
+            timing.view_finished = time.perf_counter()
+            timing.view_db_time = timing.db_time
+        total = time.perf_counter() - timing.started
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timing.db_time * 1000:.1f};desc="{timing.db_queries} queries"',
+            f'auth;dur={timing.auth_time * 1000:.1f}',
+            f'serialize;dur={timing.serialize_time * 1000:.1f}',
+            f'render;dur={timing.render_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+        registry.observe(route_label(request), request.method, response.status_code, total, timing)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = _current_timing.get()
+        if timing is not None:
+            timing.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        """Las respuestas DRF se renderizan después de la vista: aquí empieza el render"""
+        timing = _current_timing.get()
+        if timing is not None:
+            timing.view_finished = timing.render_started = time.perf_counter()
+            timing.view_db_time = timing.db_time
+            response.add_post_render_callback(lambda rendered: self._render_finished(timing))
+        return response
+
+    @staticmethod
+    def _render_finished(timing):
+        timing.render_time = time.perf_counter() - timing.render_started
+
+
+def _may_scrape(request):
+    """🔹 Staff con sesión iniciada o `Authorization: Bearer <METRICS_TOKEN>`"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated and user.is_staff:
+        return True
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    header = request.headers.get('Authorization', '')
+    if not token or not header.startswith('Bearer '):
+        return False
+    return hmac.compare_digest(header[len('Bearer '):].encode(), str(token).encode())
+
+
+def metrics_view(request):
+    """🔹 `/metrics` en formato de texto de Prometheus (rutas y latencias no son públicas)"""
+    if not _may_scrape(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
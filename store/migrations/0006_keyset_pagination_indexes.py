@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0005_alter_price_amount_alter_price_item_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['name', 'id'], name='item_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salepost',
+            index=models.Index(fields=['is_for_sale', '-id'], name='salepost_for_sale_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sessionlog',
+            index=models.Index(fields=['-end_time', '-id'], name='sessionlog_end_time_id_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_playtimerollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='genetic',
+            index=models.Index(fields=['dino', 'health_base', 'id'], name='gen_dino_health_base_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genetic',
+            index=models.Index(fields=['dino', 'health_mutates', 'id'], name='gen_dino_health_mut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genetic',
+            index=models.Index(fields=['dino', 'stamina_base', 'id'], name='gen_dino_stamina_base_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genetic',
+            index=models.Index(fields=['dino', 'stamina_mutates', 'id'], name='gen_dino_stamina_mut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genetic',
+            index=models.Index(fields=['dino', 'oxygen_base', 'id'], name='gen_dino_oxygen_base_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genetic',
+            index=models.Index(fields=['dino', 'oxygen_mutates', 'id'], name='gen_dino_oxygen_mut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genetic',
+            index=models.Index(fields=['dino', 'food_base', 'id'], name='gen_dino_food_base_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genetic',
+            index=models.Index(fields=['dino', 'food_mutates', 'id'], name='gen_dino_food_mut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genetic',
+            index=models.Index(fields=['dino', 'weight_base', 'id'], name='gen_dino_weight_base_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genetic',
+            index=models.Index(fields=['dino', 'weight_mutates', 'id'], name='gen_dino_weight_mut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genetic',
+            index=models.Index(fields=['dino', 'damage_base', 'id'], name='gen_dino_damage_base_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genetic',
+            index=models.Index(fields=['dino', 'damage_mutates', 'id'], name='gen_dino_damage_mut_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:10
+
+from django.db import migrations, models
+
+
+def dedupe_open_sessions(apps, schema_editor):
+    """Deja los datos válidos para las restricciones: por cuenta se conserva la sesión más
+    reciente (las demás se borran) y por jugador solo la más reciente queda activa"""
+    Session = apps.get_model('store', 'Session')
+    newer = Session.objects.filter(account_id=models.OuterRef('account_id'), id__gt=models.OuterRef('id'))
+    Session.objects.filter(models.Exists(newer)).delete()
+
+    newer_active = Session.objects.filter(player_id=models.OuterRef('player_id'), is_active=True, id__gt=models.OuterRef('id'))
+    Session.objects.filter(models.Exists(newer_active), is_active=True).update(is_active=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0008_genetic_stat_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_open_sessions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='session',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('player',), name='unique_active_session_per_player'),
+        ),
+        migrations.AddConstraint(
+            model_name='session',
+            constraint=models.UniqueConstraint(fields=('account',), name='unique_session_per_account'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_account_tribe(apps, schema_editor):
+    """Llena `SessionLog.tribe` con la tribu de la cuenta (un solo UPDATE)"""
+    Account = apps.get_model('store', 'Account')
+    SessionLog = apps.get_model('store', 'SessionLog')
+    SessionLog.objects.update(
+        tribe_id=models.Subquery(Account.objects.filter(pk=models.OuterRef('account_id')).values('tribe_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0009_session_start_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessionlog',
+            name='tribe',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='store.tribe'),
+        ),
+        migrations.RunPython(copy_account_tribe, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='account',
+            index=models.Index(fields=['tribe', 'id'], name='account_tribe_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='combo',
+            index=models.Index(fields=['tribe', 'id'], name='combo_tribe_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genetic',
+            index=models.Index(fields=['tribe', 'id'], name='genetic_tribe_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genetic',
+            index=models.Index(fields=['tribe', 'dino', 'id'], name='genetic_tribe_dino_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sessionlog',
+            index=models.Index(fields=['tribe', '-end_time', '-id'], name='sessionlog_tribe_end_id_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0010_tribe_scoped_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='salepost',
+            index=models.Index(fields=['is_for_sale', 'payment_method', '-id'], name='salepost_sale_payment_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salepost',
+            index=models.Index(fields=['is_for_sale', 'price_amount', 'id'], name='salepost_sale_price_id_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0011_salepost_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='genetic',
+            name='father',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='children_as_father', to='store.genetic'),
+        ),
+        migrations.AddField(
+            model_name='genetic',
+            name='mother',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='children_as_mother', to='store.genetic'),
+        ),
+        migrations.CreateModel(
+            name='GeneticLineage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='store.genetic')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='store.genetic')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='lineage_descendant_depth_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='unique_genetic_lineage')],
+            },
+        ),
+    ]
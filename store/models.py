@@ -65,6 +65,11 @@ class Item(models.Model):
     stack = models.PositiveIntegerField(default=1)  # Cantidad máxima de stack
     image = models.ImageField(upload_to='items/', blank=True, null=True)  # Campo para la imagen
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', 'id'], name='item_name_id_idx'),  # 🔹 Paginación por cursor
+        ]
+
     def __str__(self):
         return f"{self.name} (Stack: {self.stack})"
 
@@ -151,11 +156,20 @@ class Dino(models.Model):
         return self.fullname  # Esto mostrará el nombre completo del dino
 
 
+# 🔹 Estadísticas de `Genetic`: cada una tiene columna `<stat>_base` y `<stat>_mutates`
+GENETIC_STATS = ['health', 'stamina', 'oxygen', 'food', 'weight', 'damage']
+GENETIC_STAT_FIELDS = [f"{stat}_{kind}" for stat in GENETIC_STATS for kind in ('base', 'mutates')]
+
+
 class Genetic(models.Model):
     """ 🔹 Modelo de Genética de Dinosaurios (solo para registros, sin venta) """
     dino = models.ForeignKey("Dino", on_delete=models.CASCADE)
     tribe = models.ForeignKey("Tribe", on_delete=models.CASCADE)
 
+    # 🔹 Padres opcionales (mismo dino); el linaje completo está en `GeneticLineage`
+    mother = models.ForeignKey("self", null=True, blank=True, on_delete=models.SET_NULL, related_name="children_as_mother")
+    father = models.ForeignKey("self", null=True, blank=True, on_delete=models.SET_NULL, related_name="children_as_father")
+
     # 📌 Estadísticas con Base y Mutaciones
     health_base = models.IntegerField()
     health_mutates = models.IntegerField(default=0)
@@ -175,10 +189,43 @@ class Genetic(models.Model):
     damage_base = models.IntegerField()
     damage_mutates = models.IntegerField(default=0)
 
+    class Meta:
+        # 🔹 Búsquedas por umbral dentro de un dino ("Rex con health_base >= 45"), ordenables por la stat
+        indexes = [
+            models.Index(fields=['dino', field, 'id'], name=f"gen_dino_{field.replace('mutates', 'mut')}_idx")
+            for field in GENETIC_STAT_FIELDS
+        ] + [
+            # 🔹 Genéticas de una tribu (paginación por id), opcionalmente de un dino
+            models.Index(fields=['tribe', 'id'], name='genetic_tribe_id_idx'),
+            models.Index(fields=['tribe', 'dino', 'id'], name='genetic_tribe_dino_id_idx'),
+        ]
+
     def __str__(self):
         return f"{self.dino.fullname} - {self.tribe.name}"
 
 
+class GeneticLineage(models.Model):
+    """ 🔹 Tabla de clausura del linaje: una fila por cada par (ancestro, descendiente).
+
+    `depth` es la distancia mínima en generaciones (1 = padre o madre). Se mantiene desde
+    `store.lineage` al guardar o borrar genéticas.
+    """
+    ancestor = models.ForeignKey(Genetic, on_delete=models.CASCADE, related_name="descendant_links")
+    descendant = models.ForeignKey(Genetic, on_delete=models.CASCADE, related_name="ancestor_links")
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='unique_genetic_lineage'),
+        ]
+        indexes = [
+            models.Index(fields=['descendant', 'depth'], name='lineage_descendant_depth_idx'),  # 🔹 Ancestros
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
+
 class SalePost(models.Model):
     """ 🔹 Publicaciones de Venta de Genéticas """
     PAYMENT_METHODS = [
@@ -199,6 +246,14 @@ class SalePost(models.Model):
     item_payment = models.ForeignKey("Item", null=True, blank=True, on_delete=models.SET_NULL)
     price_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_for_sale', '-id'], name='salepost_for_sale_id_idx'),  # 🔹 Paginación por cursor
+            # 🔹 Búsqueda del mercado: filtro por método de pago y orden por precio
+            models.Index(fields=['is_for_sale', 'payment_method', '-id'], name='salepost_sale_payment_id_idx'),
+            models.Index(fields=['is_for_sale', 'price_amount', 'id'], name='salepost_sale_price_id_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} - {self.tribe.name}"
 
@@ -210,6 +265,11 @@ class Combo(models.Model):
     is_available = models.BooleanField(default=True)
     is_for_sale = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['tribe', 'id'], name='combo_tribe_id_idx'),  # 🔹 Combos de una tribu
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.tribe.name}"
 
@@ -241,6 +301,11 @@ class Account(models.Model):
     short_code = models.CharField(max_length=10, unique=True)
     tribe = models.ForeignKey(Tribe, on_delete=models.CASCADE, related_name="accounts")  # Relación con Tribe
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['tribe', 'id'], name='account_tribe_id_idx'),  # 🔹 Cuentas de una tribu
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.short_code})"
 
@@ -266,6 +331,15 @@ class Session(models.Model):
     afk_text = models.CharField(max_length=100, blank=True, null=True)
     is_active = models.BooleanField(default=True)  # 🔹 Nueva columna
 
+    class Meta:
+        # 🔹 La base de datos garantiza las reglas de inicio de sesión (sin carreras entre peticiones)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['player'], condition=models.Q(is_active=True), name='unique_active_session_per_player'
+            ),
+            models.UniqueConstraint(fields=['account'], name='unique_session_per_account'),
+        ]
+
     def __str__(self):
         return f"{self.player.username} - {self.account.name} ({self.status})"
 
@@ -277,6 +351,39 @@ class SessionLog(models.Model):
     start_time = models.DateTimeField()
     end_time = models.DateTimeField()
     duration = models.DurationField()
+    tribe = models.ForeignKey(Tribe, on_delete=models.CASCADE, null=True, blank=True)  # 🔹 Copia de `account.tribe` para filtrar sin JOIN
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-end_time', '-id'], name='sessionlog_end_time_id_idx'),  # 🔹 Paginación por cursor
+            models.Index(fields=['tribe', '-end_time', '-id'], name='sessionlog_tribe_end_id_idx'),  # 🔹 Historial por tribu
+        ]
+
+    def save(self, *args, **kwargs):
+        """🔹 Asigna la tribu de la cuenta si no está definida"""
+        if self.tribe_id is None and self.account_id:
+            self.tribe_id = Account.objects.filter(pk=self.account_id).values_list('tribe_id', flat=True).first()
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.player.username} - {self.account.name} ({self.duration})"
+
+
+class PlaytimeRollup(models.Model):
+    """ 🔹 Tiempo jugado acumulado por jugador, cuenta y día (se actualiza al cerrar sesiones) """
+    player = models.ForeignKey(User, on_delete=models.CASCADE)
+    account = models.ForeignKey('Account', on_delete=models.CASCADE)
+    day = models.DateField()
+    duration = models.DurationField()
+    sessions = models.PositiveIntegerField(default=0)  # 🔹 Sesiones (o tramos de sesión) de ese día
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['player', 'account', 'day'], name='unique_playtime_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='playtime_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.player.username} - {self.account.name} {self.day} ({self.duration})"
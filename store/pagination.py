@@ -0,0 +1,194 @@
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _cursor_value(value):
+    """Serializa fechas con isoformat completo (DjangoJSONEncoder recorta los microsegundos
+    y rompería los empates) y decimales como texto"""
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+class KeysetPagination(BasePagination):
+    """🔹 Paginación por cursor (keyset) sobre una clave ordenada y estable.
+
+    El cursor guarda los valores de `ordering` de la última fila entregada y la
+    siguiente página se obtiene con `WHERE (a, b) > (x, y)`, así el costo no crece
+    con la profundidad (a diferencia de OFFSET). El último campo debe ser único (id).
+    Los campos que admiten NULL se ordenan con los NULL al final en ambas direcciones.
+
+    Es opcional: sin `?cursor=` ni `?page_size=` la lista se responde completa como un
+    arreglo (igual que antes, en el mismo orden). Con cualquiera de los dos se responde
+    `{"next", "results"}` con páginas de `page_size` filas (50 por defecto, máximo 500).
+
+    Para tablas que crecen sin límite, `unpaginated_limit` acota el arreglo sin paginar:
+    se entregan esas filas y la cabecera `Link: <…>; rel="next"` lleva el cursor del resto.
+    """
+    ordering = ('-id',)
+    page_size = 50
+    max_page_size = 500
+    unpaginated_limit = None
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def get_ordering(self, view):
+        """La vista puede definir `get_keyset_ordering()` para ordenar según la petición"""
+        if hasattr(view, 'get_keyset_ordering'):
+            return view.get_keyset_ordering() or self.ordering
+        return self.ordering
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def is_requested(self, request):
+        """El cliente pide paginación con `?cursor=` o `?page_size=`"""
+        return self.cursor_query_param in request.query_params or self.page_size_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.model = queryset.model
+        self.annotations = queryset.query.annotations
+        self.current_ordering = self.get_ordering(view)
+        self.paginated = self.is_requested(request)
+
+        queryset = queryset.order_by(*self.order_by())
+        self.next_position = None
+        if not self.paginated:
+            if self.unpaginated_limit is None:
+                return list(queryset)  # 🔹 Sin paginación: todas las filas, mismo orden
+            page_size = self.unpaginated_limit
+        else:
+            page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+
+        results = list(queryset[:page_size + 1])  # 🔹 Una fila extra indica si hay otra página
+        page = results[:page_size]
+        self.next_position = self.position_of(page[-1]) if len(results) > page_size else None
+        return page
+
+    def get_paginated_response(self, data):
+        if not self.paginated:
+            next_link = self.get_next_link()
+            return Response(data, headers={'Link': f'<{next_link}>; rel="next"'} if next_link else None)
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    # 🔹 Cursor
+
+    def field_names(self):
+        return [name.lstrip('-') for name in self.current_ordering]
+
+    def model_field(self, name):
+        """Campo del modelo o, si `name` es una anotación (ej. una stat de la genética), su `output_field`"""
+        try:
+            return self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return self.annotations[name].output_field
+
+    def order_by(self):
+        """`ordering` como expresiones; los campos con NULL van con `nulls_last`"""
+        expressions = []
+        for ordering in self.current_ordering:
+            name = ordering.lstrip('-')
+            if not self.model_field(name).null:
+                expressions.append(ordering)
+            elif ordering.startswith('-'):
+                expressions.append(F(name).desc(nulls_last=True))
+            else:
+                expressions.append(F(name).asc(nulls_last=True))
+        return expressions
+
+    def position_of(self, instance):
+        return [
+            getattr(instance, name if name in self.annotations else self.model._meta.get_field(name).attname)
+            for name in self.field_names()
+        ]
+
+    def encode_cursor(self, position):
+        """🔹 El cursor lleva el orden con que se generó: no sirve para otro `?ordering=`"""
+        raw = json.dumps({'o': list(self.current_ordering), 'v': position}, default=_cursor_value, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            cursor = json.loads(raw)
+            values = cursor['v']
+            names = self.field_names()
+            if cursor['o'] != list(self.current_ordering) or not isinstance(values, list) or len(values) != len(names):
+                raise ValueError
+            return [self.model_field(name).to_python(value) for name, value in zip(names, values)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def after(self, position):
+        """Construye `(a, b, c) > (x, y, z)` respetando la dirección de cada campo.
+
+        Con NULL al final: después de un valor vienen los mayores y luego los NULL;
+        después de un NULL solo otros NULL (desempatados por los campos siguientes).
+        """
+        condition = Q()
+        equal = Q()
+        for ordering, value in zip(self.current_ordering, position):
+            name = ordering.lstrip('-')
+            lookup = 'lt' if ordering.startswith('-') else 'gt'
+            if value is None:
+                equal &= Q(**{f'{name}__isnull': True})
+                continue
+            later = Q(**{f'{name}__{lookup}': value})
+            if self.model_field(name).null:
+                later |= Q(**{f'{name}__isnull': True})
+            condition |= equal & later
+            equal &= Q(**{name: value})
+        return condition
+
+
+class SessionLogPagination(KeysetPagination):
+    ordering = ('-end_time', '-id')  # 🔹 Historial: lo más reciente primero
+    unpaginated_limit = 500  # 🔹 El historial crece siempre: sin `?page_size=` solo lo más reciente
+
+
+class ItemPagination(KeysetPagination):
+    ordering = ('name', 'id')  # 🔹 Orden alfabético
+
+
+class GeneticPagination(KeysetPagination):
+    ordering = ('id',)
+
+
+class SalePostPagination(KeysetPagination):
+    ordering = ('-id',)  # 🔹 Publicaciones más nuevas primero
@@ -0,0 +1,56 @@
+"""🔹 Rollups de tiempo jugado por (jugador, cuenta, día), mantenidos al cerrar sesiones."""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PlaytimeRollup
+
+
+def split_by_day(start_time, end_time):
+    """Divide `[start_time, end_time)` en tramos `(día, duración)` cortando a medianoche (hora local)"""
+    current = timezone.localtime(start_time)
+    end_time = timezone.localtime(end_time)
+    while current < end_time:
+        next_midnight = timezone.make_aware(datetime.combine(current.date() + timedelta(days=1), time.min))
+        segment_end = min(next_midnight, end_time)
+        yield current.date(), segment_end - current
+        current = segment_end
+
+
+def record_playtime(logs):
+    """🔹 Suma los `SessionLog` dados a sus rollups con un número constante de consultas.
+
+    Acepta cualquier objeto con `player_id`, `account_id`, `start_time` y `end_time`.
+    """
+    totals = defaultdict(lambda: [timedelta(0), 0])
+    for log in logs:
+        for day, duration in split_by_day(log.start_time, log.end_time):
+            entry = totals[(log.player_id, log.account_id, day)]
+            entry[0] += duration
+            entry[1] += 1
+    if not totals:
+        return
+
+    player_ids, account_ids, days = (set(values) for values in zip(*totals))
+    with transaction.atomic():
+        # 🔹 Primero se aseguran las filas (INSERT ... ON CONFLICT DO NOTHING): dos cierres
+        # simultáneos del primer tramo de un día no chocan con la restricción única
+        PlaytimeRollup.objects.bulk_create([
+            PlaytimeRollup(player_id=player_id, account_id=account_id, day=day, duration=timedelta(0), sessions=0)
+            for player_id, account_id, day in totals
+        ], ignore_conflicts=True)
+
+        existing = PlaytimeRollup.objects.select_for_update().filter(
+            player_id__in=player_ids, account_id__in=account_ids, day__in=days
+        )
+        to_update = []
+        for rollup in existing:
+            key = (rollup.player_id, rollup.account_id, rollup.day)
+            if key in totals:
+                duration, sessions = totals[key]
+                rollup.duration += duration
+                rollup.sessions += sessions
+                to_update.append(rollup)
+        PlaytimeRollup.objects.bulk_update(to_update, ['duration', 'sessions'])
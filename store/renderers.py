@@ -0,0 +1,52 @@
+"""🔹 Renderer y parser JSON de alto rendimiento basados en `orjson`.
+
+Producen el mismo JSON que los de DRF (los tipos que `orjson` no conoce, como `Decimal`,
+pasan por el `JSONEncoder` de DRF). Si `orjson` no está instalado se usa el módulo `json`
+de DRF sin cambios.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+_default = JSONEncoder().default  # 🔹 Decimal, fechas, timedelta, QuerySet, textos perezosos, etc.
+
+
+class ORJSONRenderer(JSONRenderer):
+    """`JSONRenderer` de DRF con `orjson.dumps` (varias veces más rápido en listas grandes)"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        # 🔹 Las fechas pasan por DRF para conservar su formato (milisegundos y `Z`)
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            option |= orjson.OPT_INDENT_2  # 🔹 `orjson` solo indenta con 2 espacios
+        ret = orjson.dumps(data, default=_default, option=option)
+
+        # 🔹 Igual que DRF: U+2028/U+2029 escapados para que el JSON sea JavaScript válido
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    """`JSONParser` de DRF con `orjson.loads`"""
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
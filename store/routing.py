@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .consumers import SessionConsumer
+
+websocket_urlpatterns = [
+    path('ws/sessions/', SessionConsumer.as_asgi()),
+]
@@ -1,6 +1,31 @@
+from collections import defaultdict
+
 from rest_framework import serializers
 from .models import Price, Tribe, User, Item, Dino, Genetic, Combo, ComboDetail, Account, Session, SessionLog, Recipe, RecipeIngredient, Blueprint, BlueprintMaterial, SalePost
 from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from .breeding import DEFAULT_OFFSPRING, MAX_OFFSPRING, MAX_PAIRS
+from .images import variant_urls
+from .lineage import creates_cycle
+
+
+class ImageVariantsField(serializers.Field):
+    """ 🔹 URLs de las miniaturas de una imagen: {"thumb": ..., "small": ..., "medium": ...} """
+
+    def __init__(self, variant=None, **kwargs):
+        self.variant = variant  # 🔹 Si se indica, retorna solo la URL de esa variante
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, image):
+        if not image:
+            return None
+        request = self.context.get('request')
+        urls = {
+            variant: request.build_absolute_uri(url) if request else url
+            for variant, url in variant_urls(image).items()
+        }
+        return urls[self.variant] if self.variant else urls
 
 class TribeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -44,16 +69,17 @@ class UserSerializer(serializers.ModelSerializer):
 
 class DinoSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField(source='image')
     
     class Meta:
         model = Dino
-        fields = ['id', 'fullname', 'name', 'image', 'image_url', 'category', 'egg_type']
+        fields = ['id', 'fullname', 'name', 'image', 'image_url', 'image_variants', 'category', 'egg_type']
 
     def get_image_url(self, obj):
-        """ Retorna la URL completa de la imagen """
+        """ Retorna la URL completa de la imagen (relativa sin `request`, ej. en el snapshot) """
         if obj.image:
             request = self.context.get('request')
-            return request.build_absolute_uri(obj.image.url)
+            return request.build_absolute_uri(obj.image.url) if request else obj.image.url
         return None
 
 
@@ -64,7 +90,7 @@ class GeneticSerializer(serializers.ModelSerializer):
     class Meta:
         model = Genetic
         fields = [
-            'id', 'dino', 'dino_name', 'tribe', 'tribe_name',
+            'id', 'dino', 'dino_name', 'tribe', 'tribe_name', 'mother', 'father',
             'health_base', 'health_mutates',
             'stamina_base', 'stamina_mutates',
             'oxygen_base', 'oxygen_mutates',
@@ -73,12 +99,40 @@ class GeneticSerializer(serializers.ModelSerializer):
             'damage_base', 'damage_mutates',
         ]
 
-    def get_item_payment_image(self, obj):
-        """ 🔹 Retorna la URL de la imagen del item de pago si existe """
-        if obj.item_payment and obj.item_payment.image:
-            request = self.context.get('request')
-            return request.build_absolute_uri(obj.item_payment.image.url)
-        return None
+    def get_fields(self):
+        """ 🔹 Solo se pueden elegir como padres genéticas de la tribu del usuario (superusuarios: todas) """
+        fields = super().get_fields()
+        user = getattr(self.context.get('request'), 'user', None)
+        if user is not None and not user.is_superuser:
+            tribe_id = user.tribe_id if user.is_authenticated else None
+            visible = Genetic.objects.filter(tribe_id=tribe_id) if tribe_id else Genetic.objects.none()
+            for name in ('mother', 'father'):
+                fields[name].queryset = visible
+        return fields
+
+    def validate(self, data):
+        """ Los padres deben ser del mismo dino, distintos entre sí y no descendientes de la genética """
+        def current(field):
+            return data[field] if field in data else getattr(self.instance, field, None)
+
+        mother, father, dino = current('mother'), current('father'), current('dino')
+        if mother and father and mother.id == father.id:
+            raise serializers.ValidationError({"father": "La madre y el padre deben ser genéticas distintas."})
+        for field, parent in (('mother', mother), ('father', father)):
+            if parent and dino and parent.dino_id != dino.id:
+                raise serializers.ValidationError({field: "Debe ser una genética del mismo dino."})
+        if self.instance and creates_cycle(self.instance.id, [parent.id for parent in (mother, father) if parent]):
+            raise serializers.ValidationError({"detail": "Los padres no pueden ser la genética ni uno de sus descendientes."})
+        return data
+
+
+class GeneticLineageSerializer(GeneticSerializer):
+    """ Genética de un linaje con su distancia en generaciones (`depth`) """
+    depth = serializers.IntegerField(read_only=True)
+
+    class Meta(GeneticSerializer.Meta):
+        fields = GeneticSerializer.Meta.fields + ['depth']
+
 
 class SalePostSerializer(serializers.ModelSerializer):
     genetic_data = GeneticSerializer(source='genetic', read_only=True)
@@ -91,13 +145,32 @@ class SalePostSerializer(serializers.ModelSerializer):
             'is_for_sale', 'payment_method', 'item_payment', 'price_amount'
         ]
 
+class ComboItemField(serializers.PrimaryKeyRelatedField):
+    """ 🔹 Item por ID; al escribir un combo usa los items precargados por `ComboSerializer` (una consulta) """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('queryset', Item.objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        items = self.context.get('combo_items')
+        if items is not None and not isinstance(data, bool):
+            try:
+                return items[int(data)]
+            except (KeyError, TypeError, ValueError):
+                pass  # 🔹 El error estándar lo genera la validación normal
+        return super().to_internal_value(data)
+
+
 class PriceSerializer(serializers.ModelSerializer):
+    item = ComboItemField(required=False, allow_null=True)
     item_name = serializers.CharField(source="item.name", read_only=True)
     item_image = serializers.ImageField(source="item.image", read_only=True)
+    item_thumbnail = ImageVariantsField(source="item.image", variant="thumb")
 
     class Meta:
         model = Price
-        fields = ["id", "type", "amount", "item", "item_name", "item_image", "quantity"]
+        fields = ["id", "type", "amount", "item", "item_name", "item_image", "item_thumbnail", "quantity"]
 
     def validate(self, data):
         """ Validar que Coins tenga amount y que Item tenga quantity e item """
@@ -111,14 +184,59 @@ class PriceSerializer(serializers.ModelSerializer):
 
 
 class ComboDetailSerializer(serializers.ModelSerializer):
-    item = serializers.PrimaryKeyRelatedField(queryset=Item.objects.all())  # ✅ Solo acepta el ID
+    item = ComboItemField()  # ✅ Solo acepta el ID
     item_name = serializers.CharField(source="item.name", read_only=True)
     item_image = serializers.ImageField(source="item.image", read_only=True)
+    item_thumbnail = ImageVariantsField(source="item.image", variant="thumb")
 
     class Meta:
         model = ComboDetail
-        fields = ["id", "item", "item_name", "item_image", "quantity"]
+        fields = ["id", "item", "item_name", "item_image", "item_thumbnail", "quantity"]
+
+
+
+def _detail_rows(details_data):
+    """ Filas de `ComboDetail` con los nombres de columna del modelo """
+    return [{"item_id": detail["item"].id, "quantity": detail["quantity"]} for detail in details_data]
+
+
+def _price_rows(prices_data):
+    """ Filas de `Price`: Item usa item/cantidad, Coins usa monto """
+    return [
+        {"type": price["type"], "item_id": price["item"].id, "quantity": price["quantity"], "amount": None}
+        if price["type"] == "Item" else
+        {"type": price["type"], "item_id": None, "quantity": None, "amount": price["amount"]}
+        for price in prices_data
+    ]
+
+
+def _sync_children(model, combo, existing, rows, key):
+    """ 🔹 Aplica la diferencia entre las filas actuales y las nuevas con operaciones masivas.
+
+    Las filas se emparejan por `key` (ej. el item); las que no cambian conservan su id.
+    """
+    pool = defaultdict(list)
+    for obj in sorted(existing, key=lambda obj: obj.id):
+        pool[tuple(getattr(obj, field) for field in key)].append(obj)
+
+    to_create, to_update = [], []
+    for values in rows:
+        matches = pool.get(tuple(values[field] for field in key))
+        if not matches:
+            to_create.append(model(combo=combo, **values))
+            continue
+        obj = matches.pop(0)
+        if any(getattr(obj, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(obj, field, value)
+            to_update.append(obj)
 
+    to_delete = [obj.id for objs in pool.values() for obj in objs]
+    if to_delete:
+        model.objects.filter(id__in=to_delete).delete()
+    if to_update:
+        model.objects.bulk_update(to_update, list(rows[0]))
+    model.objects.bulk_create(to_create)
 
 
 class ComboSerializer(serializers.ModelSerializer):
@@ -129,28 +247,35 @@ class ComboSerializer(serializers.ModelSerializer):
         model = Combo
         fields = ["id", "name", "description", "tribe", "is_available", "is_for_sale", "prices", "details"]
 
+    def to_internal_value(self, data):
+        """ Precarga en una consulta los items de todos los detalles y precios """
+        item_ids = set()
+        for key in ("details", "prices"):
+            rows = data.get(key) if hasattr(data, "get") else None
+            for row in rows if isinstance(rows, list) else []:
+                item = row.get("item") if isinstance(row, dict) else None
+                if isinstance(item, int) or (isinstance(item, str) and item.isdigit()):
+                    item_ids.add(int(item))
+        self.context["combo_items"] = Item.objects.in_bulk(item_ids) if item_ids else {}
+        return super().to_internal_value(data)
+
+    @transaction.atomic
     def create(self, validated_data):
         prices_data = validated_data.pop("prices", [])
         details_data = validated_data.pop("details", [])
 
         combo = Combo.objects.create(**validated_data)
 
-        # ✅ Guardar detalles correctamente con solo el ID del item
-        for detail in details_data:
-            ComboDetail.objects.create(combo=combo, item_id=detail["item"].id, quantity=detail["quantity"])
-
-        # ✅ Guardar precios correctamente con solo el ID del item
-        for price in prices_data:
-            if price["type"] == "Item":
-                Price.objects.create(combo=combo, type=price["type"], item_id=price["item"].id, quantity=price["quantity"])
-            else:
-                Price.objects.create(combo=combo, type=price["type"], amount=price["amount"])
+        # ✅ Un INSERT por tabla para todos los detalles y precios
+        ComboDetail.objects.bulk_create([ComboDetail(combo=combo, **row) for row in _detail_rows(details_data)])
+        Price.objects.bulk_create([Price(combo=combo, **row) for row in _price_rows(prices_data)])
 
         return combo
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        prices_data = validated_data.pop("prices", [])
-        details_data = validated_data.pop("details", [])
+        prices_data = validated_data.pop("prices", None)
+        details_data = validated_data.pop("details", None)
 
         instance.name = validated_data.get("name", instance.name)
         instance.description = validated_data.get("description", instance.description)
@@ -158,22 +283,15 @@ class ComboSerializer(serializers.ModelSerializer):
         instance.is_for_sale = validated_data.get("is_for_sale", instance.is_for_sale)
         instance.save()
 
-        instance.details.all().delete()
-        for detail in details_data:
-            ComboDetail.objects.create(combo=instance, item_id=detail["item"], quantity=detail["quantity"])
-
-        instance.prices.all().delete()
-        for price in prices_data:
-            if price["type"] == "Item":
-                Price.objects.create(combo=instance, type=price["type"], item_id=price["item"], quantity=price["quantity"])
-            else:
-                Price.objects.create(combo=instance, type=price["type"], amount=price["amount"])
+        # ✅ Solo se sincronizan las listas enviadas (un PATCH sin `details` no las borra)
+        if details_data is not None:
+            _sync_children(ComboDetail, instance, instance.details.all(), _detail_rows(details_data), key=("item_id",))
+        if prices_data is not None:
+            _sync_children(Price, instance, instance.prices.all(), _price_rows(prices_data), key=("type", "item_id"))
 
         return instance
 
 
-
-
 class AccountSerializer(serializers.ModelSerializer):
     class Meta:
         model = Account
@@ -208,20 +326,22 @@ class SessionLogSerializer(serializers.ModelSerializer):
 
 class ItemSerializer(serializers.ModelSerializer):
     image = serializers.ImageField(required=False)  # Asegura que se incluya la imagen
+    image_variants = ImageVariantsField(source='image')  # 🔹 Miniaturas para listas y catálogos
 
     class Meta:
         model = Item
-        fields = ['id', 'name', 'description', 'stack', 'image'] 
+        fields = ['id', 'name', 'description', 'stack', 'image', 'image_variants']
 
 
 class RecipeIngredientSerializer(serializers.ModelSerializer):
     item_name = serializers.CharField(source="item.name", read_only=True)
     recipe_name = serializers.CharField(source="recipe.name", read_only=True)
     item_image = serializers.SerializerMethodField()  # 🔹 Nuevo campo para la imagen
+    item_thumbnail = ImageVariantsField(source="item.image", variant="thumb")
 
     class Meta:
         model = RecipeIngredient
-        fields = ['id', 'recipe', 'recipe_name', 'item', 'item_name', 'item_image', 'quantity']
+        fields = ['id', 'recipe', 'recipe_name', 'item', 'item_name', 'item_image', 'item_thumbnail', 'quantity']
 
     def get_item_image(self, obj):
         """ Devuelve la URL de la imagen del ingrediente (si tiene) """
@@ -237,10 +357,11 @@ class RecipeSerializer(serializers.ModelSerializer):
     ingredients = RecipeIngredientSerializer(many=True, read_only=True)
     output_item_name = serializers.CharField(source="output_item.name", read_only=True)
     output_item_image = serializers.ImageField(source="output_item.image", read_only=True)  
+    output_item_thumbnail = ImageVariantsField(source="output_item.image", variant="thumb")
 
     class Meta:
         model = Recipe
-        fields = ['id', 'name', 'description', 'output_item', 'output_item_name', 'output_item_image', 'output_quantity', 'ingredients']
+        fields = ['id', 'name', 'description', 'output_item', 'output_item_name', 'output_item_image', 'output_item_thumbnail', 'output_quantity', 'ingredients']
         read_only_fields = ['name']  # 🔹 Evita que se edite manualmente en la API
 
 
@@ -249,21 +370,70 @@ class RecipeSerializer(serializers.ModelSerializer):
 class BlueprintMaterialSerializer(serializers.ModelSerializer):
     item_name = serializers.CharField(source="item.name", read_only=True)
     item_image = serializers.ImageField(source="item.image", read_only=True)
+    item_thumbnail = ImageVariantsField(source="item.image", variant="thumb")
 
     class Meta:
         model = BlueprintMaterial
-        fields = ['id', 'blueprint', 'item', 'item_name', 'item_image', 'quantity']
+        fields = ['id', 'blueprint', 'item', 'item_name', 'item_image', 'item_thumbnail', 'quantity']
 
 
 class BlueprintSerializer(serializers.ModelSerializer):
     output_item_name = serializers.CharField(source="output_item.name", read_only=True)
     output_item_image = serializers.ImageField(source="output_item.image", read_only=True)
+    output_item_thumbnail = ImageVariantsField(source="output_item.image", variant="thumb")
     name = serializers.SerializerMethodField()
     materials = BlueprintMaterialSerializer(many=True, read_only=True)
 
     class Meta:
         model = Blueprint
-        fields = ['id', 'name', 'description', 'output_item', 'output_item_name', 'output_item_image', 'output_quantity', 'materials']
+        fields = ['id', 'name', 'description', 'output_item', 'output_item_name', 'output_item_image', 'output_item_thumbnail', 'output_quantity', 'materials']
 
     def get_name(self, obj):
-        return f"Blueprint {obj.output_item.name}"
\ No newline at end of file
+        return f"Blueprint {obj.output_item.name}"
+
+
+class PlanTargetSerializer(serializers.Serializer):
+    """ Objetivo del planificador: item a fabricar y cantidad """
+    item = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class SessionBulkEndSerializer(serializers.Serializer):
+    """ Sesiones a finalizar en bloque: por tribu, por jugador o por lista de ids (solo uno) """
+    tribe = serializers.IntegerField(min_value=1, required=False)
+    player = serializers.IntegerField(min_value=1, required=False)
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, required=False)
+
+    def validate(self, data):
+        if len(data) != 1:
+            raise serializers.ValidationError("Indique solo uno de: tribe, player o ids.")
+        return data
+
+
+class BreedingPairSerializer(serializers.Serializer):
+    mother = serializers.IntegerField(min_value=1)
+    father = serializers.IntegerField(min_value=1)
+
+    def validate(self, data):
+        if data["mother"] == data["father"]:
+            raise serializers.ValidationError("La madre y el padre deben ser genéticas distintas.")
+        return data
+
+
+class BreedingSimulationSerializer(serializers.Serializer):
+    """ Parejas a simular y número de crías por pareja (`seed` hace el resultado reproducible) """
+    pairs = BreedingPairSerializer(many=True, allow_empty=False, max_length=MAX_PAIRS)
+    offspring = serializers.IntegerField(min_value=1, max_value=MAX_OFFSPRING, default=DEFAULT_OFFSPRING)
+    seed = serializers.IntegerField(min_value=0, required=False)
+
+
+class CraftingPlanSerializer(serializers.Serializer):
+    targets = PlanTargetSerializer(many=True, allow_empty=False)
+
+    def validate_targets(self, targets):
+        """ Verifica que todos los items existan con una sola consulta """
+        item_ids = {target["item"] for target in targets}
+        missing = item_ids - set(Item.objects.filter(id__in=item_ids).values_list('id', flat=True))
+        if missing:
+            raise serializers.ValidationError(f"Items inexistentes: {sorted(missing)}")
+        return targets
@@ -0,0 +1,193 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .authentication import clear_cached_users, invalidate_cached_users
+from .autocomplete import item_index
+from .bom import invalidate_items
+from .images import generate_variants
+from .lineage import rebuild_lineage
+from .models import Account, Blueprint, BlueprintMaterial, Dino, Genetic, Item, Recipe, RecipeIngredient, Session, Tribe, User
+from .versions import bump_version, catalog_version, get_version
+
+logger = logging.getLogger(__name__)
+
+
+def bump_version_on_commit(name):
+    """🔹 Incrementa la versión al confirmar la transacción (como `broadcast_session_event`).
+
+    Si se incrementara antes, una lectura entre el incremento y el commit guardaría el
+    ETag nuevo con las filas viejas y respondería 304 con datos obsoletos.
+    """
+    transaction.on_commit(lambda: bump_version(name))
+
+
+@receiver([post_save, post_delete], sender=Session)
+def bump_session_version(sender, **kwargs):
+    bump_version_on_commit("session")
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, update_fields=None, **kwargs):
+    """Solo `username` (`user_name`) se muestra en la lista de sesiones; `last_login` y demás no la invalidan"""
+    instance._session_previous_username = (
+        User.objects.filter(pk=instance.pk).values_list('username', flat=True).first()
+        if instance.pk and (update_fields is None or 'username' in update_fields) else None
+    )
+
+
+@receiver(post_save, sender=User)
+def bump_session_version_on_rename(sender, instance, **kwargs):
+    previous = getattr(instance, '_session_previous_username', None)
+    if previous is not None and previous != instance.username:
+        bump_version_on_commit("session")
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    invalidate_cached_users([instance.pk])
+
+
+@receiver(post_save, sender=Tribe)
+def invalidate_tribe_users_cache(sender, instance, **kwargs):
+    """Los usuarios cacheados llevan su tribu (`tribe_name`)"""
+    invalidate_cached_users(User.objects.filter(tribe=instance).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tribe)
+def clear_users_cache(sender, **kwargs):
+    clear_cached_users()  # 🔹 SET_NULL no envía señales por usuario
+
+
+@receiver([post_save, post_delete], sender=Account)
+def bump_account_version(sender, **kwargs):
+    bump_version_on_commit("account")
+
+
+# 🔹 Catálogo: cada modelo tiene su versión; las vistas cacheadas dependen de las que leen
+@receiver([post_save, post_delete], sender=Item)
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+@receiver([post_save, post_delete], sender=Blueprint)
+@receiver([post_save, post_delete], sender=BlueprintMaterial)
+@receiver([post_save, post_delete], sender=Dino)
+def bump_catalog_version(sender, **kwargs):
+    bump_version_on_commit(catalog_version(sender))
+
+
+# 🔹 Autocompletado: índice en memoria actualizado de forma incremental (después de `bump_catalog_version`)
+
+@receiver(pre_save, sender=Item)
+@receiver(pre_delete, sender=Item)
+def remember_item_version(sender, instance, **kwargs):
+    """La versión se lee al confirmar, justo antes del incremento de este cambio (los
+    `on_commit` corren en orden): varios cambios en una transacción quedan encadenados"""
+    def remember():
+        instance._autocomplete_version = get_version(catalog_version(Item))[0]
+    transaction.on_commit(remember)
+
+
+@receiver(post_save, sender=Item)
+def index_item_name(sender, instance, **kwargs):
+    item_id, name, image = instance.pk, instance.name, instance.image.name if instance.image else ''
+    transaction.on_commit(lambda: item_index.update(  # 🔹 Corre después del `on_commit` de la versión
+        item_id, name, image,
+        previous=getattr(instance, '_autocomplete_version', None), version=get_version(catalog_version(Item))[0],
+    ))
+
+
+@receiver(post_delete, sender=Item)
+def unindex_item_name(sender, instance, **kwargs):
+    item_id = instance.pk
+    transaction.on_commit(lambda: item_index.remove(
+        item_id, previous=getattr(instance, '_autocomplete_version', None), version=get_version(catalog_version(Item))[0],
+    ))
+
+
+# 🔹 BOM: se recuerda el item afectado antes de guardar por si la fila cambia de receta/item
+
+@receiver(pre_save, sender=Recipe)
+@receiver(pre_save, sender=Blueprint)
+def remember_recipe_output(sender, instance, **kwargs):
+    instance._bom_previous_item_id = (
+        sender.objects.filter(pk=instance.pk).values_list('output_item_id', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def remember_ingredient_output(sender, instance, **kwargs):
+    instance._bom_previous_item_id = (
+        RecipeIngredient.objects.filter(pk=instance.pk).values_list('recipe__output_item_id', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=Blueprint)
+def invalidate_recipe_bom(sender, instance, **kwargs):
+    invalidate_items({instance.output_item_id, getattr(instance, '_bom_previous_item_id', None)})
+
+
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+def invalidate_ingredient_bom(sender, instance, **kwargs):
+    output_item_id = Recipe.objects.filter(pk=instance.recipe_id).values_list('output_item_id', flat=True).first()
+    invalidate_items({output_item_id, getattr(instance, '_bom_previous_item_id', None)})
+
+
+@receiver(pre_save, sender=BlueprintMaterial)
+def remember_material_output(sender, instance, **kwargs):
+    instance._bom_previous_item_id = (
+        BlueprintMaterial.objects.filter(pk=instance.pk).values_list('blueprint__output_item_id', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver([post_save, post_delete], sender=BlueprintMaterial)
+def invalidate_material_bom(sender, instance, **kwargs):
+    output_item_id = Blueprint.objects.filter(pk=instance.blueprint_id).values_list('output_item_id', flat=True).first()
+    invalidate_items({output_item_id, getattr(instance, '_bom_previous_item_id', None)})
+
+
+# 🔹 Linaje: solo se recalcula si cambian los padres; al borrar, el subárbol de cada hijo
+
+@receiver(pre_save, sender=Genetic)
+def remember_genetic_parents(sender, instance, **kwargs):
+    instance._lineage_previous_parents = (
+        Genetic.objects.filter(pk=instance.pk).values_list('mother_id', 'father_id').first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Genetic)
+def update_genetic_lineage(sender, instance, **kwargs):
+    previous = getattr(instance, '_lineage_previous_parents', None) or (None, None)
+    if previous != (instance.mother_id, instance.father_id):
+        rebuild_lineage({instance.id})
+
+
+@receiver(pre_delete, sender=Genetic)
+def remember_genetic_children(sender, instance, **kwargs):
+    instance._lineage_children = list(
+        Genetic.objects.filter(mother=instance).values_list('id', flat=True).union(
+            Genetic.objects.filter(father=instance).values_list('id', flat=True)
+        )
+    )
+
+
+@receiver(post_delete, sender=Genetic)
+def update_children_lineage(sender, instance, **kwargs):
+    rebuild_lineage(getattr(instance, '_lineage_children', ()))
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_save, sender=Dino)
+def generate_image_variants(sender, instance, **kwargs):
+    """🔹 Genera las miniaturas al subir una imagen (solo las que faltan)"""
+    if not instance.image:
+        return
+    try:
+        generate_variants(instance.image)
+    except (OSError, ValueError):
+        logger.warning("No se pudieron generar las variantes de %s", instance.image.name, exc_info=True)
@@ -0,0 +1,58 @@
+"""🔹 Snapshot del catálogo estático (items, recetas, blueprints y dinos) para el arranque del frontend.
+
+Un solo JSON comprimido con gzip, identificado por el SHA-256 de su contenido. Se genera una
+vez por combinación de versiones de catálogo (las señales las incrementan) y se guarda en la
+caché `catalog`. Las URLs de imágenes son relativas (`/media/...`) para que el contenido no
+dependa del host de la petición.
+"""
+import gzip
+import hashlib
+import json
+
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from .models import Blueprint, BlueprintMaterial, Dino, Item, Recipe, RecipeIngredient
+from .serializers import BlueprintSerializer, DinoSerializer, ItemSerializer, RecipeSerializer
+from .versions import catalog_version, get_version_tags
+
+SNAPSHOT_MODELS = (Item, Recipe, RecipeIngredient, Blueprint, BlueprintMaterial, Dino)
+
+
+def _sections():
+    return {
+        'items': ItemSerializer(Item.objects.order_by('name'), many=True),
+        'recipes': RecipeSerializer(
+            Recipe.objects.select_related('output_item').prefetch_related(
+                Prefetch('ingredients', queryset=RecipeIngredient.objects.select_related('item'))
+            ).order_by('id'),
+            many=True,
+        ),
+        'blueprints': BlueprintSerializer(
+            Blueprint.objects.select_related('output_item').prefetch_related(
+                Prefetch('materials', queryset=BlueprintMaterial.objects.select_related('item'))
+            ).order_by('output_item__name'),
+            many=True,
+        ),
+        'dinos': DinoSerializer(Dino.objects.order_by('id'), many=True),
+    }
+
+
+def build_snapshot():
+    """Retorna `(hash, cuerpo gzip)` generados desde la base de datos"""
+    data = {name: serializer.data for name, serializer in _sections().items()}
+    content = json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'), ensure_ascii=False).encode()
+    digest = hashlib.sha256(content).hexdigest()
+    return digest, gzip.compress(content, mtime=0)  # 🔹 `mtime=0`: mismos datos, mismos bytes
+
+
+def get_snapshot():
+    """🔹 `(hash, cuerpo gzip)` del catálogo actual; solo se regenera si cambió alguna versión"""
+    tags = get_version_tags([catalog_version(model) for model in SNAPSHOT_MODELS])
+    key = f"catalog:snapshot:{'.'.join(tags)}"
+    snapshot = caches['catalog'].get(key)
+    if snapshot is None:
+        snapshot = build_snapshot()
+        caches['catalog'].set(key, snapshot)
+    return snapshot
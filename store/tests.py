@@ -1,3 +1,1418 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import tempfile
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+
+from django.contrib.auth.models import update_last_login
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import (
+    Account, Blueprint, BlueprintMaterial, Combo, ComboDetail, Dino, Genetic, Item, Price,
+    PlaytimeRollup, Recipe, RecipeIngredient, SalePost, Session, SessionLog, Tribe, User,
+)
+
+
+class StoreAPITestCase(APITestCase):
+    """Tribu "Iron Sky" compartida por la clase; limpia las cachés (versiones, catálogo)
+    que sobreviven al rollback entre tests"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tribe = Tribe.objects.create(name="Iron Sky", description="")
+
+    def setUp(self):
+        for alias in ('default', 'catalog', 'users', 'bom', 'images'):
+            caches[alias].clear()
+
+    @classmethod
+    def create_player(cls, username, superuser=False, **extra):
+        """🔹 Usuario `<username>@ironsky.site` con contraseña "secret"; por defecto en la tribu de la clase"""
+        extra.setdefault("tribe", cls.tribe)
+        create = User.objects.create_superuser if superuser else User.objects.create_user
+        return create(username, f"{username}@ironsky.site", "secret", **extra)
+
+    @classmethod
+    def create_account(cls, name="main", short_code="M", **extra):
+        extra.setdefault("tribe", cls.tribe)
+        return Account.objects.create(name=name, short_code=short_code, **extra)
+
+    def authenticate(self, user):
+        self.client.force_authenticate(user)
+        return user
+
+    def committed(self):
+        """Ejecuta al salir los `on_commit` (versiones, broadcasts) como si se confirmara la transacción"""
+        return self.captureOnCommitCallbacks(execute=True)
+
+
+class SessionSocketTests(StoreAPITestCase):
+    """🔹 /ws/sessions/: autenticación por `?token=` y eventos de la tribu"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = cls.create_player("rider")
+        cls.account = cls.create_account()
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def communicator(self, token=None):
+        from TPSStore.asgi import application
+        path = f"/ws/sessions/?token={token}" if token else "/ws/sessions/"
+        return WebsocketCommunicator(application, path, headers=[(b"origin", b"http://localhost:5173")])
+
+    def api(self, method, url, data=None):
+        """Llamada a la API desde el test asíncrono, ejecutando los `on_commit` (los broadcasts)"""
+        def call():
+            with self.captureOnCommitCallbacks(execute=True):
+                return getattr(self.client, method)(url, data, format="json")
+        return database_sync_to_async(call)()
+
+    def test_rejects_missing_or_unusable_tokens(self):
+        inactive = self.create_player("ghost", is_active=False)
+
+        async def scenario():
+            for token in (None, "garbage", str(AccessToken.for_user(inactive))):
+                communicator = self.communicator(token)
+                connected, code = await communicator.connect()
+                self.assertEqual((connected, code), (False, 4401))
+
+        async_to_sync(scenario)()
+
+    def test_broadcasts_created_and_ended(self):
+        async def scenario():
+            communicator = self.communicator(str(AccessToken.for_user(self.user)))
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+
+            response = await self.api("post", "/api/sessions/", {"account": self.account.id})
+            message = await communicator.receive_json_from(timeout=2)
+            self.assertEqual((message["event"], message["session"]["id"]), ("created", response.data["id"]))
+
+            await self.api("delete", f"/api/sessions/{response.data['id']}/")
+            message = await communicator.receive_json_from(timeout=2)
+            self.assertEqual(message, {"event": "ended", "session": {"id": response.data["id"]}})
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+
+
+class ConditionalListTests(StoreAPITestCase):
+    """🔹 Polls de /api/sessions/: 304 solo si el ETag coincide"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = cls.create_player("rider")
+        cls.account = cls.create_account()
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def poll(self, etag):
+        return self.client.get("/api/sessions/", HTTP_IF_NONE_MATCH=etag)
+
+    def test_etag_revalidation(self):
+        response = self.client.get("/api/sessions/")
+        etag = response["ETag"]
+        self.assertNotIn("Last-Modified", response)
+        self.assertEqual(self.poll(etag).status_code, 304)
+        # 🔹 Sin ETag no hay 304 (If-Modified-Since se ignora)
+        since = "Tue, 01 Jan 2030 00:00:00 GMT"
+        self.assertEqual(self.client.get("/api/sessions/", HTTP_IF_MODIFIED_SINCE=since).status_code, 200)
+
+        with self.committed():
+            Session.objects.create(account=self.account, player=self.user)
+        response = self.poll(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_version_is_bumped_only_after_commit(self):
+        """Un poll entre la escritura y el commit no debe quedarse con el ETag nuevo y las filas viejas"""
+        etag = self.client.get("/api/sessions/")["ETag"]
+        with self.captureOnCommitCallbacks() as callbacks:
+            Session.objects.create(account=self.account, player=self.user)
+            self.assertEqual(self.poll(etag).status_code, 304)  # 🔹 Sin confirmar: misma versión
+        for callback in callbacks:
+            callback()
+        response = self.poll(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+    def test_only_username_changes_invalidate(self):
+        etag = self.client.get("/api/sessions/")["ETag"]
+        with self.committed():
+            update_last_login(None, self.user)
+            self.user.save()
+        self.assertEqual(self.poll(etag).status_code, 304)
+
+        with self.committed():
+            self.user.username = "rider2"
+            self.user.save()
+        self.assertEqual(self.poll(etag).status_code, 200)
+
+
+class ListQueryBudgetTests(StoreAPITestCase):
+    """🔹 Cada endpoint de lista debe hacer un número constante de consultas (sin N+1)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = cls.create_player("admin", superuser=True)
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+        self.dino = Dino.objects.create(fullname="Tyrannosaurus", name="Rex")
+        self.counter = 0
+
+    def next_name(self, prefix):
+        self.counter += 1
+        return f"{prefix} {self.counter}"
+
+    def make_item(self):
+        return Item.objects.create(name=self.next_name("Item"), stack=100)
+
+    def make_user(self):
+        tribe = Tribe.objects.create(name=self.next_name("Tribe"), description="")
+        name = self.next_name("user").replace(" ", "")
+        return User.objects.create_user(name, f"{name}@ironsky.site", "secret", tribe=tribe)
+
+    def make_account(self):
+        name = self.next_name("acc").replace(" ", "")
+        return Account.objects.create(name=name, short_code=name[-10:], tribe=self.tribe)
+
+    def make_genetic(self):
+        tribe = Tribe.objects.create(name=self.next_name("Tribe"), description="")
+        dino = Dino.objects.create(fullname=self.next_name("Dino"), name="Dino")
+        return Genetic.objects.create(
+            dino=dino, tribe=tribe, health_base=40, stamina_base=40, oxygen_base=40,
+            food_base=40, weight_base=40, damage_base=40,
+        )
+
+    def make_recipe(self):
+        recipe = Recipe.objects.create(output_item=self.make_item())
+        for _ in range(2):
+            RecipeIngredient.objects.create(recipe=recipe, item=self.make_item(), quantity=3)
+
+    def make_blueprint(self):
+        blueprint = Blueprint.objects.create(output_item=self.make_item())
+        for _ in range(2):
+            BlueprintMaterial.objects.create(blueprint=blueprint, item=self.make_item(), quantity=3)
+
+    def make_combo(self):
+        combo = Combo.objects.create(name=self.next_name("Combo"), description="", tribe=self.tribe)
+        ComboDetail.objects.create(combo=combo, item=self.make_item(), quantity=1)
+        Price.objects.create(combo=combo, type="Item", item=self.make_item(), quantity=5)
+        Price.objects.create(combo=combo, type="Coins", amount=10)
+
+    def make_salepost(self):
+        genetic = self.make_genetic()
+        SalePost.objects.create(tribe=genetic.tribe, genetic=genetic, title=self.next_name("Rex"))
+
+    def make_session(self):
+        Session.objects.create(account=self.make_account(), player=self.make_user())
+
+    def make_session_log(self):
+        end = now()
+        SessionLog.objects.create(
+            player=self.make_user(), account=self.make_account(),
+            start_time=end - timedelta(hours=1), end_time=end, duration=timedelta(hours=1),
+        )
+
+    def count_list_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, url, factory):
+        """Compara las consultas de la lista con 2 y con 7 filas"""
+        for _ in range(2):
+            factory()
+        small = self.count_list_queries(url)
+        with self.committed():
+            for _ in range(5):
+                factory()
+        self.assertEqual(self.count_list_queries(url), small)
+
+    def test_users(self):
+        self.assertConstantQueries("/api/users/", self.make_user)
+
+    def test_items(self):
+        self.assertConstantQueries("/api/items/", self.make_item)
+
+    def test_dinos(self):
+        self.assertConstantQueries("/api/dinos/", lambda: Dino.objects.create(fullname="Raptor", name="Raptor"))
+
+    def test_genetics(self):
+        self.assertConstantQueries("/api/genetics/", self.make_genetic)
+
+    def test_saleposts(self):
+        self.assertConstantQueries("/api/salepost/", self.make_salepost)
+
+    def test_recipes(self):
+        self.assertConstantQueries("/api/recipes/", self.make_recipe)
+
+    def test_recipe_ingredients(self):
+        self.assertConstantQueries("/api/recipe-ingredients/", self.make_recipe)
+
+    def test_blueprints(self):
+        self.assertConstantQueries("/api/blueprints/", self.make_blueprint)
+
+    def test_blueprint_materials(self):
+        self.assertConstantQueries("/api/blueprint-materials/", self.make_blueprint)
+
+    def test_combos(self):
+        self.assertConstantQueries("/api/combos/", self.make_combo)
+
+    def test_combo_details(self):
+        self.assertConstantQueries("/api/combo-details/", self.make_combo)
+
+    def test_accounts(self):
+        self.assertConstantQueries("/api/accounts/", self.make_account)
+
+    def test_sessions(self):
+        self.assertConstantQueries("/api/sessions/", self.make_session)
+
+    def test_session_logs(self):
+        self.assertConstantQueries("/api/session-logs/", self.make_session_log)
+
+
+class BillOfMaterialsTests(StoreAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.metal, self.polymer, self.ingot, self.gear = (
+            Item.objects.create(name=name) for name in ("Metal", "Polymer", "Metal Ingot", "Gear")
+        )
+        ingot = Recipe.objects.create(output_item=self.ingot)
+        self.ingot_metal = RecipeIngredient.objects.create(recipe=ingot, item=self.metal, quantity=2)
+        self.gear_recipe = Recipe.objects.create(output_item=self.gear, output_quantity=2)
+        RecipeIngredient.objects.create(recipe=self.gear_recipe, item=self.ingot, quantity=3)
+        RecipeIngredient.objects.create(recipe=self.gear_recipe, item=self.polymer, quantity=1)
+
+    def bom(self, recipe, quantity):
+        response = self.client.get(f"/api/recipes/{recipe.id}/bom/?quantity={quantity}")
+        return {material["item_name"]: material["quantity"] for material in response.data["materials"]}
+
+    def test_expands_every_level(self):
+        self.assertEqual(self.bom(self.gear_recipe, 4), {"Metal": 12, "Polymer": 2})
+
+    def test_ingredient_change_invalidates_users(self):
+        self.bom(self.gear_recipe, 4)  # 🔹 Cachea los vectores
+        self.ingot_metal.quantity = 3
+        self.ingot_metal.save()
+        self.assertEqual(self.bom(self.gear_recipe, 4), {"Metal": 18, "Polymer": 2})
+
+    def test_invalidation_walks_reverse_edges(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.ingot_metal.save()
+        lookups = [q["sql"] for q in queries if q["sql"].startswith("SELECT") and ("recipeingredient" in q["sql"] or "blueprintmaterial" in q["sql"])]
+        self.assertTrue(lookups)
+        self.assertTrue(all("WHERE" in sql for sql in lookups))  # 🔹 Nunca la tabla completa
+
+    def test_cycle_members_are_raw_in_any_order(self):
+        from .bom import raw_materials_per_unit
+        cement, paste = Item.objects.create(name="Cement"), Item.objects.create(name="Paste")
+        RecipeIngredient.objects.create(recipe=Recipe.objects.create(output_item=cement), item=paste, quantity=1)
+        paste_recipe = Recipe.objects.create(output_item=paste)
+        RecipeIngredient.objects.create(recipe=paste_recipe, item=cement, quantity=1)
+        RecipeIngredient.objects.create(recipe=paste_recipe, item=self.metal, quantity=1)
+
+        first = raw_materials_per_unit([cement.id])[cement.id]
+        self.assertIsNone(cache.get(f"bom:item:{cement.id}"))  # 🔹 Alias propio: no compite con las versiones
+        caches['bom'].clear()
+        second = raw_materials_per_unit([paste.id, cement.id])[cement.id]
+        self.assertEqual(first, second)
+        self.assertEqual(first, {paste.id: 1})  # 🔹 Se expande su receta; el otro miembro del ciclo es materia prima
+        self.assertEqual(self.bom(paste_recipe, 1), {"Cement": 1, "Metal": 1})
+
+        # 🔹 El planificador aplica la misma regla que el BOM
+        response = self.client.post("/api/crafting/plan/", {"targets": [{"item": paste.id, "quantity": 1}]}, format="json")
+        self.assertEqual({m["item_name"]: m["quantity"] for m in response.data["materials"]}, {"Cement": 1, "Metal": 1})
+
+    def test_plan_aggregates_targets_with_stacks(self):
+        Item.objects.filter(pk=self.metal.pk).update(stack=5)
+        Item.objects.filter(pk=self.polymer.pk).update(stack=100)
+        targets = [{"item": self.gear.id, "quantity": 3}, {"item": self.ingot.id, "quantity": 1}, {"item": self.metal.id, "quantity": 1}]
+        response = self.client.post("/api/crafting/plan/", {"targets": targets}, format="json")
+        materials = {m["item_name"]: (m["quantity"], m["slots"]) for m in response.data["materials"]}
+        # 🔹 3 gears = 4.5 ingots = 9 metal, + 1 ingot (2 metal) + 1 metal; 1.5 polymer se redondea hacia arriba
+        self.assertEqual(materials, {"Metal": (12, 3), "Polymer": (2, 1)})
+        self.assertEqual(response.data["total_slots"], 4)
+
+    def test_plan_follows_recipe_changes(self):
+        targets = {"targets": [{"item": self.ingot.id, "quantity": 2}]}
+        self.client.post("/api/crafting/plan/", targets, format="json")
+        self.ingot_metal.delete()
+        RecipeIngredient.objects.create(recipe=self.ingot_metal.recipe, item=self.polymer, quantity=5)
+        response = self.client.post("/api/crafting/plan/", targets, format="json")
+        self.assertEqual([(m["item_name"], m["quantity"]) for m in response.data["materials"]], [("Polymer", 10)])
+
+
+class KeysetPaginationTests(StoreAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = cls.create_player("admin", superuser=True)
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def walk(self, url):
+        """Recorre todas las páginas siguiendo `next` y retorna los ids en orden"""
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row["id"] for row in response.data["results"])
+            url = response.data["next"]
+        return ids
+
+    def test_session_logs_walk_every_row_once_with_equal_end_times(self):
+        account = Account.objects.create(name="main", short_code="M", tribe=self.tribe)
+        end = now()
+        for offset in [0, 0, 0, 1, 1, 2, 3]:  # 🔹 Empates en end_time: el id desempata
+            SessionLog.objects.create(
+                player=self.user, account=account, start_time=end - timedelta(hours=5),
+                end_time=end - timedelta(hours=offset), duration=timedelta(hours=1),
+            )
+        expected = list(SessionLog.objects.order_by("-end_time", "-id").values_list("id", flat=True))
+        self.assertEqual(self.walk("/api/session-logs/?page_size=2"), expected)
+
+    def test_items_are_paged_by_name(self):
+        for name in ["Metal", "Fiber", "Hide", "Stone", "Wood"]:
+            Item.objects.create(name=name)
+        expected = list(Item.objects.order_by("name").values_list("id", flat=True))
+        self.assertEqual(self.walk("/api/items/?page_size=2"), expected)
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get("/api/items/?cursor=not-a-cursor").status_code, 404)
+
+    def test_pagination_is_opt_in(self):
+        for index in range(60):
+            Item.objects.create(name=f"Item {index:02}")
+        response = self.client.get("/api/items/")
+        self.assertIsInstance(response.data, list)  # 🔹 Clientes existentes: arreglo completo
+        self.assertEqual(len(response.data), 60)
+        self.assertEqual(response.data[0]["name"], "Item 00")
+
+        response = self.client.get("/api/items/?page_size=50")
+        self.assertEqual(len(response.data["results"]), 50)
+        self.assertIsNotNone(response.data["next"])
+
+    def test_unpaginated_session_logs_are_capped(self):
+        from .pagination import SessionLogPagination
+        account = Account.objects.create(name="main", short_code="M", tribe=self.tribe)
+        end = now()
+        for hours in range(5):
+            SessionLog.objects.create(
+                player=self.user, account=account, tribe=self.tribe,
+                start_time=end - timedelta(hours=hours + 1), end_time=end - timedelta(hours=hours), duration=timedelta(hours=1),
+            )
+        with mock.patch.object(SessionLogPagination, "unpaginated_limit", 3):
+            response = self.client.get("/api/session-logs/")
+            self.assertIsInstance(response.data, list)  # 🔹 Mismo formato, pero acotado a lo más reciente
+            self.assertEqual(len(response.data), 3)
+            next_link = response["Link"].split(">", 1)[0].lstrip("<")
+            self.assertEqual(len(self.client.get(next_link).data["results"]), 2)
+
+        self.assertFalse(self.client.get("/api/items/").has_header("Link"))  # 🔹 Sin tope: lista completa
+
+
+class PlaytimeRollupTests(StoreAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = cls.create_player("admin", superuser=True)
+        cls.account = cls.create_account()
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def test_ending_a_session_across_midnight_splits_the_rollup(self):
+        start = datetime(2025, 2, 10, 22, 0, tzinfo=dt_timezone.utc)
+        end = datetime(2025, 2, 11, 1, 30, tzinfo=dt_timezone.utc)
+        session = Session.objects.create(account=self.account, player=self.user, start_time=start)
+        with mock.patch("store.views.now", return_value=end):
+            self.assertEqual(self.client.delete(f"/api/sessions/{session.id}/").status_code, 200)
+
+        response = self.client.get("/api/playtime/?group_by=day&start=2025-02-01&end=2025-02-28")
+        self.assertEqual(
+            [(row["day"], row["seconds"]) for row in response.data],
+            [(start.date(), 2 * 3600), (end.date(), 90 * 60)],
+        )
+
+    def test_invalid_group_by_is_rejected(self):
+        self.assertEqual(self.client.get("/api/playtime/?group_by=tribe").status_code, 400)
+
+    def test_report_is_scoped_to_the_tribe(self):
+        other = Tribe.objects.create(name="Red Moon", description="")
+        other_account = Account.objects.create(name="red", short_code="R", tribe=other)
+        day = datetime(2025, 2, 10, tzinfo=dt_timezone.utc).date()
+        PlaytimeRollup.objects.create(player=self.user, account=self.account, day=day, duration=timedelta(hours=1), sessions=1)
+        PlaytimeRollup.objects.create(player=self.user, account=other_account, day=day, duration=timedelta(hours=2), sessions=1)
+
+        self.authenticate(self.create_player("rider"))
+        response = self.client.get("/api/playtime/?group_by=account")
+        self.assertEqual([row["account_name"] for row in response.data], ["main"])
+
+        self.authenticate(self.create_player("loner", tribe=None))
+        self.assertEqual(self.client.get("/api/playtime/").data, [])
+
+    def test_record_adds_to_rows_created_concurrently(self):
+        from types import SimpleNamespace
+        from .playtime import record_playtime
+        start = datetime(2025, 2, 10, 10, 0, tzinfo=dt_timezone.utc)
+        log = SimpleNamespace(player_id=self.user.id, account_id=self.account.id, start_time=start, end_time=start + timedelta(hours=1))
+        # 🔹 Fila creada por otro proceso entre la lectura y la escritura
+        PlaytimeRollup.objects.create(
+            player=self.user, account=self.account, day=start.date(), duration=timedelta(minutes=30), sessions=1
+        )
+        record_playtime([log])
+        rollup = PlaytimeRollup.objects.get()
+        self.assertEqual((rollup.duration, rollup.sessions), (timedelta(minutes=90), 2))
+
+
+class GeneticSearchTests(StoreAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = cls.create_player("admin", superuser=True)
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+        self.rex = Dino.objects.create(fullname="Tyrannosaurus", name="Rex")
+        self.giga = Dino.objects.create(fullname="Giganotosaurus", name="Giga")
+
+    def make_genetic(self, dino, health_base, damage_mutates):
+        return Genetic.objects.create(
+            dino=dino, tribe=self.tribe, health_base=health_base, stamina_base=30, oxygen_base=30,
+            food_base=30, weight_base=30, damage_base=30, damage_mutates=damage_mutates,
+        )
+
+    def test_threshold_filters_and_stat_ordering(self):
+        strong = self.make_genetic(self.rex, 50, 20)
+        stronger = self.make_genetic(self.rex, 48, 30)
+        self.make_genetic(self.rex, 40, 40)  # 🔹 health_base muy bajo
+        self.make_genetic(self.rex, 55, 10)  # 🔹 pocas mutaciones de daño
+        self.make_genetic(self.giga, 60, 60)  # 🔹 otro dino
+
+        response = self.client.get(
+            f"/api/genetics/?dino={self.rex.id}&health_base__gte=45&damage_mutates__gte=20&ordering=-damage_mutates&page_size=10"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["id"] for row in response.data["results"]], [stronger.id, strong.id])
+
+    def test_invalid_values_are_rejected(self):
+        self.assertEqual(self.client.get("/api/genetics/?health_base__gte=mucho").status_code, 400)
+        self.assertEqual(self.client.get("/api/genetics/?ordering=tribe").status_code, 400)
+
+    def test_cursor_is_bound_to_its_ordering(self):
+        for health in (40, 50, 60):
+            self.make_genetic(self.rex, health, 0)
+        next_url = self.client.get("/api/genetics/?ordering=-health_base&page_size=1").data["next"]
+        self.assertEqual(self.client.get(next_url).status_code, 200)
+        other = next_url.replace("ordering=-health_base", "ordering=health_base")
+        self.assertEqual(self.client.get(other).status_code, 404)
+
+
+class ImageVariantTests(StoreAPITestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def make_item(self):
+        from io import BytesIO
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from PIL import Image
+        buffer = BytesIO()
+        Image.new("RGB", (300, 200), "red").save(buffer, format="PNG")
+        return Item.objects.create(name="Metal", image=SimpleUploadedFile("metal.png", buffer.getvalue()))
+
+    def variants(self, item):
+        return self.client.get(f"/api/items/{item.id}/").data["image_variants"]
+
+    def test_missing_variants_fall_back_to_the_original(self):
+        from django.core.files.storage import default_storage
+        from .images import IMAGE_VARIANT_SIZES, generate_variants, variant_name
+        item = self.make_item()
+        for variant in IMAGE_VARIANT_SIZES:  # 🔹 Como antes del backfill o tras una generación fallida
+            default_storage.delete(variant_name(item.image.name, variant))
+        caches['images'].clear()
+        caches['catalog'].clear()
+        self.assertEqual(set(self.variants(item).values()), {f"http://testserver/media/{item.image.name}"})
+
+        generate_variants(item.image)
+        caches['catalog'].clear()
+        self.assertTrue(self.variants(item)["thumb"].endswith(variant_name(item.image.name, "thumb")))
+
+    def test_variants_are_generated_on_upload(self):
+        from django.core.files.storage import default_storage
+        item = self.make_item()
+        thumb = self.variants(item)["thumb"]
+        self.assertIn("/variants/", thumb)
+        self.assertTrue(default_storage.exists(thumb.split("/media/", 1)[1]))
+
+    def test_variants_are_served_as_immutable(self):
+        from django.test import RequestFactory
+        from .views import serve_image_variant
+        path = self.variants(self.make_item())["thumb"].split("/media/", 1)[1]
+        response = serve_image_variant(RequestFactory().get(f"/media/{path}"), path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Cache-Control"], "public, max-age=31536000, immutable")
+
+    def test_backfill_invalidates_cached_catalog_responses(self):
+        from io import StringIO
+        from django.core.files.storage import default_storage
+        from django.core.management import call_command
+        from .images import IMAGE_VARIANT_SIZES, variant_name
+        item = self.make_item()
+        for variant in IMAGE_VARIANT_SIZES:
+            default_storage.delete(variant_name(item.image.name, variant))
+        caches['images'].clear()
+        self.assertNotIn("/variants/", self.client.get("/api/items/").data[0]["image_variants"]["thumb"])
+
+        call_command("generate_image_variants", stdout=StringIO())
+        self.assertIn("/variants/", self.client.get("/api/items/").data[0]["image_variants"]["thumb"])
+
+
+class CatalogCacheTests(StoreAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.item = Item.objects.create(name="Metal Ingot", stack=100)
+        recipe = Recipe.objects.create(output_item=self.item)
+        RecipeIngredient.objects.create(recipe=recipe, item=Item.objects.create(name="Metal"), quantity=2)
+
+    def test_warm_reads_skip_the_database(self):
+        self.client.get("/api/recipes/")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/recipes/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 0)
+
+    def test_item_change_invalidates_dependent_catalog_views(self):
+        self.client.get("/api/recipes/")
+        self.client.get("/api/dinos/")
+        with self.committed():
+            self.item.name = "Refined Metal Ingot"
+            self.item.save()
+
+        response = self.client.get("/api/recipes/")
+        self.assertEqual(response.data[0]["output_item_name"], "Refined Metal Ingot")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/dinos/")  # 🔹 No depende de Item: sigue en caché
+        self.assertEqual(len(queries), 0)
+
+
+class LoadTestLogMixTests(SimpleTestCase):
+    """🔹 Lectura del log de runserver para el mix del comando `loadtest`"""
+
+    LOG = (
+        'Watching for file changes with StatReloader\n'
+        '[10/Feb/2025 22:44:30] "GET /api/ HTTP/1.1" 200 6747\n'
+        '[10/Feb/2025 22:44:32] "GET /api/genetics/?dino=3 HTTP/1.1" 200 13522\n'
+        '[10/Feb/2025 22:44:32] "GET /api/genetics/ HTTP/1.1" 200 13522\n'
+        '[10/Feb/2025 22:44:33] "PATCH /api/sessions/12/ HTTP/1.1" 200 140\n'
+        '[10/Feb/2025 22:44:34] "DELETE /api/sessions/7/ HTTP/1.1" 200 61\n'
+        '[10/Feb/2025 22:44:35] "OPTIONS /api/sessions/ HTTP/1.1" 200 0\n'
+        'Not Found: /favicon.ico\n'
+    )
+
+    def test_normalize_path(self):
+        from .management.commands.loadtest import normalize_path
+        self.assertEqual(normalize_path("/api/sessions/12/"), "/api/sessions/{id}/")
+        self.assertEqual(normalize_path("/api/genetics/?dino=3"), "/api/genetics/")
+        self.assertEqual(normalize_path("/api/recipes/4/bom"), "/api/recipes/{id}/bom")
+        self.assertEqual(normalize_path("/api/items/v2/"), "/api/items/v2/")
+
+    def test_parse_log_mix_counts_only_replayable_routes(self):
+        from .management.commands.loadtest import parse_log_mix
+        with tempfile.NamedTemporaryFile("w", suffix=".log", encoding="utf-8", delete=False) as log:
+            log.write(self.LOG)
+        self.addCleanup(os.unlink, log.name)
+        self.assertEqual(parse_log_mix(log.name), {
+            ("GET", "/api/genetics/"): 2,
+            ("PATCH", "/api/sessions/{id}/"): 1,
+            ("DELETE", "/api/sessions/{id}/"): 1,
+        })
+
+    def test_percentile(self):
+        from .management.commands.loadtest import percentile
+        values = [10, 20, 30, 40, 50]
+        self.assertEqual(percentile([], 0.5), 0.0)
+        self.assertEqual(percentile(values, 0), 10)
+        self.assertEqual(percentile(values, 0.5), 30)
+        self.assertEqual(percentile(values, 0.95), 50)
+        self.assertEqual(percentile(values, 1.5), 50)
+
+    def test_replay_mix_merges_session_writes(self):
+        from .management.commands.loadtest import SESSION_WRITE, replay_mix
+        mix = Counter({("GET", "/api/genetics/"): 2, ("POST", "/api/sessions/"): 1, ("DELETE", "/api/sessions/{id}/"): 3})
+        self.assertEqual(replay_mix(mix), {("GET", "/api/genetics/"): 2, SESSION_WRITE: 4})
+
+    def test_session_write_follows_user_state(self):
+        """Sin sesión activa se inicia una; con sesión activa se usa, y se cuenta lo ejecutado"""
+        from .management.commands.loadtest import SESSION_WRITE, VirtualUser
+        user = VirtualUser("http://testserver", "loadtest0", 1, 5, patch_share=0.0)
+        with mock.patch.object(VirtualUser, "request", return_value=(201, b'{"id": 9}')) as request:
+            self.assertEqual(user.run(*SESSION_WRITE), ("POST /api/sessions/", 201))
+            self.assertEqual(user.session_id, 9)
+            self.assertEqual(user.run(*SESSION_WRITE), ("DELETE /api/sessions/{id}/", 201))
+            self.assertIsNone(user.session_id)
+        self.assertEqual(request.call_args_list[1].args, ("DELETE", "/api/sessions/9/"))
+
+
+class PerformanceMetricsTests(StoreAPITestCase):
+    def test_server_timing_header_and_prometheus_endpoint(self):
+        response = self.client.get("/api/dinos/")
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertIn("total;dur=", response["Server-Timing"])
+
+        staff = self.create_player("ops", is_staff=True, tribe=None)
+        self.client.force_login(staff)
+        metrics = self.client.get("/metrics").content.decode()
+        self.assertIn('tps_request_duration_seconds_count{route="api/dinos/",method="GET"}', metrics)
+
+    def test_metrics_endpoint_is_not_public(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        player = self.create_player("rider", tribe=None)
+        self.client.force_login(player)
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.client.logout()
+
+        with override_settings(METRICS_TOKEN="scrape-me"):
+            self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+            self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-me").status_code, 200)
+
+
+class CachedAuthenticationTests(StoreAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = cls.create_player("rider")
+
+    def login(self):
+        response = self.client.post("/api/token/", {"username": "rider", "password": "secret"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return response.data["access"]
+
+    def test_token_carries_user_claims(self):
+        token = AccessToken(self.login())
+        self.assertEqual(token["username"], "rider")
+        self.assertEqual(token["tribe"], self.tribe.id)
+        self.assertEqual(token["tribe_name"], "Iron Sky")
+        self.assertFalse(token["is_superuser"])
+
+    def test_hot_me_requests_skip_the_user_query(self):
+        self.login()
+        self.client.get("/api/users/me/")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/users/me/")
+        self.assertEqual(response.data["tribe_name"], "Iron Sky")
+        self.assertEqual(len(queries), 0)
+
+    def test_tribe_rename_invalidates_cached_users(self):
+        self.login()
+        self.client.get("/api/users/me/")
+        self.tribe.name = "Iron Sky II"
+        self.tribe.save()
+        self.assertEqual(self.client.get("/api/users/me/").data["tribe_name"], "Iron Sky II")
+
+
+class SessionStartTests(StoreAPITestCase):
+    """🔹 Las reglas de inicio de sesión las garantiza la base de datos en un solo INSERT"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = cls.create_player("rider")
+        cls.other = cls.create_player("scout")
+        cls.main = cls.create_account()
+        cls.alt = cls.create_account("alt", "A")
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def test_start_is_a_single_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/sessions/", {"account": self.main.id}, format="json")
+        self.assertEqual(response.status_code, 201)
+        statements = [q["sql"] for q in queries if not q["sql"].startswith(("SAVEPOINT", "RELEASE"))]
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith("INSERT"))
+
+    def test_account_of_another_tribe_is_rejected(self):
+        foreign = Account.objects.create(name="theirs", short_code="T", tribe=Tribe.objects.create(name="Other", description=""))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/sessions/", {"account": foreign.id}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["error"], "La cuenta no existe.")
+        self.assertFalse(Session.objects.exists())
+        self.assertEqual(len([q for q in queries if not q["sql"].startswith(("SAVEPOINT", "RELEASE"))]), 1)
+
+        self.assertEqual(self.client.post("/api/sessions/", {"account": "abc"}, format="json").status_code, 400)
+        self.authenticate(self.create_player("admin", superuser=True, tribe=None))
+        self.assertEqual(self.client.post("/api/sessions/", {"account": foreign.id}, format="json").status_code, 201)
+
+    def test_player_already_playing_is_rejected(self):
+        Session.objects.create(account=self.alt, player=self.user, start_time=now())
+        response = self.client.post("/api/sessions/", {"account": self.main.id}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["error"], "Ya estás conectado a otra cuenta.")
+
+    def test_account_in_use_is_rejected(self):
+        Session.objects.create(account=self.main, player=self.other, start_time=now())
+        response = self.client.post("/api/sessions/", {"account": self.main.id}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["error"], "Esta cuenta ya está en uso.")
+        self.assertEqual(Session.objects.count(), 1)
+
+
+class SessionBulkEndTests(StoreAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = cls.create_player("admin", superuser=True)
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def start_sessions(self, count, tribe):
+        for index in range(count):
+            player = User.objects.create_user(f"{tribe.name}{index}", f"{tribe.name}{index}@ironsky.site", "secret", tribe=tribe)
+            account = Account.objects.create(name=f"{tribe.name}-{index}", short_code=f"{tribe.name[0]}{index}", tribe=tribe)
+            Session.objects.create(account=account, player=player, start_time=now() - timedelta(hours=1))
+
+    def end_tribe(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/api/sessions/end/", {"tribe": self.tribe.id}, format="json")
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_tribe_logout_is_constant_queries(self):
+        self.start_sessions(2, self.tribe)
+        small = self.end_tribe()
+        self.start_sessions(2, Tribe.objects.create(name="Other", description=""))
+        self.start_sessions(6, Tribe.objects.create(name="Bulk", description=""))
+        Account.objects.filter(tribe__name="Bulk").update(tribe=self.tribe)
+        self.assertEqual(self.end_tribe(), small)
+
+        self.assertEqual(SessionLog.objects.count(), 8)
+        self.assertEqual(Session.objects.count(), 2)  # 🔹 Las sesiones de otra tribu siguen activas
+        self.assertEqual(PlaytimeRollup.objects.count(), 8)
+
+    def test_requires_exactly_one_selector(self):
+        response = self.client.post("/api/sessions/end/", {"tribe": self.tribe.id, "player": self.user.id}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_members_cannot_end_other_tribes_sessions(self):
+        other = Tribe.objects.create(name="Other", description="")
+        self.start_sessions(1, self.tribe)
+        self.start_sessions(2, other)
+        foreign = list(Session.objects.filter(account__tribe=other).values_list("id", flat=True))
+        self.authenticate(self.create_player("member"))
+
+        for payload in ({"tribe": other.id}, {"ids": foreign}, {"player": Session.objects.get(id=foreign[0]).player_id}):
+            response = self.client.post("/api/sessions/end/", payload, format="json")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["ended"], [])
+        self.assertEqual(Session.objects.filter(account__tribe=other).count(), 2)
+        self.assertFalse(SessionLog.objects.exists())
+
+        response = self.client.post("/api/sessions/end/", {"ids": foreign + [Session.objects.get(account__tribe=self.tribe).id]}, format="json")
+        self.assertEqual(len(response.data["ended"]), 1)
+        self.assertEqual(Session.objects.filter(account__tribe=other).count(), 2)
+
+
+class CatalogTransferTests(StoreAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = self.authenticate(self.create_player("admin", superuser=True, tribe=None))
+        self.metal = Item.objects.create(name="Metal", stack=300)
+        self.ingot = Item.objects.create(name="Metal Ingot", stack=300)
+        recipe = Recipe.objects.create(output_item=self.ingot, output_quantity=1)
+        RecipeIngredient.objects.create(recipe=recipe, item=self.metal, quantity=2)
+
+    def upload(self, kind, name, content):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        return self.client.post(
+            f"/api/catalog/import/{kind}/", {"file": SimpleUploadedFile(name, content.encode())}, format="multipart"
+        )
+
+    def test_export_streams_ndjson_and_csv(self):
+        response = self.client.get("/api/catalog/export/recipe-ingredients.ndjson")
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(rows, [{"recipe": "Metal Ingot", "item": "Metal", "quantity": 2}])
+
+        response = self.client.get("/api/catalog/export/items.csv")
+        self.assertEqual(b"".join(response.streaming_content).decode().splitlines()[0], "name,description,stack")
+
+    async def test_export_streams_asynchronously_under_asgi(self):
+        from django.test import AsyncClient
+        response = await AsyncClient().get("/api/catalog/export/items.ndjson")
+        self.assertTrue(response.is_async)  # 🔹 Django no tiene que leerla completa para servirla
+        lines = [line async for line in response.streaming_content]
+        self.assertEqual([json.loads(line)["name"] for line in lines], ["Metal", "Metal Ingot"])
+
+    def plan(self):
+        response = self.client.post("/api/crafting/plan/", {"targets": [{"item": self.ingot.id, "quantity": 1}]}, format="json")
+        return sorted((material["item_name"], material["quantity"]) for material in response.data["materials"])
+
+    def test_import_upserts_by_item_name(self):
+        self.assertEqual(self.plan(), [("Metal", 2)])
+        response = self.upload("items", "items.csv", "name,description,stack\nMetal,,200\nPolymer,Organic,100\n")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["created"], response.data["updated"]), (1, 1))
+        self.assertEqual(Item.objects.get(name="Metal").stack, 200)
+
+        lines = '{"recipe": "Metal Ingot", "item": "Metal", "quantity": 3}\n{"recipe": "Metal Ingot", "item": "Polymer", "quantity": 1}\n'
+        response = self.upload("recipe-ingredients", "ingredients.ndjson", lines)
+        self.assertEqual((response.data["created"], response.data["updated"]), (1, 1))
+        self.assertEqual(
+            sorted(RecipeIngredient.objects.values_list("item__name", "quantity")), [("Metal", 3), ("Polymer", 1)]
+        )
+        self.assertEqual(self.plan(), [("Metal", 3), ("Polymer", 1)])  # 🔹 El import invalida el BOM cacheado
+
+    def test_invalid_rows_report_their_line(self):
+        response = self.upload("recipes", "recipes.ndjson", '{"output_item": "Ghost"}\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["errors"], ["Línea 1: El item 'Ghost' no existe."])
+
+    def test_out_of_range_values_are_row_errors(self):
+        response = self.upload("items", "items.csv", f"name,description,stack\nPolymer,,1\n{'X' * 101},,1\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data["errors"]), 1)
+        self.assertTrue(response.data["errors"][0].startswith("Línea 3: 'name':"))
+        self.assertFalse(Item.objects.filter(name="Polymer").exists())
+
+        lines = '{"recipe": "Metal Ingot", "item": "Metal", "quantity": 100000000000000000000}\n'
+        response = self.upload("recipe-ingredients", "ingredients.ndjson", lines)
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.data["errors"][0].startswith("Línea 1: 'quantity':"))
+        self.assertEqual(RecipeIngredient.objects.get().quantity, 2)
+
+    def test_import_is_all_or_nothing(self):
+        from . import catalog_io
+        rows = [(1, {"name": "Polymer"}), (2, {"name": "Metal", "stack": 50}), (3, {"name": ""})]
+        result = catalog_io.import_rows("items", rows, chunk_size=2)
+        self.assertEqual(result, {"created": 0, "updated": 0, "errors": ["Línea 3: Falta la columna 'name'."]})
+        self.assertFalse(Item.objects.filter(name="Polymer").exists())
+        self.assertEqual(Item.objects.get(name="Metal").stack, 300)
+
+    def test_import_requires_admin(self):
+        self.authenticate(self.create_player("rider", tribe=None))
+        self.assertEqual(self.upload("items", "items.csv", "name\nMetal\n").status_code, 403)
+
+
+class ComboWriteTests(StoreAPITestCase):
+    """🔹 Escribir un combo aplica la diferencia de detalles/precios con operaciones masivas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = cls.create_player("rider")
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+        self.items = [Item.objects.create(name=f"Item {index}") for index in range(30)]
+
+    def payload(self, items, quantity=1):
+        return {
+            "name": "Starter", "description": "Kit", "tribe": self.tribe.id,
+            "details": [{"item": item.id, "quantity": quantity} for item in items],
+            "prices": [{"type": "Coins", "amount": "10.00"}, {"type": "Item", "item": items[0].id, "quantity": 5}],
+        }
+
+    def write(self, method, url, data):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format="json")
+        self.assertIn(response.status_code, (200, 201))
+        statements = [q for q in queries if not q["sql"].startswith(("SAVEPOINT", "RELEASE"))]
+        return response, len(statements)
+
+    def test_create_and_update_are_fixed_queries(self):
+        response, small = self.write("post", "/api/combos/", self.payload(self.items[:2]))
+        _, large = self.write("post", "/api/combos/", self.payload(self.items))
+        self.assertEqual(small, large)
+
+        url = f"/api/combos/{response.data['id']}/"
+        _, small = self.write("put", url, self.payload(self.items[:3], quantity=2))
+        combo = Combo.objects.create(name="Big", description="", tribe=self.tribe)
+        _, large = self.write("put", f"/api/combos/{combo.id}/", self.payload(self.items, quantity=2))
+        self.assertEqual(small, large)
+
+    def test_update_keeps_ids_of_unchanged_rows(self):
+        response = self.client.post("/api/combos/", self.payload(self.items[:3]), format="json")
+        detail_ids = {detail["item"]: detail["id"] for detail in response.data["details"]}
+        price_ids = {price["type"]: price["id"] for price in response.data["prices"]}
+
+        data = self.payload(self.items[1:4])
+        data["details"][0]["quantity"] = 7
+        response = self.client.put(f"/api/combos/{response.data['id']}/", data, format="json")
+        details = {detail["item"]: detail for detail in response.data["details"]}
+
+        self.assertNotIn(self.items[0].id, details)
+        self.assertEqual(details[self.items[1].id]["id"], detail_ids[self.items[1].id])
+        self.assertEqual(details[self.items[1].id]["quantity"], 7)
+        self.assertEqual(details[self.items[2].id]["id"], detail_ids[self.items[2].id])
+        self.assertEqual({price["type"]: price["id"] for price in response.data["prices"]}["Coins"], price_ids["Coins"])
+
+    def test_patch_without_lists_keeps_rows(self):
+        response = self.client.post("/api/combos/", self.payload(self.items[:2]), format="json")
+        self.client.patch(f"/api/combos/{response.data['id']}/", {"name": "Renamed"}, format="json")
+        self.assertEqual(ComboDetail.objects.filter(combo_id=response.data["id"]).count(), 2)
+
+
+class ComboValuationTests(StoreAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.create_player("rider"))
+        self.metal = Item.objects.create(name="Metal")
+        self.ingot = Item.objects.create(name="Metal Ingot")
+        recipe = Recipe.objects.create(output_item=self.ingot, output_quantity=1)
+        RecipeIngredient.objects.create(recipe=recipe, item=self.metal, quantity=2)
+
+    def make_combo(self, name):
+        combo = Combo.objects.create(name=name, description="Kit", tribe=self.tribe)
+        ComboDetail.objects.create(combo=combo, item=self.ingot, quantity=2)
+        ComboDetail.objects.create(combo=combo, item=self.metal, quantity=1)
+        Price.objects.create(combo=combo, type="Coins", amount="10.00")
+        Price.objects.create(combo=combo, type="Item", item=self.ingot, quantity=3)
+        return combo
+
+    def test_contents_and_item_prices_expand_to_raw_materials(self):
+        combo = self.make_combo("Starter")
+        response = self.client.get("/api/combos/valuation/")
+        self.assertEqual(response.status_code, 200)
+        [valuation] = response.data
+        self.assertEqual(valuation["combo"], combo.id)
+        self.assertEqual(valuation["cost"], [{"item": self.metal.id, "item_name": "Metal", "quantity": 5.0}])
+        self.assertEqual(valuation["price"]["materials"], [{"item": self.metal.id, "item_name": "Metal", "quantity": 6.0}])
+        self.assertEqual(valuation["price"]["coins"], "10.00")
+        self.assertEqual(valuation["balance"], [{"item": self.metal.id, "item_name": "Metal", "quantity": 1.0}])
+        self.assertNotIn("price_to_cost", valuation)
+
+    def test_coins_are_always_a_decimal_string(self):
+        combo = Combo.objects.create(name="Free", description="Kit", tribe=self.tribe)
+        ComboDetail.objects.create(combo=combo, item=self.metal, quantity=1)
+        [valuation] = self.client.get("/api/combos/valuation/").data
+        self.assertEqual(valuation["price"], {"coins": "0.00", "materials": []})
+
+    def test_whole_catalog_in_fixed_queries(self):
+        self.make_combo("One")
+        self.client.get("/api/combos/valuation/")  # 🔹 Calienta la matriz de materias primas
+        with CaptureQueriesContext(connection) as small:
+            self.client.get("/api/combos/valuation/")
+        combos = [self.make_combo(f"Kit {index}") for index in range(5)]
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(f"/api/combos/valuation/?ids={','.join(str(combo.id) for combo in combos)}")
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(len(small), len(large))
+
+    def test_invalid_ids(self):
+        self.assertEqual(self.client.get("/api/combos/valuation/?ids=a").status_code, 400)
+
+
+class ItemAutocompleteTests(StoreAPITestCase):
+    def setUp(self):
+        super().setUp()
+        for name in ["Metal", "Metal Ingot", "Metal Hatchet", "Polymer", "Organic Polymer", "Cementing Paste"]:
+            Item.objects.create(name=name)
+
+    def names(self, query, limit=10):
+        response = self.client.get("/api/items/autocomplete/", {"q": query, "limit": limit})
+        self.assertEqual(response.status_code, 200)
+        return [item["name"] for item in response.data]
+
+    def test_prefix_matches_name_then_words(self):
+        self.assertEqual(self.names("met"), ["Metal", "Metal Hatchet", "Metal Ingot"])
+        self.assertEqual(self.names("poly"), ["Polymer", "Organic Polymer"])
+        self.assertEqual(self.names("met", limit=1), ["Metal"])
+
+    def test_typos_are_tolerated(self):
+        self.assertEqual(self.names("mteal ingot"), ["Metal Ingot"])
+        self.assertEqual(self.names("polimer")[:2], ["Polymer", "Organic Polymer"])
+
+    def test_index_follows_item_changes_without_queries(self):
+        self.names("met")
+        item = Item.objects.get(name="Metal Hatchet")
+        with self.committed():
+            item.name = "Stone Hatchet"
+            item.save()
+            Item.objects.get(name="Polymer").delete()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.names("hatch"), ["Stone Hatchet"])
+            self.assertEqual(self.names("poly"), ["Organic Polymer"])
+        self.assertEqual(len(queries), 0)
+
+
+class CatalogSnapshotTests(StoreAPITestCase):
+    def setUp(self):
+        super().setUp()
+        metal = Item.objects.create(name="Metal")
+        recipe = Recipe.objects.create(output_item=Item.objects.create(name="Metal Ingot"))
+        RecipeIngredient.objects.create(recipe=recipe, item=metal, quantity=2)
+        Dino.objects.create(fullname="Tyrannosaurus", name="Rex")
+
+    def test_snapshot_is_gzipped_and_revalidates_with_its_hash(self):
+        response = self.client.get("/api/catalog/snapshot/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual([item["name"] for item in data["items"]], ["Metal", "Metal Ingot"])
+        self.assertEqual(data["recipes"][0]["ingredients"][0]["quantity"], 2)
+        self.assertEqual(len(data["dinos"]), 1)
+
+        digest = response["X-Catalog-Hash"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/catalog/snapshot/", HTTP_IF_NONE_MATCH=f'"{digest}"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+
+        response = self.client.get(f"/api/catalog/snapshot/{digest}/")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(json.loads(response.content), data)
+
+    def test_images_are_relative_so_the_hash_is_request_independent(self):
+        from io import BytesIO
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from PIL import Image
+        buffer = BytesIO()
+        Image.new("RGB", (64, 64), "red").save(buffer, format="PNG")
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        with override_settings(MEDIA_ROOT=media.name):
+            Dino.objects.create(fullname="Argentavis", name="Argy", image=SimpleUploadedFile("argy.png", buffer.getvalue()))
+            Item.objects.create(name="Polymer", image=SimpleUploadedFile("polymer.png", buffer.getvalue()))
+            response = self.client.get("/api/catalog/snapshot/")
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.content)
+            argy = next(dino for dino in data["dinos"] if dino["name"] == "Argy")
+            polymer = next(item for item in data["items"] if item["name"] == "Polymer")
+            self.assertTrue(argy["image_url"].startswith("/media/"))
+            self.assertTrue(polymer["image"].startswith("/media/"))
+            other_host = self.client.get("/api/catalog/snapshot/", HTTP_HOST="localhost")
+            self.assertEqual(other_host["X-Catalog-Hash"], response["X-Catalog-Hash"])
+
+    def test_catalog_change_produces_a_new_hash(self):
+        digest = self.client.get("/api/catalog/snapshot/")["X-Catalog-Hash"]
+        with self.committed():
+            Dino.objects.create(fullname="Argentavis", name="Argy")
+        response = self.client.get(f"/api/catalog/snapshot/{digest}/")
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn(digest, response["Location"])
+
+
+class RendererTests(StoreAPITestCase):
+    def test_orjson_renderer_matches_drf_output(self):
+        from decimal import Decimal
+        from django.utils.translation import gettext_lazy
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import ORJSONRenderer
+
+        data = {
+            "price": Decimal("12.50"), "when": datetime(2025, 2, 10, 22, 0, 0, 123456, tzinfo=dt_timezone.utc),
+            "day": datetime(2025, 2, 10).date(), "took": timedelta(minutes=90), "label": gettext_lazy("Metal"),
+            7: ["a\u2028b", None, 1.5],
+        }
+        self.assertEqual(json.loads(ORJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+        self.assertNotIn("\u2028".encode(), ORJSONRenderer().render(data))
+
+    def test_large_responses_are_gzipped(self):
+        for index in range(40):
+            Item.objects.create(name=f"Item {index}", description="Lorem ipsum dolor sit amet")
+        response = self.client.get("/api/items/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 40)
+
+        response = self.client.get("/api/items/?page_size=1", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))  # 🔹 Menor que GZIP_MIN_LENGTH
+
+    def test_benchmark_measures_tribe_scoped_lists_as_a_user(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        with self.assertRaises(CommandError):
+            call_command("benchmark_renderers", "/api/genetics/", iterations=1, stdout=StringIO())
+
+        self.create_player("admin", superuser=True, tribe=None)
+        Genetic.objects.create(
+            dino=Dino.objects.create(fullname="Tyrannosaurus", name="Rex"), tribe=self.tribe, health_base=40,
+            stamina_base=40, oxygen_base=40, food_base=40, weight_base=40, damage_base=40,
+        )
+        output = StringIO()
+        call_command("benchmark_renderers", "/api/genetics/", iterations=1, stdout=output)
+        json_bytes = int(output.getvalue().splitlines()[1].split()[1])
+        self.assertGreater(json_bytes, 2)  # 🔹 Como anónimo la lista sería `[]`
+
+
+class TribeScopeTests(StoreAPITestCase):
+    """🔹 Cada tribu solo ve sus filas; los superusuarios ven todo"""
+
+    def setUp(self):
+        super().setUp()
+        self.dino = Dino.objects.create(fullname="Tyrannosaurus", name="Rex")
+        self.own = self.populate_tribe(self.tribe, "I")
+        self.other = self.populate_tribe(Tribe.objects.create(name="Red Moon", description=""), "R")
+        self.user = self.create_player("rider")
+
+    def populate_tribe(self, tribe, code):
+        name = tribe.name
+        player = User.objects.create_user(f"{code}-player", f"{code}@ironsky.site", "secret", tribe=tribe)
+        account = Account.objects.create(name=f"{name} main", short_code=code, tribe=tribe)
+        Session.objects.create(account=account, player=player)
+        SessionLog.objects.create(player=player, account=account, start_time=now(), end_time=now(), duration=timedelta(0))
+        Combo.objects.create(name=f"{name} combo", description="", tribe=tribe)
+        Genetic.objects.create(
+            dino=self.dino, tribe=tribe, health_base=1, stamina_base=1, oxygen_base=1, food_base=1, weight_base=1, damage_base=1
+        )
+        return tribe
+
+    def results(self, url):
+        data = self.client.get(url).data
+        return data["results"] if isinstance(data, dict) else data
+
+    def test_lists_are_scoped_to_the_user_tribe(self):
+        self.authenticate(self.user)
+        self.assertEqual([row["tribe"] for row in self.results("/api/combos/")], [self.own.id])
+        self.assertEqual([row["tribe"] for row in self.results("/api/genetics/")], [self.own.id])
+        self.assertEqual([row["name"] for row in self.results("/api/accounts/")], ["Iron Sky main"])
+        self.assertEqual([row["user_name"] for row in self.results("/api/sessions/")], ["I-player"])
+        self.assertEqual([row["tribe"] for row in self.results("/api/session-logs/")], [self.own.id])
+
+        other_combo = Combo.objects.get(tribe=self.other)
+        self.assertEqual(self.client.get(f"/api/combos/{other_combo.id}/").status_code, 404)
+        other_session = Session.objects.get(account__tribe=self.other)
+        self.assertEqual(self.client.delete(f"/api/sessions/{other_session.id}/").status_code, 404)
+
+    def test_superuser_sees_every_tribe(self):
+        self.authenticate(self.create_player("admin", superuser=True, tribe=None))
+        self.assertEqual(len(self.results("/api/genetics/")), 2)
+        self.assertEqual(len(self.results("/api/session-logs/")), 2)
+
+    def test_anonymous_sees_nothing_and_etag_depends_on_tribe(self):
+        self.assertEqual(self.results("/api/combos/"), [])
+        self.authenticate(self.user)
+        own_etag = self.client.get("/api/accounts/")["ETag"]
+        self.authenticate(User.objects.get(username="R-player"))
+        self.assertNotEqual(self.client.get("/api/accounts/")["ETag"], own_etag)
+
+
+class SalePostSearchTests(StoreAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.create_player("rider"))
+        self.rex = Dino.objects.create(fullname="Tyrannosaurus", name="Rex", category="PvP")
+        self.argy = Dino.objects.create(fullname="Argentavis", name="Argy", category="Flyer")
+        self.post(self.rex, 40, "USD", "30.00")
+        self.post(self.rex, 50, "USD", "10.00")
+        self.post(self.rex, 45, "EUR", "20.00")
+        self.post(self.argy, 60, "Item", None)
+
+    def post(self, dino, health, payment_method, price):
+        genetic = Genetic.objects.create(
+            dino=dino, tribe=self.tribe, health_base=health, stamina_base=1, oxygen_base=1, food_base=1, weight_base=1, damage_base=1
+        )
+        return SalePost.objects.create(
+            tribe=self.tribe, genetic=genetic, title=f"{dino.name} {health}", payment_method=payment_method, price_amount=price
+        )
+
+    def test_filters_and_facets(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/salepost/", {"category": "PvP", "health_base__gte": 45, "page_size": 10})
+        self.assertEqual(sorted(post["title"] for post in response.data["results"]), ["Rex 45", "Rex 50"])
+        self.assertEqual(response.data["facets"]["dino"], [{"dino": self.rex.id, "name": "Rex", "count": 2}])
+        self.assertEqual(
+            response.data["facets"]["payment_method"],
+            [{"payment_method": "EUR", "count": 1}, {"payment_method": "USD", "count": 1}],
+        )
+        self.assertEqual(len(queries), 2)  # 🔹 Página + facetas
+
+        response = self.client.get("/api/salepost/", {"price_amount__lte": "20", "payment_method": "USD", "page_size": 10})
+        self.assertEqual([post["title"] for post in response.data["results"]], ["Rex 50"])
+
+    def test_facets_ignore_their_own_filter(self):
+        response = self.client.get("/api/salepost/", {"payment_method": "USD", "page_size": 10})
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertEqual(
+            response.data["facets"]["payment_method"],
+            [{"payment_method": "USD", "count": 2}, {"payment_method": "EUR", "count": 1}, {"payment_method": "Item", "count": 1}],
+        )
+        self.assertEqual(response.data["facets"]["dino"], [{"dino": self.rex.id, "name": "Rex", "count": 2}])
+
+        response = self.client.get("/api/salepost/", {"dino": self.argy.id, "payment_method": "USD", "page_size": 10})
+        self.assertEqual(response.data["results"], [])
+        self.assertEqual(response.data["facets"]["dino"], [{"dino": self.rex.id, "name": "Rex", "count": 2}])
+        self.assertEqual(response.data["facets"]["payment_method"], [{"payment_method": "Item", "count": 1}])
+
+    def test_sort_by_price_and_stat_paginates(self):
+        response = self.client.get("/api/salepost/", {"ordering": "price_amount", "page_size": 2})
+        self.assertEqual([post["title"] for post in response.data["results"]], ["Rex 50", "Rex 45"])
+        response = self.client.get(response.data["next"])
+        self.assertEqual([post["title"] for post in response.data["results"]], ["Rex 40", "Argy 60"])  # 🔹 Sin precio al final
+        self.assertEqual(response.data["facets"]["dino"][1], {"dino": self.argy.id, "name": "Argy", "count": 1})
+
+        titles, url = [], "/api/salepost/?ordering=-health_base&page_size=3"
+        while url:
+            response = self.client.get(url)
+            titles += [post["title"] for post in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(titles, ["Argy 60", "Rex 50", "Rex 45", "Rex 40"])
+
+        self.post(self.argy, 30, "Item", None)
+        titles, url = [], "/api/salepost/?ordering=-price_amount&page_size=1"
+        while url:  # 🔹 El cursor cruza del último precio a los NULL y entre NULL
+            response = self.client.get(url)
+            titles += [post["title"] for post in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(titles, ["Rex 40", "Rex 45", "Rex 50", "Argy 30", "Argy 60"])
+
+    def test_invalid_filters_are_rejected(self):
+        self.assertEqual(self.client.get("/api/salepost/", {"category": "Tank"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/salepost/", {"price_amount__gte": "cheap"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/salepost/", {"ordering": "title"}).status_code, 400)
+
+
+class BreedingSimulationTests(StoreAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.create_player("rider"))
+        self.rex = Dino.objects.create(fullname="Tyrannosaurus", name="Rex")
+
+    def make_genetic(self, dino=None, tribe=None, **stats):
+        values = {f"{stat}_base": 40 for stat in ("health", "stamina", "oxygen", "food", "weight", "damage")}
+        values.update(stats)
+        return Genetic.objects.create(dino=dino or self.rex, tribe=tribe or self.tribe, **values)
+
+    def simulate(self, pairs, **extra):
+        data = {"pairs": [{"mother": mother.id, "father": father.id} for mother, father in pairs], **extra}
+        return self.client.post("/api/genetics/simulate/", data, format="json")
+
+    def test_inheritance_and_mutation_probabilities(self):
+        mother = self.make_genetic(health_base=50)
+        father = self.make_genetic(damage_base=45, damage_mutates=4)
+        response = self.simulate([(mother, father)], offspring=50_000, seed=7)
+        self.assertEqual(response.status_code, 200)
+        [result] = response.data
+
+        self.assertAlmostEqual(result["best_of_both"], 0.55 ** 2, delta=0.01)
+        self.assertAlmostEqual(result["mutation"], 1 - 0.975 ** 3, delta=0.005)
+        self.assertAlmostEqual(sum(result["best_stats"]), 1, places=3)
+        self.assertEqual(result["best_stats"][:4], [0, 0, 0, 0])  # 🔹 Las stats iguales siempre son "las mejores"
+
+        health, damage, food = (result["stats"][stat] for stat in ("health", "damage", "food"))
+        self.assertEqual((health["best"], damage["best"]), (50, 49))
+        self.assertAlmostEqual(health["base_mean"], 40 + 10 * 0.55, delta=0.2)
+        self.assertAlmostEqual(damage["mutates_mean"], 4 * 0.55 + 2 * 3 * 0.025 / 6, delta=0.1)
+        self.assertEqual(food["best_probability"], 1.0)
+
+    def test_seed_makes_results_reproducible(self):
+        pairs = [(self.make_genetic(health_base=50), self.make_genetic(oxygen_base=60))] * 3
+        first = self.simulate(pairs, offspring=1000, seed=3).data
+        self.assertEqual(first, self.simulate(pairs, offspring=1000, seed=3).data)
+
+    def test_pairs_must_share_dino_and_tribe(self):
+        raptor = Dino.objects.create(fullname="Raptor", name="Raptor")
+        mother = self.make_genetic()
+        self.assertEqual(self.simulate([(mother, self.make_genetic(dino=raptor))]).status_code, 400)
+        other = self.make_genetic(tribe=Tribe.objects.create(name="Red Moon", description=""))
+        response = self.simulate([(mother, other)])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(other.id), str(response.data["pairs"]))
+
+
+class GeneticLineageTests(StoreAPITestCase):
+    """🔹 La tabla de clausura sigue a los cambios de padres y a los borrados"""
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.create_player("rider"))
+        self.rex = Dino.objects.create(fullname="Tyrannosaurus", name="Rex")
+        self.grandma = self.make_genetic()
+        self.mom = self.make_genetic(mother=self.grandma)
+        self.dad = self.make_genetic()
+        self.kid = self.make_genetic(mother=self.mom, father=self.dad)
+
+    def make_genetic(self, dino=None, **parents):
+        return Genetic.objects.create(
+            dino=dino or self.rex, tribe=self.tribe, health_base=40, stamina_base=40, oxygen_base=40,
+            food_base=40, weight_base=40, damage_base=40, **parents,
+        )
+
+    def lineage(self, genetic, action, query=""):
+        response = self.client.get(f"/api/genetics/{genetic.id}/{action}/{query}")
+        self.assertEqual(response.status_code, 200)
+        return [(row["id"], row["depth"]) for row in response.data]
+
+    def test_ancestors_and_descendants(self):
+        self.assertEqual(self.lineage(self.kid, "ancestors"), [(self.mom.id, 1), (self.dad.id, 1), (self.grandma.id, 2)])
+        self.assertEqual(self.lineage(self.kid, "ancestors", "?depth=1"), [(self.mom.id, 1), (self.dad.id, 1)])
+        self.assertEqual(self.lineage(self.grandma, "descendants"), [(self.mom.id, 1), (self.kid.id, 2)])
+
+    def test_reparenting_updates_the_whole_subtree(self):
+        founder = self.make_genetic()
+        response = self.client.patch(f"/api/genetics/{self.grandma.id}/", {"father": founder.id}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn((founder.id, 3), self.lineage(self.kid, "ancestors"))
+
+        self.client.patch(f"/api/genetics/{self.mom.id}/", {"mother": None}, format="json")
+        self.assertEqual(self.lineage(self.kid, "ancestors"), [(self.mom.id, 1), (self.dad.id, 1)])
+
+    def test_delete_detaches_descendants(self):
+        self.mom.delete()
+        self.kid.refresh_from_db()
+        self.assertIsNone(self.kid.mother_id)
+        self.assertEqual(self.lineage(self.kid, "ancestors"), [(self.dad.id, 1)])
+        self.assertEqual(self.lineage(self.grandma, "descendants"), [])
+
+    def test_parents_must_be_visible_to_the_user(self):
+        other = Tribe.objects.create(name="Other", description="")
+        foreign = Genetic.objects.create(
+            dino=self.rex, tribe=other, health_base=40, stamina_base=40, oxygen_base=40,
+            food_base=40, weight_base=40, damage_base=40,
+        )
+        response = self.client.patch(f"/api/genetics/{self.dad.id}/", {"mother": foreign.id}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("mother", response.data)
+        self.assertIsNone(Genetic.objects.get(id=self.dad.id).mother_id)
+
+        self.authenticate(self.create_player("admin", superuser=True, tribe=None))
+        response = self.client.patch(f"/api/genetics/{self.dad.id}/", {"mother": foreign.id}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_rejects_cycles_and_other_dinos(self):
+        response = self.client.patch(f"/api/genetics/{self.grandma.id}/", {"mother": self.kid.id}, format="json")
+        self.assertEqual(response.status_code, 400)
+        raptor = self.make_genetic(dino=Dino.objects.create(fullname="Raptor", name="Raptor"))
+        response = self.client.patch(f"/api/genetics/{self.kid.id}/", {"father": raptor.id}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("father", response.data)
@@ -3,7 +3,9 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     TribeViewSet, UserViewSet, ItemViewSet, DinoViewSet, GeneticViewSet, 
     ComboViewSet, ComboDetailViewSet, AccountViewSet, 
-    SessionViewSet, SessionLogViewSet, CustomTokenObtainPairView, RecipeViewSet, RecipeIngredientViewSet, BlueprintViewSet, BlueprintMaterialViewSet, SalePostViewSet, get_current_user
+    SessionViewSet, SessionLogViewSet, CustomTokenObtainPairView, RecipeViewSet, RecipeIngredientViewSet, BlueprintViewSet, BlueprintMaterialViewSet, SalePostViewSet, get_current_user,
+    crafting_plan, playtime_report, catalog_export, catalog_import,
+    catalog_snapshot, catalog_snapshot_by_hash
 )
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.conf.urls.static import static
@@ -30,6 +32,12 @@ urlpatterns = [
     path('token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('users/me/', get_current_user, name='current_user'),
+    path('crafting/plan/', crafting_plan, name='crafting_plan'),
+    path('playtime/', playtime_report, name='playtime_report'),
+    path('catalog/export/<slug:kind>.<slug:fmt>', catalog_export, name='catalog_export'),
+    path('catalog/import/<slug:kind>/', catalog_import, name='catalog_import'),
+    path('catalog/snapshot/', catalog_snapshot, name='catalog_snapshot'),
+    path('catalog/snapshot/<slug:digest>/', catalog_snapshot_by_hash, name='catalog_snapshot_by_hash'),
 ]
 
 urlpatterns += router.urls
\ No newline at end of file
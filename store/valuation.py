@@ -0,0 +1,64 @@
+"""🔹 Valoración de combos en materias primas.
+
+Cada `ComboDetail` y cada `Price` de tipo Item se expanden por su cadena de recetas y
+blueprints hasta materias primas. Todo el lote de combos se resuelve con los vectores por
+unidad memorizados del BOM (`bom.raw_materials_batch`), no con un recorrido por línea.
+
+Las materias primas distintas no son comparables entre sí (1 metal no vale lo mismo que
+1 elemento), así que no se suman: costo, precio y balance se reportan por materia prima.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from .bom import raw_materials_batch
+from .models import Item
+
+PRECISION = 3
+
+
+def _materials(vector, names):
+    return [
+        {"item": item_id, "item_name": names.get(item_id), "quantity": round(float(quantity), PRECISION)}
+        for item_id, quantity in sorted(vector.items(), key=lambda entry: (-entry[1], entry[0]))
+        if round(quantity, PRECISION)
+    ]
+
+
+def value_combos(combos):
+    """Retorna `[{combo, name, cost, price, balance}]`.
+
+    Espera combos con `details` y `prices` precargados. `price.coins` es siempre un
+    decimal en texto (`"0.00"` si no hay precio en monedas), como `Price.amount` en la API.
+    `balance` es precio menos costo por materia prima: positivo si el comprador entrega
+    más material del que recibe.
+    """
+    combos = list(combos)
+    demands, coins = [], []
+    for combo in combos:
+        contents, price = defaultdict(int), defaultdict(int)
+        for detail in combo.details.all():
+            contents[detail.item_id] += detail.quantity
+        total_coins = Decimal('0.00')
+        for row in combo.prices.all():
+            if row.type == "Item" and row.item_id and row.quantity:
+                price[row.item_id] += row.quantity
+            elif row.type == "Coins" and row.amount is not None:
+                total_coins += row.amount
+        demands += [contents, price]
+        coins.append(total_coins)
+
+    vectors = raw_materials_batch(demands)
+    names = dict(Item.objects.filter(id__in={item_id for vector in vectors for item_id in vector}).values_list('id', 'name'))
+
+    results = []
+    for position, combo in enumerate(combos):
+        cost, price = vectors[2 * position], vectors[2 * position + 1]
+        balance = {item_id: price.get(item_id, 0) - cost.get(item_id, 0) for item_id in set(cost) | set(price)}
+        results.append({
+            "combo": combo.id,
+            "name": combo.name,
+            "cost": _materials(cost, names),
+            "price": {"coins": str(coins[position]), "materials": _materials(price, names)},
+            "balance": _materials(balance, names),
+        })
+    return results
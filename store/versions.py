@@ -0,0 +1,39 @@
+import uuid
+
+from django.core.cache import cache
+from django.utils.timezone import now
+
+
+def _cache_key(name):
+    return f"table-version:{name}"
+
+
+def catalog_version(model):
+    """Nombre de la versión de catálogo de un modelo (ej. `catalog:item`)"""
+    return f"catalog:{model._meta.model_name}"
+
+
+def bump_version(name):
+    """🔹 Marca la tabla `name` como modificada (nuevo tag + fecha de modificación)"""
+    cache.set(_cache_key(name), (uuid.uuid4().hex[:16], now().timestamp()), None)
+
+
+def get_version(name):
+    """Retorna `(tag, timestamp)` de la última modificación conocida de la tabla `name`.
+
+    Si la caché no tiene la versión (reinicio, expulsión) se genera una nueva:
+    los clientes reciben un 200 completo en lugar de un 304 incorrecto.
+    """
+    key = _cache_key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, (uuid.uuid4().hex[:16], now().timestamp()), None)
+        version = cache.get(key)
+    return version
+
+
+def get_version_tags(names):
+    """Retorna los tags de varias versiones con una sola lectura de la caché"""
+    keys = {name: _cache_key(name) for name in names}
+    cached = cache.get_many(keys.values())
+    return [cached[key][0] if key in cached else get_version(name)[0] for name, key in keys.items()]
@@ -1,13 +1,14 @@
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes
 from rest_framework.views import APIView
 from django.utils.timezone import now
 from rest_framework import viewsets, status, serializers, permissions
 from rest_framework.response import Response
-from .models import Tribe, User, Item, Dino, Genetic, Combo, ComboDetail, Account, Session, SessionLog, Recipe, RecipeIngredient, Blueprint, BlueprintMaterial, SalePost
+from .models import GENETIC_STAT_FIELDS, Tribe, User, Item, Dino, Genetic, Combo, ComboDetail, Price, Account, Session, SessionLog, Recipe, RecipeIngredient, Blueprint, BlueprintMaterial, SalePost, PlaytimeRollup
 from .serializers import (
     TribeSerializer, UserSerializer, ItemSerializer, DinoSerializer, GeneticSerializer,
     ComboSerializer, ComboDetailSerializer, AccountSerializer,
-    SessionSerializer, SessionLogSerializer, RecipeSerializer, RecipeIngredientSerializer, BlueprintSerializer, BlueprintMaterialSerializer, SalePostSerializer
+    SessionSerializer, SessionLogSerializer, RecipeSerializer, RecipeIngredientSerializer, BlueprintSerializer, BlueprintMaterialSerializer, SalePostSerializer,
+    CraftingPlanSerializer, SessionBulkEndSerializer, BreedingSimulationSerializer, GeneticLineageSerializer
 )
 from rest_framework.decorators import action
 from rest_framework_simplejwt.views import TokenObtainPairView
@@ -15,13 +16,136 @@ from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth.hashers import make_password
 from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework.parsers import MultiPartParser
 from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, connection, transaction
+from django.db.models.signals import post_save
+from django.core.handlers.asgi import ASGIRequest
+from django.views.static import serve
+from django.http import Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.shortcuts import redirect
+from django.db.models import Count, F, Prefetch, Sum
+from django.utils.dateparse import parse_date
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from .autocomplete import DEFAULT_LIMIT, MAX_LIMIT, current_index, image_urls
+from .bom import expand_ingredients, plan_materials
+from .breeding import simulate_pairs
+from .catalog_io import CATALOG_COLUMNS, aiter_export, export_csv, export_ndjson, import_rows, read_csv, read_ndjson
+from .events import broadcast_session_event
+from .playtime import record_playtime
+from .snapshot import get_snapshot
+from .valuation import value_combos
+from .pagination import GeneticPagination, ItemPagination, SalePostPagination, SessionLogPagination
+from .versions import catalog_version, get_version, get_version_tags
+import gzip
+import hashlib
+import io
 import json
+import math
+from collections import defaultdict
+from decimal import Decimal
 
 User = get_user_model()
 
+
+class ConditionalListMixin:
+    """🔹 Responde 304 Not Modified a los polls de `list()` si la tabla no cambió.
+
+    `version_key` es el nombre de la versión que mantienen las señales (ver `store.signals`).
+    La validación no toca el serializer ni consulta las filas.
+    """
+    version_key = None
+
+    def get_list_version(self, request):
+        """Retorna `(tag, timestamp)` de la versión que valida esta lista"""
+        return get_version(self.version_key)
+
+    def list(self, request, *args, **kwargs):
+        tag, _ = self.get_list_version(request)
+        etag = f'"{self.version_key}-{tag}"'
+
+        # 🔹 Solo ETag: `Last-Modified` tiene resolución de segundos y daría 304 falsos
+        # con dos escrituras en el mismo segundo
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'  # 🔹 Siempre revalidar con el servidor
+        return response
+
+
+class TribeScopedMixin:
+    """🔹 Limita el queryset a la tribu del usuario (como `UserViewSet`).
+
+    Superusuarios ven todo; anónimos y usuarios sin tribu no ven nada. `tribe_field`
+    es la ruta a la tribu desde el modelo (ej. `account__tribe`).
+    """
+    tribe_field = 'tribe'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_authenticated and user.is_superuser:
+            return queryset
+        if not user.is_authenticated or user.tribe_id is None:
+            return queryset.none()
+        return queryset.filter(**{f'{self.tribe_field}_id': user.tribe_id})
+
+    def get_list_version(self, request):
+        """El ETag depende de la tribu: dos tribus nunca comparten una respuesta cacheada"""
+        tag, timestamp = super().get_list_version(request)
+        scope = 'all' if request.user.is_superuser else f't{request.user.tribe_id}'
+        return f'{scope}.{tag}', timestamp
+
+
+class CatalogCacheMixin:
+    """🔹 Caché de lectura para el catálogo estático (`list` y `retrieve`).
+
+    La clave incluye la URL completa y las versiones de `catalog_models`, que las
+    señales incrementan en cada cambio: una respuesta cacheada nunca queda obsoleta
+    y una lectura en caliente no consulta la base de datos.
+    """
+    catalog_models = ()
+
+    def get_catalog_key(self, request):
+        tags = get_version_tags([catalog_version(model) for model in self.catalog_models])
+        url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        return f"catalog:{self.basename}:{self.action}:{url}:{'.'.join(tags)}"
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        key = self.get_catalog_key(request)
+        data = caches['catalog'].get(key)
+        if data is not None:
+            return Response(data)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            caches['catalog'].set(key, response.data)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        """🔹 Incluye los datos de sesión del usuario como claims del token"""
+        token = super().get_token(user)
+        token['username'] = user.username
+        token['role'] = user.role
+        token['tribe'] = user.tribe_id
+        token['tribe_name'] = user.tribe.name if user.tribe else None
+        token['is_superuser'] = user.is_superuser
+        return token
+
     def validate(self, attrs):
         data = super().validate(attrs)
         user = self.user
@@ -59,12 +183,13 @@ class UserViewSet(viewsets.ModelViewSet):
         if not user.is_authenticated:  # 🔹 Evita error con AnonymousUser
             return User.objects.none()  # 🔹 No devuelve nada para usuarios no autenticados
 
+        users = User.objects.select_related('tribe')  # 🔹 `tribe_name` sin una consulta por fila
         if user.is_superuser:
-            return User.objects.all()
+            return users.all()
         elif user.role == 'admin':
-            return User.objects.filter(tribe=user.tribe)
+            return users.filter(tribe=user.tribe)
         else:
-            return User.objects.filter(id=user.id)  # 🔹 Solo ve su propia info
+            return users.filter(id=user.id)  # 🔹 Solo ve su propia info
 
     def get_permissions(self):
         """🔹 Controla permisos según el rol."""
@@ -87,19 +212,261 @@ def get_current_user(request):
     serializer = UserSerializer(user)
     return Response(serializer.data)
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def crafting_plan(request):
+    """🔹 Planifica muchos objetivos `(item, quantity)` a la vez y agrega las materias primas.
+
+    Usa recetas y blueprints; reporta los espacios de inventario según `Item.stack`.
+    """
+    serializer = CraftingPlanSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    targets = [(target["item"], target["quantity"]) for target in serializer.validated_data["targets"]]
+
+    try:
+        materials = plan_materials(targets)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    items = Item.objects.in_bulk([material["item"] for material in materials])
+    for material in materials:
+        item = items[material["item"]]
+        material["item_name"] = item.name
+        material["item_image"] = request.build_absolute_uri(item.image.url) if item.image else None
+    materials.sort(key=lambda material: material["item_name"])
+
+    return Response({
+        "materials": materials,
+        "total_slots": sum(material["slots"] for material in materials),
+    })
+
+# 🔹 Campos de `values()` por cada agrupación permitida en el reporte de tiempo jugado
+PLAYTIME_GROUPS = {
+    'player': ['player', 'player__username'],
+    'account': ['account', 'account__name'],
+    'day': ['day'],
+}
+PLAYTIME_NAMES = {'player__username': 'player_name', 'account__name': 'account_name'}
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def playtime_report(request):
+    """🔹 Tiempo jugado agregado desde los rollups (nunca lee SessionLog).
+
+    Solo las cuentas de la tribu del usuario (superusuarios ven todo). Parámetros: `start`/`end` (YYYY-MM-DD, inclusivos), `player`, `account` y
+    `group_by` (lista separada por comas de player, account, day).
+    """
+    group_by = [group.strip() for group in request.query_params.get('group_by', 'player').split(',') if group.strip()]
+    invalid = [group for group in group_by if group not in PLAYTIME_GROUPS]
+    if invalid or not group_by:
+        return Response({"error": f"group_by debe combinar: {', '.join(PLAYTIME_GROUPS)}."}, status=status.HTTP_400_BAD_REQUEST)
+
+    rollups = PlaytimeRollup.objects.all()
+    if not request.user.is_superuser:
+        rollups = rollups.filter(account__tribe_id=request.user.tribe_id) if request.user.tribe_id else rollups.none()
+    for param, lookup in (('start', 'day__gte'), ('end', 'day__lte')):
+        value = request.query_params.get(param)
+        if value:
+            day = parse_date(value)
+            if day is None:
+                return Response({"error": f"'{param}' debe tener formato YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+            rollups = rollups.filter(**{lookup: day})
+    for param in ('player', 'account'):
+        value = request.query_params.get(param)
+        if value:
+            if not value.isdigit():
+                return Response({"error": f"'{param}' debe ser un id."}, status=status.HTTP_400_BAD_REQUEST)
+            rollups = rollups.filter(**{f'{param}_id': value})
+
+    fields = [field for group in group_by for field in PLAYTIME_GROUPS[group]]
+    rows = rollups.values(*fields).annotate(total=Sum('duration'), session_count=Sum('sessions')).order_by(*fields)
+
+    results = []
+    for row in rows:
+        seconds = row.pop('total').total_seconds()
+        result = {PLAYTIME_NAMES.get(key, key): value for key, value in row.items()}
+        result['sessions'] = result.pop('session_count')
+        result['seconds'] = int(seconds)
+        result['hours'] = round(seconds / 3600, 2)
+        results.append(result)
+    return Response(results)
+
+def serve_image_variant(request, path):
+    """🔹 Sirve miniaturas con caché de larga duración (su URL nunca cambia de contenido).
+
+    Solo se enruta junto con `/media/` (DEBUG); un servidor web delante debe enviar la misma cabecera.
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+CATALOG_EXPORT_TYPES = {
+    'ndjson': (export_ndjson, 'application/x-ndjson; charset=utf-8'),
+    'csv': (export_csv, 'text/csv; charset=utf-8'),
+}
+
+
+def catalog_export(request, kind, fmt):
+    """🔹 Exporta `items`, `recipes`, `recipe-ingredients`, `blueprints` o `blueprint-materials` en streaming"""
+    if kind not in CATALOG_COLUMNS or fmt not in CATALOG_EXPORT_TYPES:
+        raise Http404
+    generate, content_type = CATALOG_EXPORT_TYPES[fmt]
+    lines = generate(kind)
+    if isinstance(request, ASGIRequest):
+        lines = aiter_export(lines)  # 🔹 Bajo ASGI un iterador síncrono se leería completo a memoria
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{kind}.{fmt}"'
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+@parser_classes([MultiPartParser])
+def catalog_import(request, kind):
+    """🔹 Importa un archivo `file` (.ndjson o .csv) con upserts por bloques (clave: nombre de item)"""
+    if kind not in CATALOG_COLUMNS:
+        return Response({"error": "Tipo de catálogo desconocido."}, status=status.HTTP_404_NOT_FOUND)
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({"error": "Debe adjuntar un archivo `file`."}, status=status.HTTP_400_BAD_REQUEST)
+
+    lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')  # 🔹 Se lee línea a línea
+    rows = read_csv(lines) if upload.name.lower().endswith('.csv') else read_ndjson(lines)
+    try:
+        result = import_rows(kind, rows)
+    except UnicodeDecodeError:
+        return Response({"error": "El archivo debe estar en UTF-8."}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(result, status=status.HTTP_400_BAD_REQUEST if result['errors'] else status.HTTP_200_OK)
+
+
+def _snapshot_response(request, digest, body):
+    """El cuerpo va comprimido si el cliente acepta gzip (casi siempre)"""
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = HttpResponse(body, content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(gzip.decompress(body), content_type='application/json')
+    response['ETag'] = f'"{digest}"'
+    response['X-Catalog-Hash'] = digest
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+def catalog_snapshot(request):
+    """🔹 Catálogo completo (items, recetas, blueprints, dinos) en un JSON; 304 si `If-None-Match` es el hash actual"""
+    digest, body = get_snapshot()
+    if f'"{digest}"' in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+        response['ETag'] = f'"{digest}"'
+    else:
+        response = _snapshot_response(request, digest, body)
+    response['Cache-Control'] = 'no-cache'  # 🔹 Siempre se revalida; el 304 no descarga nada
+    return response
+
+
+def catalog_snapshot_by_hash(request, digest):
+    """🔹 Snapshot direccionado por su hash: inmutable. Un hash viejo redirige al actual."""
+    current, body = get_snapshot()
+    if digest != current:
+        response = redirect('catalog_snapshot_by_hash', digest=current)
+        response['Cache-Control'] = 'no-cache'
+        return response
+    response = _snapshot_response(request, current, body)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
 class TribeViewSet(viewsets.ModelViewSet):
     queryset = Tribe.objects.all()
     serializer_class = TribeSerializer
 
 
-class DinoViewSet(viewsets.ModelViewSet):
+class DinoViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     queryset = Dino.objects.all()
     serializer_class = DinoSerializer
+    catalog_models = (Dino,)
 
 
-class GeneticViewSet(viewsets.ModelViewSet):
-    queryset = Genetic.objects.all()
+class GeneticViewSet(TribeScopedMixin, viewsets.ModelViewSet):
+    queryset = Genetic.objects.select_related('dino', 'tribe')
     serializer_class = GeneticSerializer
+    pagination_class = GeneticPagination
+
+    def get_queryset(self):
+        """🔹 Filtros por umbral de stats: `?dino=3&health_base__gte=45&damage_mutates__gte=20`.
+
+        Cada columna `*_base`/`*_mutates` acepta `=`, `__gte`, `__lte`, `__gt` y `__lt`;
+        además `dino` y `tribe` por id. Orden con `?ordering=-health_base`.
+        Solo se ven las genéticas de la tribu del usuario (salvo superusuarios).
+        """
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            return queryset
+
+        filters = {}
+        for param, value in self.request.query_params.items():
+            if param in ('dino', 'tribe'):
+                filters[f'{param}_id'] = parse_filter_value(param, value)
+            else:
+                filters.update(range_filter(param, value, GENETIC_STAT_FIELDS))
+        return queryset.filter(**filters)
+
+    def get_keyset_ordering(self):
+        if self.action in ('ancestors', 'descendants'):
+            return ('depth', 'id')  # 🔹 Generación más cercana primero
+        ordering = self.request.query_params.get('ordering')
+        if not ordering:
+            return None
+        if ordering.lstrip('-') not in GENETIC_STAT_FIELDS + ['id']:
+            raise serializers.ValidationError({"ordering": f"Debe ser 'id' o una de: {', '.join(GENETIC_STAT_FIELDS)}."})
+        # 🔹 El id desempata en la misma dirección que la stat
+        return (ordering, '-id' if ordering.startswith('-') else 'id') if ordering.lstrip('-') != 'id' else (ordering,)
+
+    @action(detail=True, methods=['get'])
+    def ancestors(self, request, pk=None):
+        """🔹 Todos los ancestros (madre, padre, abuelos...) por cercanía; `?depth=N` limita las generaciones"""
+        return self.lineage('descendant_links', 'descendant')
+
+    @action(detail=True, methods=['get'])
+    def descendants(self, request, pk=None):
+        """🔹 Todos los descendientes por cercanía; `?depth=N` limita las generaciones"""
+        return self.lineage('ancestor_links', 'ancestor')
+
+    def lineage(self, relation, role):
+        """Una sola consulta sobre la tabla de clausura (`relation__role` = esta genética), paginada por `(depth, id)`"""
+        genetic = self.get_object()
+        queryset = self.get_queryset().filter(**{f'{relation}__{role}': genetic})
+        queryset = queryset.annotate(depth=F(f'{relation}__depth'))
+        depth = self.request.query_params.get('depth')
+        if depth is not None:
+            try:
+                queryset = queryset.filter(depth__lte=int(depth))
+            except ValueError:
+                raise serializers.ValidationError({"depth": "Debe ser un entero."})
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(GeneticLineageSerializer(page, many=True).data)
+
+    @action(detail=False, methods=['post'])
+    def simulate(self, request):
+        """🔹 Simula crías de una o varias parejas `{"pairs": [{"mother", "father"}], "offspring", "seed"}`.
+
+        Las dos genéticas de cada pareja deben ser del mismo dino y visibles para el usuario.
+        """
+        serializer = BreedingSimulationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        ids = {pair[role] for pair in data["pairs"] for role in ('mother', 'father')}
+        genetics = self.get_queryset().select_related(None).in_bulk(ids)
+        missing = ids - set(genetics)
+        if missing:
+            raise serializers.ValidationError({"pairs": f"Genéticas inexistentes: {sorted(missing)}"})
+
+        pairs = [(genetics[pair["mother"]], genetics[pair["father"]]) for pair in data["pairs"]]
+        mixed = [(mother.id, father.id) for mother, father in pairs if mother.dino_id != father.dino_id]
+        if mixed:
+            raise serializers.ValidationError({"pairs": f"Parejas de dinos distintos: {mixed}"})
+        return Response(simulate_pairs(pairs, data["offspring"], data.get("seed")))
 
 
     def perform_create(self, serializer):
@@ -107,22 +474,145 @@ class GeneticViewSet(viewsets.ModelViewSet):
         serializer.save(tribe=self.request.user.tribe)
 
 
+RANGE_LOOKUPS = ('gte', 'lte', 'gt', 'lt')
+
+
+def parse_filter_value(param, value, parse=int):
+    """Convierte el valor de un filtro de la URL; 400 si no es un número válido"""
+    try:
+        return parse(value)
+    except (ValueError, ArithmeticError):
+        raise serializers.ValidationError({param: "Debe ser un entero." if parse is int else "Valor numérico inválido."})
+
+
+def range_filter(param, value, fields, parse=int, prefix='', exact=True):
+    """🔹 `{prefix + param: valor}` si `param` es uno de `fields` con un lookup de rango
+    (`__gte`, `__lte`, `__gt`, `__lt`) o sin lookup (si `exact`); si no, `{}`"""
+    field, _, lookup = param.partition('__')
+    if field not in fields or (lookup not in RANGE_LOOKUPS if lookup else not exact):
+        return {}
+    return {f'{prefix}{param}': parse_filter_value(param, value, parse)}
+
+
 class SalePostViewSet(viewsets.ModelViewSet):
 
     queryset = SalePost.objects.all()
     serializer_class = SalePostSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = SalePostPagination
+    # 🔹 Filtros de texto con opciones fijas: parámetro -> (lookup, opciones válidas)
+    choice_filters = {
+        'category': ('genetic__dino__category', [choice for choice, _ in Dino.CATEGORY_CHOICES]),
+        'egg_type': ('genetic__dino__egg_type', [choice for choice, _ in Dino.EGG_TYPE_CHOICES]),
+        'payment_method': ('payment_method', [choice for choice, _ in SalePost.PAYMENT_METHODS]),
+    }
 
     def perform_create(self, serializer):
         """ 🔹 Asigna automáticamente la tribu del usuario autenticado """
         serializer.save(tribe=self.request.user.tribe)
 
     def get_queryset(self):
-        """ 🔹 Filtra para que los usuarios solo puedan ver publicaciones disponibles """
-        return SalePost.objects.filter(is_for_sale=True)
+        """ 🔹 Filtra para que los usuarios solo puedan ver publicaciones disponibles.
+
+        En `list` acepta `dino`, `item_payment`, `category`, `egg_type`, `payment_method`,
+        `price_amount__gte`/`__lte` y mínimos/máximos de stats de la genética con la misma
+        sintaxis que `/api/genetics/` (ej. `health_base__gte=45`). Orden con
+        `?ordering=price_amount`, `-price_amount` o una stat (`-damage_mutates`).
+        """
+        queryset = SalePost.objects.filter(is_for_sale=True).select_related('genetic__dino', 'genetic__tribe')
+        if self.action != 'list':
+            return queryset
+
+        filters, selected = {}, {}  # 🔹 `selected`: filtros de las facetas (dino y método de pago)
+        for param, value in self.request.query_params.items():
+            if param == 'dino':
+                selected['genetic__dino_id'] = parse_filter_value(param, value)
+            elif param == 'item_payment':
+                filters['item_payment_id'] = parse_filter_value(param, value)
+            elif param in self.choice_filters:
+                name, choices = self.choice_filters[param]
+                if value not in choices:
+                    raise serializers.ValidationError({param: f"Debe ser una de: {', '.join(choices)}."})
+                (selected if name == 'payment_method' else filters)[name] = value
+            else:
+                filters.update(range_filter(param, value, ('price_amount',), parse=Decimal, exact=False))
+                filters.update(range_filter(param, value, GENETIC_STAT_FIELDS, prefix='genetic__'))
+        queryset = queryset.filter(**filters)
+        self.facet_queryset, self.facet_selection = queryset, selected  # 🔹 Búsqueda sin los filtros de facetas
+        queryset = queryset.filter(**selected)
+
+        sort = self.get_sort()  # 🔹 Ordenar no filtra: sin precio van al final (ver `KeysetPagination`)
+        if sort in GENETIC_STAT_FIELDS:
+            queryset = queryset.annotate(sort_stat=F(f'genetic__{sort}'))
+        return queryset
+
+    def get_sort(self):
+        """Campo de `?ordering=` (sin el signo) o None"""
+        ordering = self.request.query_params.get('ordering', '')
+        field = ordering.lstrip('-')
+        if not field:
+            return None
+        if field != 'price_amount' and field not in GENETIC_STAT_FIELDS:
+            raise serializers.ValidationError(
+                {"ordering": f"Debe ser 'price_amount' o una de: {', '.join(GENETIC_STAT_FIELDS)}."}
+            )
+        return field
+
+    def get_keyset_ordering(self):
+        sort = self.get_sort()
+        if sort is None:
+            return None
+        descending = self.request.query_params['ordering'].startswith('-')
+        name = 'sort_stat' if sort in GENETIC_STAT_FIELDS else sort
+        return (f"-{name}", '-id') if descending else (name, 'id')  # 🔹 El id desempata en la misma dirección
 
-class ComboViewSet(viewsets.ModelViewSet):
-    queryset = Combo.objects.all()
+    def list(self, request, *args, **kwargs):
+        """Página de resultados + `facets` (conteos por dino y por método de pago) de toda la búsqueda.
+
+        Cada faceta se cuenta sin su propio filtro (con `?payment_method=USD` la faceta de
+        pago sigue mostrando las demás opciones) pero con todos los demás. Las facetas son una
+        segunda consulta: la página lleva LIMIT sobre un keyset y las facetas necesitan todas
+        las filas sin sus propios filtros, algo que un `Count` de ventana sobre la página no
+        puede contar. Solo van en la respuesta paginada (`?page_size=`/`?cursor=`); sin
+        paginar la respuesta sigue siendo el arreglo de publicaciones.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        if self.paginator.paginated:
+            response.data['facets'] = self.get_facets(self.facet_queryset, self.facet_selection)
+        return response
+
+    def get_facets(self, queryset, selected):
+        """🔹 Ambos conteos salen de una sola consulta agrupada por (dino, método de pago);
+        cada fila suma en una faceta si cumple el filtro seleccionado de la otra"""
+        rows = (
+            queryset.order_by().values('genetic__dino_id', 'genetic__dino__name', 'payment_method')
+            .annotate(count=Count('id'))
+        )
+        dino_id, payment_method = selected.get('genetic__dino_id'), selected.get('payment_method')
+        dinos, payment_methods = {}, defaultdict(int)
+        for row in rows:
+            if payment_method is None or row['payment_method'] == payment_method:
+                dino = dinos.setdefault(row['genetic__dino_id'], {
+                    "dino": row['genetic__dino_id'], "name": row['genetic__dino__name'], "count": 0,
+                })
+                dino["count"] += row['count']
+            if dino_id is None or row['genetic__dino_id'] == dino_id:
+                payment_methods[row['payment_method']] += row['count']
+        return {
+            "dino": sorted(dinos.values(), key=lambda facet: (-facet["count"], facet["name"])),
+            "payment_method": [
+                {"payment_method": method, "count": count}
+                for method, count in sorted(payment_methods.items(), key=lambda entry: (-entry[1], entry[0]))
+            ],
+        }
+
+class ComboViewSet(TribeScopedMixin, viewsets.ModelViewSet):
+    queryset = Combo.objects.prefetch_related(
+        Prefetch('prices', queryset=Price.objects.select_related('item')),
+        Prefetch('details', queryset=ComboDetail.objects.select_related('item')),
+    ).order_by('id')
     serializer_class = ComboSerializer
 
     def create(self, request, *args, **kwargs):
@@ -141,19 +631,44 @@ class ComboViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         """ Asigna la tribu automáticamente al crear un combo """
         serializer.save(tribe=self.request.user.tribe)
+        self.reload_with_children(serializer)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        self.reload_with_children(serializer)
+
+    def reload_with_children(self, serializer):
+        """ La respuesta se serializa con los detalles y precios precargados (sin N+1) """
+        serializer.instance = self.get_queryset().get(pk=serializer.instance.pk)
+
+    @action(detail=False, methods=['get'])
+    def valuation(self, request):
+        """🔹 Costo de cada combo en materias primas frente a su precio.
+
+        Valora todos los combos visibles en un solo cálculo; `?ids=1,2` limita a esos combos.
+        """
+        combos = self.get_queryset()
+        ids = request.query_params.get('ids')
+        if ids:
+            try:
+                combos = combos.filter(id__in=[int(value) for value in ids.split(',') if value.strip()])
+            except ValueError:
+                return Response({"error": "El parámetro 'ids' debe ser una lista de enteros."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(value_combos(combos))
 
 
 
 
 
 class ComboDetailViewSet(viewsets.ModelViewSet):
-    queryset = ComboDetail.objects.all()
+    queryset = ComboDetail.objects.select_related('item')
     serializer_class = ComboDetailSerializer
 
-class AccountViewSet(viewsets.ModelViewSet):
-    queryset = Account.objects.all()
+class AccountViewSet(TribeScopedMixin, ConditionalListMixin, viewsets.ModelViewSet):
+    queryset = Account.objects.order_by('id')
     serializer_class = AccountSerializer
     permission_classes = [IsAuthenticated]
+    version_key = "account"
 
     def perform_create(self, serializer):
         if self.request.user.tribe:
@@ -168,44 +683,136 @@ class AccountViewSet(viewsets.ModelViewSet):
         instance.save()
         return Response(SessionSerializer(instance).data)
 
-class SessionViewSet(viewsets.ModelViewSet):
-    queryset = Session.objects.all()
+# 🔹 Mensaje por cada restricción de `Session` que puede fallar al iniciar sesión
+SESSION_START_ERRORS = {
+    'unique_active_session_per_player': "Ya estás conectado a otra cuenta.",
+    'unique_session_per_account': "Esta cuenta ya está en uso.",
+}
+# 🔹 Columna de cada restricción (SQLite no reporta el nombre de la restricción)
+SESSION_CONSTRAINT_COLUMNS = {
+    'unique_active_session_per_player': 'store_session.player_id',
+    'unique_session_per_account': 'store_session.account_id',
+}
+
+
+def _violated_constraint(error, names):
+    """Retorna cuál de las restricciones `names` provocó el IntegrityError (o None)"""
+    diag = getattr(getattr(error, '__cause__', None), 'diag', None)
+    constraint_name = getattr(diag, 'constraint_name', None)  # 🔹 PostgreSQL (psycopg)
+    if constraint_name in names:
+        return constraint_name
+
+    message = str(error)
+    for name in names:
+        if name in message or SESSION_CONSTRAINT_COLUMNS.get(name, name) in message:
+            return name
+    return None
+
+
+def _start_session_in_tribe(account_id, user, start_time):
+    """🔹 Crea la sesión solo si la cuenta es de la tribu del usuario, en un solo
+    `INSERT … SELECT` (sin carreras con un cambio de tribu de la cuenta).
+
+    Retorna la sesión o None si la cuenta no existe o es de otra tribu. Las señales
+    `post_save` se envían igual que con `Session.objects.create`.
+    """
+    session = Session(account_id=account_id, player=user, start_time=start_time, status="playing")
+    opts, account_opts = Session._meta, Account._meta
+    columns = ['account_id', 'player_id', 'start_time', 'status', 'is_active']
+    sql = (
+        f"INSERT INTO {connection.ops.quote_name(opts.db_table)} "
+        f"({', '.join(connection.ops.quote_name(opts.get_field(column).column) for column in columns)}) "
+        f"SELECT id, %s, %s, %s, %s FROM {connection.ops.quote_name(account_opts.db_table)} "
+        f"WHERE id = %s AND tribe_id = %s RETURNING id"
+    )
+    params = [
+        user.pk, connection.ops.adapt_datetimefield_value(start_time), session.status, session.is_active,
+        account_id, user.tribe_id,
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    session.pk = row[0]
+    session._state.adding = False
+    post_save.send(sender=Session, instance=session, created=True, update_fields=None, raw=False, using=connection.alias)
+    return session
+
+
+class SessionViewSet(TribeScopedMixin, ConditionalListMixin, viewsets.ModelViewSet):
+    queryset = Session.objects.all().select_related('player')  # 🔹 Asegurar JOIN con `player`
+    tribe_field = 'account__tribe'
     serializer_class = SessionSerializer
     permission_classes = [IsAuthenticated]
-
-    def list(self, request, *args, **kwargs):
-        sessions = Session.objects.all().select_related('player')  # 🔹 Asegurar JOIN con `player`
-        serializer = SessionSerializer(sessions, many=True)
-        return Response(serializer.data)
-    
+    version_key = "session"
 
     def destroy(self, request, *args, **kwargs):
         """Finaliza la sesión y guarda el tiempo jugado en SessionLog."""
+        instance = self.get_object()  # 🔹 404 si no existe o es de otra tribu
         try:
-            instance = self.get_object()
-
-            if not instance:
-                return Response({"error": "Sesión no encontrada."}, status=status.HTTP_404_NOT_FOUND)
-
             instance.end_time = now()
             duration = instance.end_time - instance.start_time if instance.start_time else None
 
-            # 🔹 Guardar en SessionLog si hay datos válidos
-            if duration:
-                SessionLog.objects.create(
-                    player=instance.player,  # ✅ Ahora usa User en lugar de Player
-                    account=instance.account,
-                    start_time=instance.start_time,
-                    end_time=instance.end_time,
-                    duration=duration
-                )
-
-            instance.delete()
+            with transaction.atomic():
+                # 🔹 Guardar en SessionLog si hay datos válidos
+                if duration:
+                    log = SessionLog.objects.create(
+                        player=instance.player,  # ✅ Ahora usa User en lugar de Player
+                        account=instance.account,
+                        tribe_id=instance.account.tribe_id,
+                        start_time=instance.start_time,
+                        end_time=instance.end_time,
+                        duration=duration
+                    )
+                    record_playtime([log])  # 🔹 Actualiza los rollups de tiempo jugado
+
+                session_id, tribe_id = instance.id, instance.account.tribe_id  # 🔹 Antes de borrar
+                instance.delete()
+            broadcast_session_event("ended", tribe_id, {"id": session_id})
             return Response({"message": "Sesión finalizada y registrada correctamente."}, status=status.HTTP_200_OK)
 
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['post'], url_path='end')
+    def end(self, request):
+        """🔹 Finaliza en bloque las sesiones de una tribu, un jugador o una lista de ids
+        (dentro de la tribu del usuario, salvo superusuarios).
+
+        Número constante de consultas: un SELECT, un `bulk_create` de `SessionLog`,
+        los rollups y un DELETE, todo en una transacción.
+        """
+        serializer = SessionBulkEndSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lookup = {'tribe': 'account__tribe_id', 'player': 'player_id', 'ids': 'id__in'}
+        filters = {lookup[key]: value for key, value in serializer.validated_data.items()}
+
+        end_time = now()
+        with transaction.atomic():
+            sessions = list(
+                self.get_queryset().select_related(None).select_for_update(of=('self',)).filter(**filters)
+                .values_list('id', 'player_id', 'account_id', 'account__tribe_id', 'start_time')
+            )
+            logs = [
+                SessionLog(
+                    player_id=player_id, account_id=account_id, tribe_id=tribe_id,
+                    start_time=start_time, end_time=end_time, duration=end_time - start_time,
+                )
+                for _, player_id, account_id, tribe_id, start_time in sessions
+                if start_time and start_time < end_time
+            ]
+            SessionLog.objects.bulk_create(logs)
+            record_playtime(logs)  # 🔹 Actualiza los rollups de tiempo jugado
+            Session.objects.filter(id__in=[session[0] for session in sessions]).delete()
+
+        for session_id, _, _, tribe_id, _ in sessions:
+            broadcast_session_event("ended", tribe_id, {"id": session_id})
+        return Response(
+            {"message": f"{len(sessions)} sesiones finalizadas.", "ended": [session[0] for session in sessions]},
+            status=status.HTTP_200_OK,
+        )
+
     def create(self, request, *args, **kwargs):
         account_id = request.data.get('account')
         user = request.user  # ✅ Asegurar que estamos usando el usuario autenticado
@@ -213,19 +820,36 @@ class SessionViewSet(viewsets.ModelViewSet):
         if not account_id:
             return Response({"error": "Debe proporcionar una cuenta."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # ✅ Verificar que el usuario no tenga otra sesión activa
-        active_session = Session.objects.filter(player=user).first()
-        if active_session:
-            return Response({"error": "Ya estás conectado a otra cuenta."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            account_id = int(account_id)
+        except (TypeError, ValueError):
+            return Response({"error": "La cuenta no existe."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # ✅ Verificar que la cuenta no esté ocupada
-        existing_session = Session.objects.filter(account_id=account_id).first()
-        if existing_session:
-            return Response({"error": "Esta cuenta ya está en uso."}, status=status.HTTP_400_BAD_REQUEST)
+        # ✅ Crear la nueva sesión: un solo INSERT; las restricciones de la BD rechazan
+        # un jugador con otra sesión activa o una cuenta ocupada (sin carreras). Un miembro
+        # solo puede usar cuentas de su tribu (lo verifica el mismo INSERT); un superusuario, cualquiera
+        try:
+            with transaction.atomic():
+                if user.is_superuser:
+                    session = Session.objects.create(account_id=account_id, player=user, start_time=now(), status="playing")
+                else:
+                    session = _start_session_in_tribe(account_id, user, now())
+        except IntegrityError as e:
+            constraint = _violated_constraint(e, SESSION_START_ERRORS)
+            error = SESSION_START_ERRORS.get(constraint, "La cuenta no existe.")
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+        if session is None:
+            return Response({"error": "La cuenta no existe."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 🔹 La tribu de la sesión es la del miembro (el INSERT lo garantiza); solo para
+        # un superusuario hay que leerla de la cuenta
+        tribe_id = user.tribe_id
+        if user.is_superuser:
+            tribe_id = Account.objects.filter(pk=account_id).values_list('tribe_id', flat=True).first()
 
-        # ✅ Crear la nueva sesión
-        session = Session.objects.create(account_id=account_id, player=user, start_time=now(), status="playing")
-        return Response(SessionSerializer(session).data, status=status.HTTP_201_CREATED)
+        data = SessionSerializer(session).data
+        broadcast_session_event("created", tribe_id, data)
+        return Response(data, status=status.HTTP_201_CREATED)
 
     def update(self, request, *args, **kwargs):
         """Cambia el estado de una sesión"""
@@ -233,22 +857,66 @@ class SessionViewSet(viewsets.ModelViewSet):
         instance.status = request.data.get('status', instance.status)
         instance.afk_text = request.data.get('afk_text', instance.afk_text)  # 🔹 Ahora guarda el texto AFK
         instance.save()
-        return Response(SessionSerializer(instance).data)    
+        data = SessionSerializer(instance).data
+        broadcast_session_event("updated", instance.account.tribe_id, data)
+        return Response(data)    
 
 
 
         
-class SessionLogViewSet(viewsets.ModelViewSet):
-    queryset = SessionLog.objects.all()
+class SessionLogViewSet(TribeScopedMixin, viewsets.ModelViewSet):
+    queryset = SessionLog.objects.select_related('player__tribe', 'account')
     serializer_class = SessionLogSerializer
+    pagination_class = SessionLogPagination
 
-class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.all()
+class RecipeViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
+    queryset = Recipe.objects.select_related('output_item').prefetch_related(
+        Prefetch('ingredients', queryset=RecipeIngredient.objects.select_related('item'))
+    )
     serializer_class = RecipeSerializer
     permission_classes = [AllowAny]  # 🔹 Permite acceso sin autenticación
+    catalog_models = (Recipe, RecipeIngredient, Item)
+
+    @action(detail=True, methods=['get'])
+    def bom(self, request, pk=None):
+        """🔹 Expande la receta recursivamente hasta materias primas.
+
+        `?quantity=N` indica cuántas unidades del item resultante se quieren
+        (por defecto las que produce una fabricación).
+        """
+        recipe = self.get_object()
+        try:
+            quantity = int(request.query_params.get('quantity', recipe.output_quantity))
+        except ValueError:
+            return Response({"error": "El parámetro 'quantity' debe ser un entero."}, status=status.HTTP_400_BAD_REQUEST)
+        if quantity < 1:
+            return Response({"error": "El parámetro 'quantity' debe ser mayor a 0."}, status=status.HTTP_400_BAD_REQUEST)
+
+        ingredients = list(recipe.ingredients.values_list('item_id', 'quantity'))
+        per_unit = expand_ingredients(ingredients, recipe.output_quantity)
+        items = Item.objects.in_bulk(per_unit.keys())
+
+        materials = []
+        for item_id, amount in per_unit.items():
+            item = items[item_id]
+            materials.append({
+                "item": item_id,
+                "item_name": item.name,
+                "item_image": request.build_absolute_uri(item.image.url) if item.image else None,
+                "quantity": math.ceil(amount * quantity),  # 🔹 Solo se fabrican unidades enteras
+            })
+        materials.sort(key=lambda material: material["item_name"])
+
+        return Response({
+            "recipe": recipe.id,
+            "output_item": recipe.output_item_id,
+            "output_item_name": recipe.name,
+            "quantity": quantity,
+            "materials": materials,
+        })
 
 class RecipeIngredientViewSet(viewsets.ModelViewSet):
-    queryset = RecipeIngredient.objects.all()
+    queryset = RecipeIngredient.objects.select_related('item', 'recipe')
     serializer_class = RecipeIngredientSerializer
 
     @action(detail=False, methods=['delete'])
@@ -261,14 +929,38 @@ class RecipeIngredientViewSet(viewsets.ModelViewSet):
         ingredients_deleted, _ = RecipeIngredient.objects.filter(recipe_id=recipe_id).delete()
         return Response({"message": f"{ingredients_deleted} ingredientes eliminados."}, status=status.HTTP_204_NO_CONTENT)
 
-class ItemViewSet(viewsets.ModelViewSet):
+class ItemViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
     queryset = Item.objects.all().order_by('name')  # 🔹 Orden alfabético
     serializer_class = ItemSerializer
+    pagination_class = ItemPagination
+    catalog_models = (Item,)
 
-class BlueprintViewSet(viewsets.ModelViewSet):
-    queryset = Blueprint.objects.all().order_by("output_item__name")
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """🔹 `?q=met ingt&limit=10`: items por prefijo o con errores de tipeo, desde el índice en memoria"""
+        try:
+            limit = min(int(request.query_params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+        except ValueError:
+            return Response({"error": "El parámetro 'limit' debe ser un entero."}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = []
+        for item_id, name, image in current_index().search(request.query_params.get('q', ''), max(limit, 1)):
+            image_url, thumbnail_url = image_urls(image)
+            results.append({
+                "id": item_id,
+                "name": name,
+                "image": request.build_absolute_uri(image_url) if image_url else None,
+                "thumbnail": request.build_absolute_uri(thumbnail_url) if thumbnail_url else None,
+            })
+        return Response(results)
+
+class BlueprintViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
+    queryset = Blueprint.objects.select_related('output_item').prefetch_related(
+        Prefetch('materials', queryset=BlueprintMaterial.objects.select_related('item'))
+    ).order_by("output_item__name")
     serializer_class = BlueprintSerializer
+    catalog_models = (Blueprint, BlueprintMaterial, Item)
 
 class BlueprintMaterialViewSet(viewsets.ModelViewSet):
-    queryset = BlueprintMaterial.objects.all()
+    queryset = BlueprintMaterial.objects.select_related('item')
     serializer_class = BlueprintMaterialSerializer
\ No newline at end of file